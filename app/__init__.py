@@ -4,22 +4,49 @@ PytestMate - Python Test Infrastructure Manager
 This package provides tools for managing Python test infrastructure, including
 test file generation, test running, and test reporting. It exports utility
 functions from the workspace module for managing Python project structures
-and test files.
+and test files. The exports are resolved lazily on first access, so the CLI
+starts without importing modules the invoked command doesn't need.
 """
 
-from typing import List
-from .utils import (
-    in_python_project,
-    get_ignore_spec,
-    get_python_files,
-    create_tests_directory,
-    create_test_files,
-)
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .utils import (
+        in_python_project,
+        find_project_root,
+        get_ignore_spec,
+        get_python_files,
+        iter_python_files,
+        create_tests_directory,
+        create_test_files,
+        in_tests_directory,
+        MaterializeResult,
+        IgnoreRules,
+    )
 
 __all__: List[str] = [
     "in_python_project",
+    "find_project_root",
     "get_ignore_spec",
     "get_python_files",
+    "iter_python_files",
     "create_tests_directory",
     "create_test_files",
+    "in_tests_directory",
+    "MaterializeResult",
+    "IgnoreRules",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from . import utils
+
+    value = getattr(utils, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted([*globals(), *__all__])
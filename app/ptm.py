@@ -7,29 +7,163 @@ updating test files, running tests, and generating test reports.
 
 Available Commands:
     init    - Initialize test structure for a Python project
-    update  - Update existing test files (Coming Soon)
-    test    - Run tests with pytest (Coming Soon)
-    report  - Generate test coverage reports (Coming Soon)
-    generate - Generate additional test files (Coming Soon)
+    update  - Update existing test files to match the sources
+    test    - Run tests with pytest, optionally only those affected by changes
+    report  - Report line and branch coverage, or summarize JUnit XML results
+    generate - Append test skeletons for public functions, classes and methods
+    serve   - Answer editor and tooling queries over a Unix socket
 
 The CLI is built using Click and provides a user-friendly interface for managing
 Python test infrastructure across your project.
 """
 
 import os
+import sys
 import click
-from typing import List
-from app import (
-    in_python_project,
-    get_python_files,
-    create_tests_directory,
-    create_test_files,
-)
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import cProfile
+
+    from app.utils.coverage import FileReport
+    from app.utils.instrument import Recorder
+
+# Command dependencies are imported inside each command so that `ptm --help`
+# and quick commands don't pay for modules they never use.
 
 
 @click.group()
-def ptm() -> None:
-    pass
+@click.option(
+    "--timings",
+    is_flag=True,
+    default=False,
+    help="Print the time spent per phase and operation counts to stderr.",
+)
+@click.option(
+    "--timings-json",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the time spent per phase and operation counts to a JSON file.",
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write cProfile statistics of the command to a file.",
+)
+@click.pass_context
+def ptm(
+    ctx: click.Context,
+    timings: bool,
+    timings_json: Optional[str],
+    profile: Optional[str],
+) -> None:
+    if timings or timings_json:
+        from app.utils import instrument
+
+        recorder = instrument.enable()
+        ctx.call_on_close(lambda: report_timings(recorder, timings, timings_json))
+
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        ctx.call_on_close(lambda: stop_profile(profiler, profile))
+
+
+def report_timings(
+    recorder: "Recorder", timings: bool, timings_json: Optional[str]
+) -> None:
+    """
+    Stops recording and prints the timings, writes them as JSON, or both.
+
+    Parameters:
+        recorder (Recorder): Recorder enabled for the command
+        timings (bool): Whether to print the timings table to stderr
+        timings_json (Optional[str]): Path of the JSON file to write, if any
+
+    Returns:
+        None
+    """
+    from app.utils import instrument
+
+    instrument.disable()
+    if timings:
+        click.echo(recorder.format_table(), err=True)
+    if timings_json:
+        import json
+
+        with open(timings_json, "w") as file:
+            json.dump(recorder.to_dict(), file, indent=2)
+
+
+def stop_profile(profiler: "cProfile.Profile", path: str) -> None:
+    """Stops the profiler and writes its statistics to path."""
+    profiler.disable()
+    profiler.dump_stats(path)
+
+
+def parse_shard(
+    _ctx: click.Context, _param: click.Parameter, value: Optional[str]
+) -> Optional[Tuple[int, int]]:
+    """Parses a `I/N` shard option into a 1-based index and a shard count."""
+    if value is None:
+        return None
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise click.BadParameter("expected I/N, for example 2/4")
+    if not 1 <= index <= count:
+        raise click.BadParameter("I must be between 1 and N")
+    return index, count
+
+
+def resolve_project_root() -> str:
+    """
+    Returns the root of the Python project enclosing the working directory,
+    searching upwards like git so ptm works from any subdirectory.
+
+    Returns:
+        str: Absolute path of the project root
+    Raises:
+        click.ClickException: If the working directory isn't in a Python project
+    """
+    from app.utils.instrument import phase
+    from app.utils.workspace import find_project_root, in_python_project
+
+    current_dir: str = os.getcwd()
+    with phase("detect"):
+        root_dir = find_project_root(current_dir)
+        if root_dir is None and in_python_project(current_dir):
+            root_dir = current_dir
+    if root_dir is None:
+        raise click.ClickException("Please run pytestmate from within a Python project")
+    return root_dir
+
+
+class LiveCount:
+    """
+    Counts items flowing through an iterator and keeps a running total on
+    the terminal, on stderr, while they are discovered.
+    """
+
+    def __init__(self, label: str) -> None:
+        self.label: str = label
+        self.count: int = 0
+
+    def track(self, items: Iterable[str]) -> Iterator[str]:
+        """Yields items unchanged while updating the displayed count."""
+        live = sys.stderr.isatty()
+        for item in items:
+            self.count += 1
+            if live and self.count % 256 == 0:
+                sys.stderr.write(f"\r{self.label} {self.count}")
+                sys.stderr.flush()
+            yield item
+        if live and self.count >= 256:
+            sys.stderr.write("\r\033[K")
+            sys.stderr.flush()
 
 
 @click.command()
@@ -43,18 +177,82 @@ def ptm() -> None:
     required=False,
     help="Use git for tracking relevant python files.",
 )
-def init(git: bool) -> None:
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Rescan the whole project instead of reusing the file index.",
+)
+@click.option(
+    "-y",
+    "--yes",
+    is_flag=True,
+    default=False,
+    help="Create the test structure without asking for confirmation.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Show what would be created without writing anything.",
+)
+@click.option(
+    "--check",
+    is_flag=True,
+    default=False,
+    help="Exit with status 1 if any test file is missing, without writing.",
+)
+@click.option(
+    "--plan-json",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the scaffold plan to a JSON file.",
+)
+@click.option(
+    "--workspace",
+    is_flag=True,
+    default=False,
+    help="Scaffold every Python project below the current directory.",
+)
+def init(
+    git: bool,
+    no_cache: bool,
+    yes: bool,
+    dry_run: bool,
+    check: bool,
+    plan_json: Optional[str],
+    workspace: bool,
+) -> None:
     """
     Initialize test structure for a Python project.
 
     This command:
     1. Verifies the current directory is a Python project
     2. Identifies Python source files
-    3. Creates test directory structure
-    4. Generates test file placeholders
+    3. Plans the test directories and files missing from one snapshot of
+       the tests directory
+    4. Creates them as one batch
+
+    With --yes, there is nothing to show before writing, so discovered files
+    stream straight into test file creation instead of being planned first.
+
+    With --dry-run or --check nothing is written; --check exits with status 1
+    when the test structure is incomplete, for use in CI. --plan-json writes
+    the plan for other tools to read.
+
+    With --workspace, every Python project below the current directory is
+    found in one walk and given its own tests directory. The projects are
+    planned and written concurrently.
 
     Parameters:
         git (bool): Whether to use git for file discovery
+        no_cache (bool): Whether to bypass the file index in `.ptm/cache`
+        yes (bool): Whether to skip the confirmation prompt
+        dry_run (bool): Whether to only show the plan
+        check (bool): Whether to only check that the plan is empty
+        plan_json (Optional[str]): Path of the JSON file to write the plan to
+        workspace (bool): Whether to scaffold every project below the
+            current directory
 
     Returns:
         None
@@ -62,16 +260,46 @@ def init(git: bool) -> None:
     Raises:
         click.ClickException: If project validation fails or file operations fail
     """
+    from app.utils.scaffold import apply_plan, plan_scaffold
+    from app.utils.workspace import (
+        create_test_files,
+        create_tests_directory,
+        in_tests_directory,
+        iter_python_files,
+    )
+
+    if workspace:
+        init_workspace(git, yes, dry_run, check, plan_json)
+        return
+
     try:
-        current_dir: str = os.getcwd()
-        if not in_python_project(current_dir):
-            raise click.ClickException(
-                "Please run pytestmate from within a Python project"
+        current_dir: str = resolve_project_root()
+        click.echo("✅ Verified Python project")
+
+        counter = LiveCount("Discovering Python files...")
+        discovered = counter.track(
+            python_file
+            for python_file in iter_python_files(
+                current_dir, git, use_cache=not no_cache
             )
+            if not in_tests_directory(python_file)
+        )
 
-        click.echo("✅ Verified Python project")
+        if yes and not (dry_run or check or plan_json):
+            # Nothing to show or confirm, so test files are written while
+            # the project is still being scanned.
+            create_tests_directory(current_dir)
+            result = create_test_files(os.path.join(current_dir, "tests"), discovered)
+            if not counter.count:
+                raise click.ClickException("No Python files found in the project")
+            click.echo(f"Found {counter.count} Python files")
+            click.echo(
+                f"✅ Test structure created successfully "
+                f"({result.created} created, {result.skipped} already present)"
+            )
+            return
 
-        python_files: List[str] = get_python_files(current_dir, git)
+        python_files: List[str] = list(discovered)
         if not python_files:
             raise click.ClickException("No Python files found in the project")
 
@@ -83,39 +311,1012 @@ def init(git: bool) -> None:
             for file in python_files:
                 click.echo(f"  {file}")
 
-        if click.confirm("Create test structure?"):
-            create_tests_directory(current_dir)
-            create_test_files("tests", python_files)
-            click.echo("✅ Test structure created successfully")
+        plan = plan_scaffold(current_dir, python_files)
+        if plan_json:
+            import json
+
+            with open(plan_json, "w") as file:
+                json.dump(plan.to_dict(), file, indent=2)
+
+        if plan.complete:
+            click.echo(
+                f"✅ Test structure is complete ({len(plan.present)} already present)"
+            )
+            return
+
+        if dry_run or check:
+            for directory in plan.directories:
+                click.echo(f"  + {directory}/")
+            for test_file, source in plan.create.items():
+                click.echo(f"  + {test_file}  ({source})")
+            click.echo(
+                f"{len(plan.create)} test files missing, "
+                f"{len(plan.present)} already present"
+            )
+            if check:
+                raise SystemExit(1)
+            return
+
+        if yes or click.confirm("Create test structure?"):
+            result = apply_plan(plan)
+            click.echo(
+                f"✅ Test structure created successfully "
+                f"({result.created} created, {result.skipped} already present)"
+            )
         else:
             click.echo("Operation cancelled")
 
-    except (FileNotFoundError, PermissionError) as e:
+    except (FileNotFoundError, PermissionError, ModuleNotFoundError, RuntimeError) as e:
         raise click.ClickException(str(e))
 
 
-@click.command()
-def update() -> None:
-    """Coming Soon."""
-    pass
+def init_workspace(
+    git: bool, yes: bool, dry_run: bool, check: bool, plan_json: Optional[str]
+) -> None:
+    """
+    Scaffolds the tests of every Python project below the working directory
+    and prints one summary for all of them.
+
+    Parameters:
+        git (bool): Whether to use git for file discovery
+        yes (bool): Whether to skip the confirmation prompt
+        dry_run (bool): Whether to only show the plans
+        check (bool): Whether to only check that the plans are empty
+        plan_json (Optional[str]): Path of the JSON file to write the plans to
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If no project is found or file operations fail
+    """
+    from app.utils.projects import apply_plans, find_projects, plan_projects
+
+    try:
+        workspace_dir: str = os.getcwd()
+        projects = find_projects(workspace_dir, git)
+        if not projects:
+            raise click.ClickException("No Python projects found in the workspace")
+        source_count = sum(len(files) for files in projects.values())
+        click.echo(
+            f"✅ Found {len(projects)} Python projects with {source_count} Python files"
+        )
+
+        plans = plan_projects(workspace_dir, projects)
+        if plan_json:
+            import json
+
+            with open(plan_json, "w") as file:
+                json.dump(
+                    {project or ".": plan.to_dict() for project, plan in plans.items()},
+                    file,
+                    indent=2,
+                )
+
+        incomplete = {
+            project: plan for project, plan in plans.items() if not plan.complete
+        }
+        present = sum(len(plan.present) for plan in plans.values())
+        if not incomplete:
+            click.echo(f"✅ Test structure is complete ({present} already present)")
+            return
+
+        missing = 0
+        for project, plan in incomplete.items():
+            missing += len(plan.create)
+            click.echo(
+                f"  {project or '.'}: {len(plan.create)} test files missing, "
+                f"{len(plan.present)} already present"
+            )
+        click.echo(
+            f"{missing} test files missing in {len(incomplete)} projects, "
+            f"{present} already present"
+        )
+        if dry_run or check:
+            if check:
+                raise SystemExit(1)
+            return
+
+        if yes or click.confirm("Create test structure?"):
+            results = apply_plans(incomplete)
+            created = sum(result.created for result in results.values())
+            click.echo(
+                f"✅ Test structure created successfully in {len(results)} projects "
+                f"({created} created, {present} already present)"
+            )
+        else:
+            click.echo("Operation cancelled")
+
+    except (FileNotFoundError, PermissionError, ModuleNotFoundError, RuntimeError) as e:
+        raise click.ClickException(str(e))
 
 
 @click.command()
-def test() -> None:
-    """Coming Soon."""
-    pass
+@click.option(
+    "-g",
+    "--git",
+    type=bool,
+    is_flag=True,
+    flag_value=True,
+    default=False,
+    required=False,
+    help="Use git for tracking relevant python files.",
+)
+@click.option(
+    "--since",
+    metavar="REF",
+    default=None,
+    help="Only reconcile files changed since a git ref (requires --git).",
+)
+@click.option(
+    "--prune",
+    is_flag=True,
+    default=False,
+    help="Delete test files whose source module no longer exists, unless "
+    "they were edited since they were generated.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Rescan the whole project instead of reusing the file index.",
+)
+@click.option(
+    "-y",
+    "--yes",
+    is_flag=True,
+    default=False,
+    help="Apply the changes without asking for confirmation.",
+)
+def update(
+    git: bool, since: Optional[str], prune: bool, no_cache: bool, yes: bool
+) -> None:
+    """
+    Update an existing test structure to match the project's sources.
+
+    This command:
+    1. Compares the Python source files against the tests directory
+    2. Creates test files for new modules
+    3. Moves test files of moved or renamed modules
+    4. Reports (or with --prune deletes) test files without a source
+
+    --prune only deletes orphaned test files that are still empty or the
+    generated stub; edited ones are listed and kept.
+
+    Parameters:
+        git (bool): Whether to use git for file discovery
+        since (Optional[str]): Git ref to limit the update to changed files
+        prune (bool): Whether to delete orphaned, unedited test files
+        no_cache (bool): Whether to bypass the file index in `.ptm/cache`
+        yes (bool): Whether to skip the confirmation prompt
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If project validation fails or file operations fail
+    """
+    from app.utils.git import get_changed_files
+    from app.utils.reconcile import apply_reconciliation, reconcile, reconcile_changes
+    from app.utils.workspace import get_python_files, is_stub
+
+    try:
+        current_dir: str = resolve_project_root()
+        tests_dir: str = os.path.join(current_dir, "tests")
+        if not os.path.isdir(tests_dir):
+            raise click.ClickException("No tests directory found, run `ptm init`")
+
+        if since is not None:
+            if not git:
+                raise click.ClickException("--since requires --git")
+            result = reconcile_changes(tests_dir, get_changed_files(current_dir, since))
+        else:
+            python_files: List[str] = get_python_files(
+                current_dir, git, use_cache=not no_cache
+            )
+            result = reconcile(tests_dir, python_files)
+
+        if not result:
+            click.echo("✅ Test structure is up to date")
+            return
+
+        for test_file, source in sorted(result.missing.items()):
+            click.echo(f"  + tests/{test_file}  ({source})")
+        for old_test, new_test in result.moved:
+            click.echo(f"  > tests/{old_test} -> tests/{new_test}")
+        for test_file in result.orphaned:
+            if not prune:
+                click.echo(f"  ? tests/{test_file}  (no source)")
+            elif is_stub(os.path.join(tests_dir, test_file)):
+                click.echo(f"  - tests/{test_file}  (no source)")
+            else:
+                click.echo(f"  ? tests/{test_file}  (no source, edited, kept)")
+
+        if yes or click.confirm("Apply these changes?"):
+            kept = apply_reconciliation(tests_dir, result, prune)
+            click.echo("✅ Test structure updated successfully")
+            if prune and kept:
+                click.echo(f"Kept {len(kept)} edited test files without a source")
+        else:
+            click.echo("Operation cancelled")
+
+    except (FileNotFoundError, PermissionError, ModuleNotFoundError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+
+
+def watch_tests(
+    root_dir: str, direct: bool, warm: bool, pytest_args: Tuple[str, ...]
+) -> None:
+    """
+    Reruns the tests affected by each debounced batch of file changes until
+    interrupted.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        direct (bool): Whether to ignore tests affected through imports
+        warm (bool): Whether to run the tests in the resident worker
+        pytest_args (Tuple[str, ...]): Extra arguments for pytest
+
+    Returns:
+        None
+    """
+    from app.utils.git import FileChange
+    from app.utils.selection import (
+        run_pytest,
+        select_changed_tests,
+        select_impacted_tests,
+    )
+    from app.utils.watch import open_watcher, watch_changes
+    from app.utils.worker import run_in_worker
+
+    runner = run_in_worker if warm else run_pytest
+    watcher = open_watcher(root_dir)
+    click.echo("Watching for changes, press Ctrl+C to stop")
+    try:
+        for batch in watch_changes(watcher):
+            changes = [
+                FileChange(
+                    "M" if os.path.exists(os.path.join(root_dir, path)) else "D", path
+                )
+                for path in sorted(batch)
+            ]
+            if direct:
+                test_files = select_changed_tests(root_dir, changes)
+            else:
+                test_files = select_impacted_tests(root_dir, changes, watcher.files())
+            if not test_files:
+                click.echo(f"No test files affected by {len(changes)} changed files")
+                continue
+            click.echo(f"Running {len(test_files)} affected test files")
+            runner(root_dir, test_files, pytest_args)
+    except KeyboardInterrupt:
+        click.echo("Stopped watching")
+    finally:
+        watcher.close()
+
+
+@click.command(context_settings={"ignore_unknown_options": True})
+@click.option(
+    "--changed",
+    metavar="REF",
+    is_flag=False,
+    flag_value="HEAD",
+    default=None,
+    help="Only run tests for files changed since REF (default: HEAD).",
+)
+@click.option(
+    "--direct",
+    is_flag=True,
+    default=False,
+    help="With --changed, skip tests that only depend on changes via imports.",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Keep running and rerun the tests affected by each saved change.",
+)
+@click.option(
+    "--warm",
+    is_flag=True,
+    default=False,
+    help="Run pytest in a resident worker with dependencies already imported.",
+)
+@click.option(
+    "--stop-worker",
+    is_flag=True,
+    default=False,
+    help="Stop the project's resident --warm worker and exit.",
+)
+@click.option(
+    "--cache",
+    is_flag=True,
+    default=False,
+    help="Skip test files that passed before with the same inputs: the file, "
+    "the project modules it imports, conftests and lockfiles. Dynamic imports "
+    "and data files are not tracked.",
+)
+@click.option(
+    "-n",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of local pytest processes to spread the test files over.",
+)
+@click.option(
+    "--shard",
+    metavar="I/N",
+    callback=parse_shard,
+    default=None,
+    help="Only run shard I of N (1-based), balanced on the durations in the "
+    "--timings file every shard shares, or else on file count.",
+)
+@click.option(
+    "--timings",
+    "timings_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Timings database to balance on and record into instead of "
+    ".ptm/timings.sqlite, e.g. one committed to the repository.",
+)
+@click.option(
+    "--emit-shards",
+    metavar="N",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Print a JSON split of the test files into N shards and exit.",
+)
+@click.argument("pytest_args", nargs=-1, type=click.UNPROCESSED)
+def test(
+    changed: Optional[str],
+    direct: bool,
+    watch: bool,
+    warm: bool,
+    stop_worker: bool,
+    cache: bool,
+    workers: int,
+    shard: Optional[Tuple[int, int]],
+    timings_path: Optional[str],
+    emit_shards: Optional[int],
+    pytest_args: Tuple[str, ...],
+) -> None:
+    """
+    Run the project's tests with pytest.
+
+    With --changed, only the test files affected by files that differ from a
+    git ref (including uncommitted and untracked changes) are run: those
+    mapped to them by the source-to-test naming that `ptm init` scaffolds,
+    and those importing them directly or transitively, found through an
+    import graph cached in `.ptm/cache`. --direct skips the import graph.
+    Any further arguments are passed through to pytest.
+
+    With --watch, ptm keeps running and waits for files to be saved. Each
+    burst of changes reruns only the test files affected by it.
+
+    With --warm, pytest runs in a resident worker that has imported the
+    project's third-party dependencies once and forks a fresh child per run.
+    The worker is started on first use, restarted when lockfiles change and
+    exits after half an hour without runs. --stop-worker stops it right away.
+
+    With --cache, a test file that passed before is reported as cached and
+    not run again while its inputs are unchanged: the test file, the source
+    it is named after, the conftest.py files above it, every project module
+    these import according to the import graph, and the lockfiles. Modules
+    loaded dynamically and data files are not tracked, so a test relying on
+    them can be reported as cached after they change.
+    Passes are kept in `.ptm/cache/results`, which is capped in size and
+    drops the least recently used entries first.
+
+    With --workers, --shard or --emit-shards, test files are balanced across
+    shards using their durations from previous runs, which are kept in
+    `.ptm/timings.sqlite`, or the database given with --timings, and updated
+    after each --workers run. Every machine running one --shard must compute
+    the same split, so --shard only reads the --timings file, which all of
+    them have to share, balances on file count without one, and never
+    records durations.
+
+    Parameters:
+        changed (Optional[str]): Git ref to select changed tests against
+        direct (bool): Whether to ignore tests affected through imports
+        watch (bool): Whether to keep rerunning affected tests on changes
+        warm (bool): Whether to run the tests in the resident worker
+        stop_worker (bool): Whether to only stop the resident worker
+        cache (bool): Whether to skip test files with a cached pass
+        workers (int): Number of local pytest processes
+        shard (Optional[Tuple[int, int]]): Shard index and shard count
+        timings_path (Optional[str]): Path of a shared timings database
+        emit_shards (Optional[int]): Number of shards to print a split for
+        pytest_args (Tuple[str, ...]): Extra arguments for pytest
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If project validation or git fails
+    """
+    import json
+    from app.utils.git import get_changed_files
+    from app.utils.depgraph import ImportGraph
+    from app.utils.reconcile import list_test_files
+    from app.utils.results import ResultCache, run_uncached
+    from app.utils.selection import (
+        run_pytest,
+        select_changed_tests,
+        select_impacted_tests,
+    )
+    from app.utils.sharding import TimingStore, run_shards, split_shards
+    from app.utils import worker
+    from app.utils.workspace import get_python_files
+
+    try:
+        current_dir: str = resolve_project_root()
+        test_files: List[str] = []
+
+        if stop_worker:
+            if worker.stop_worker(current_dir):
+                click.echo("✅ Stopped the warm worker")
+            else:
+                click.echo("No warm worker is running")
+            return
+
+        if watch:
+            if changed is not None or cache or workers != 1 or shard or emit_shards:
+                raise click.UsageError(
+                    "--watch can't be combined with --changed, --cache, --workers "
+                    "or sharding"
+                )
+            watch_tests(current_dir, direct, warm, pytest_args)
+            return
+
+        if changed is not None:
+            changes = get_changed_files(current_dir, changed)
+            if direct:
+                test_files = select_changed_tests(current_dir, changes)
+            else:
+                test_files = select_impacted_tests(
+                    current_dir,
+                    changes,
+                    get_python_files(current_dir, False, use_cache=True),
+                )
+            if not test_files:
+                click.echo(f"No test files affected by changes since {changed}")
+                return
+            click.echo(f"Running {len(test_files)} affected test files")
+
+        if warm and (workers != 1 or shard or emit_shards):
+            raise click.UsageError(
+                "--warm can't be combined with --workers or sharding"
+            )
+        if cache and (warm or workers != 1 or shard or emit_shards):
+            raise click.UsageError(
+                "--cache can't be combined with --warm, --workers or sharding"
+            )
+
+        if cache:
+            if not test_files:
+                tests_dir = os.path.join(current_dir, "tests")
+                test_files = [
+                    os.path.join("tests", test_file)
+                    for test_file in sorted(list_test_files(tests_dir))
+                ]
+            graph = ImportGraph.load(current_dir)
+            graph.update(get_python_files(current_dir, False, use_cache=True))
+            graph.save()
+            results = ResultCache(current_dir, pytest_args, graph=graph)
+            cached, uncached = results.partition(test_files)
+            for test_file in cached:
+                click.echo(f"✅ {test_file} (cached)")
+            exit_code = 0
+            if not uncached:
+                click.echo(f"All {len(cached)} test files are cached")
+            else:
+                click.echo(f"Running {len(uncached)} test files, {len(cached)} cached")
+                exit_code, _ = run_uncached(current_dir, uncached, pytest_args, results)
+        elif warm:
+            exit_code = worker.run_in_worker(current_dir, test_files, pytest_args)
+        elif workers == 1 and shard is None and emit_shards is None:
+            exit_code = run_pytest(current_dir, test_files, pytest_args)
+        else:
+            if not test_files:
+                tests_dir = os.path.join(current_dir, "tests")
+                test_files = [
+                    os.path.join("tests", test_file)
+                    for test_file in list_test_files(tests_dir)
+                ]
+
+            if shard is not None:
+                # Local histories differ between machines, so only a shared
+                # file can be trusted to give every shard the same split.
+                durations: Dict[str, float] = {}
+                if timings_path is not None:
+                    if not os.path.isfile(timings_path):
+                        raise FileNotFoundError(
+                            f"Timings file {timings_path} not found"
+                        )
+                    with TimingStore(current_dir, timings_path) as timings:
+                        durations = timings.durations()
+                index, count = shard
+                shards = [split_shards(test_files, durations, count)[index - 1]]
+                exit_code, _ = run_shards(current_dir, shards, pytest_args)
+            else:
+                with TimingStore(current_dir, timings_path) as timings:
+                    durations = timings.durations()
+                    if emit_shards is not None:
+                        shards = split_shards(test_files, durations, emit_shards)
+                        click.echo(json.dumps({"shards": shards}, indent=2))
+                        return
+
+                    shards = split_shards(test_files, durations, workers)
+                    exit_code, measured = run_shards(current_dir, shards, pytest_args)
+                    timings.record(measured)
+
+    except (FileNotFoundError, PermissionError, ModuleNotFoundError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+
+    if exit_code:
+        raise SystemExit(exit_code)
+
+
+@click.command(context_settings={"ignore_unknown_options": True})
+@click.option(
+    "-g",
+    "--git",
+    type=bool,
+    is_flag=True,
+    flag_value=True,
+    default=False,
+    required=False,
+    help="Use git for tracking relevant python files.",
+)
+@click.option(
+    "--data-file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Where to write the coverage data (default: .ptm/coverage.ptmcov).",
+)
+@click.option(
+    "--junit",
+    "junit_files",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Summarize JUnit XML results instead of running the tests. Repeatable.",
+)
+@click.option(
+    "--combine",
+    "combine_files",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Merge coverage data files of shards instead of running the tests. "
+    "Repeatable.",
+)
+@click.option(
+    "--json",
+    "json_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="With --junit or --combine, also write the summary to a JSON file.",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=0),
+    default=10,
+    show_default=True,
+    help="With --junit, number of slowest test files to list.",
+)
+@click.argument("pytest_args", nargs=-1, type=click.UNPROCESSED)
+def report(
+    git: bool,
+    data_file: Optional[str],
+    junit_files: Tuple[str, ...],
+    combine_files: Tuple[str, ...],
+    json_path: Optional[str],
+    top: int,
+    pytest_args: Tuple[str, ...],
+) -> None:
+    """
+    Run the tests under coverage and report line and branch coverage.
+
+    On Python 3.12+ coverage is collected with `sys.monitoring`, which stops
+    reporting each line or branch once it has been seen, so measuring costs
+    little more than a plain test run. Older Pythons fall back to tracing.
+    The collected data is kept in a binary file that later runs can merge.
+    Any further arguments are passed through to pytest.
+
+    With --junit, no tests are run. The given JUnit XML files, for example
+    one per shard, are streamed and summarized per test file instead: the
+    slowest test files, the failures and the totals.
+
+    With --combine, no tests are run either. The coverage data files of the
+    shards are merged in parallel into the data file, and the lines no shard
+    ran are listed per source file, next to the test file it maps to.
+
+    Parameters:
+        git (bool): Whether to use git for file discovery
+        data_file (Optional[str]): Path of the coverage data file
+        junit_files (Tuple[str, ...]): JUnit XML files to summarize
+        combine_files (Tuple[str, ...]): Coverage data files to merge
+        json_path (Optional[str]): Path of the JSON summary to write
+        top (int): Number of slowest test files to list
+        pytest_args (Tuple[str, ...]): Extra arguments for pytest
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If project validation fails or file operations fail
+    """
+    if junit_files:
+        if pytest_args:
+            raise click.UsageError("--junit summarizes results and doesn't run pytest")
+        report_junit(junit_files, json_path, top)
+        return
+    if combine_files:
+        if pytest_args:
+            raise click.UsageError("--combine merges data files and doesn't run pytest")
+        report_combined(combine_files, data_file, git, json_path)
+        return
+    if json_path:
+        raise click.UsageError("--json is only supported with --junit or --combine")
+
+    from app.utils.coverage import (
+        DEFAULT_DATA_FILE,
+        CoverageData,
+        run_coverage,
+        summarize,
+    )
+    from app.utils.index import make_state_dir
+    from app.utils.workspace import get_python_files, in_tests_directory
+
+    try:
+        current_dir: str = resolve_project_root()
+        data_path = os.path.abspath(
+            data_file or os.path.join(current_dir, DEFAULT_DATA_FILE)
+        )
+        python_files: List[str] = [
+            python_file
+            for python_file in get_python_files(current_dir, git)
+            if not in_tests_directory(python_file)
+        ]
+        if not python_files:
+            raise click.ClickException("No Python files found in the project")
+
+        make_state_dir(os.path.dirname(data_path))
+        exit_code = run_coverage(current_dir, python_files, data_path, pytest_args)
+        if not os.path.exists(data_path):
+            raise click.ClickException("Coverage data was not written")
+
+        reports = summarize(current_dir, CoverageData.read(data_path), python_files)
+
+    except (
+        FileNotFoundError,
+        PermissionError,
+        ModuleNotFoundError,
+        RuntimeError,
+        ValueError,
+    ) as e:
+        raise click.ClickException(str(e))
+
+    print_coverage(reports)
+
+    if exit_code:
+        raise SystemExit(exit_code)
+
+
+def print_coverage(reports: List["FileReport"]) -> None:
+    """Prints the coverage table of the reported files and the total."""
+    width = max(len("Name"), *(len(file_report.path) for file_report in reports))
+    click.echo(f"{'Name':<{width}}  Stmts   Miss  Line%  Branch  BrMiss  Branch%")
+    for file_report in reports:
+        click.echo(
+            f"{file_report.path:<{width}}  {file_report.statements:>5}  "
+            f"{file_report.missed:>5}  {file_report.line_percent:>5.1f}  "
+            f"{file_report.branches:>6}  {file_report.missed_branches:>6}  "
+            f"{file_report.branch_percent:>7.1f}"
+        )
+
+    statements = sum(file_report.statements for file_report in reports)
+    missed = sum(file_report.missed for file_report in reports)
+    total = 100.0 * (statements - missed) / statements if statements else 100.0
+    click.echo(f"Total line coverage: {total:.1f}%")
+
+
+def report_combined(
+    paths: Tuple[str, ...],
+    data_file: Optional[str],
+    git: bool,
+    json_path: Optional[str],
+) -> None:
+    """
+    Merges the coverage data files of shards, writes the merged data file and
+    reports the uncovered lines of each source file with its mapped test file.
+
+    Parameters:
+        paths (Tuple[str, ...]): Coverage data files to merge
+        data_file (Optional[str]): Path of the merged data file to write
+        git (bool): Whether to use git for file discovery
+        json_path (Optional[str]): Path of the JSON summary to write
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If a file can't be read or isn't coverage data,
+            or git file discovery fails
+    """
+    from app.utils.coverage import DEFAULT_DATA_FILE, combine, summarize
+    from app.utils.index import make_state_dir
+    from app.utils.instrument import phase
+    from app.utils.workspace import (
+        get_python_files,
+        get_test_file_path,
+        in_tests_directory,
+    )
+
+    try:
+        current_dir: str = resolve_project_root()
+        data_path = os.path.abspath(
+            data_file or os.path.join(current_dir, DEFAULT_DATA_FILE)
+        )
+        with phase("combine"):
+            data = combine(paths)
+        make_state_dir(os.path.dirname(data_path))
+        data.write(data_path)
+
+        python_files: List[str] = [
+            python_file
+            for python_file in get_python_files(current_dir, git)
+            if not in_tests_directory(python_file)
+        ]
+        if not python_files:
+            raise click.ClickException("No Python files found in the project")
+        with phase("summarize"):
+            reports = summarize(current_dir, data, python_files)
+
+        # Root `__init__.py` and `test_*.py` files have no mapped test file.
+        gaps: List[Tuple["FileReport", Optional[str]]] = []
+        for file_report in reports:
+            if file_report.missing_lines:
+                test_file = get_test_file_path(file_report.path)
+                if test_file is not None:
+                    test_file = os.path.join("tests", test_file)
+                gaps.append((file_report, test_file))
+        if json_path:
+            import json
+
+            summary = {
+                "totals": {
+                    "statements": sum(r.statements for r in reports),
+                    "missed": sum(r.missed for r in reports),
+                },
+                "files": [
+                    {
+                        "source": file_report.path,
+                        "test": test_file,
+                        "statements": file_report.statements,
+                        "missed": file_report.missed,
+                        "missing": file_report.missing_ranges(),
+                    }
+                    for file_report, test_file in gaps
+                ],
+            }
+            with open(json_path, "w") as file:
+                json.dump(summary, file, indent=2)
+    except (
+        FileNotFoundError,
+        PermissionError,
+        ModuleNotFoundError,
+        RuntimeError,
+        ValueError,
+    ) as e:
+        raise click.ClickException(str(e))
+
+    print_coverage(reports)
+    if gaps:
+        click.echo("Uncovered lines:")
+        for file_report, test_file in gaps:
+            link = f" ({test_file})" if test_file else ""
+            click.echo(f"  {file_report.path}{link}: {file_report.missing_ranges()}")
+
+
+def report_junit(paths: Tuple[str, ...], json_path: Optional[str], top: int) -> None:
+    """
+    Summarizes JUnit XML files per test file on the terminal, and as JSON
+    when a path is given.
+
+    Parameters:
+        paths (Tuple[str, ...]): JUnit XML files to summarize
+        json_path (Optional[str]): Path of the JSON summary to write
+        top (int): Number of slowest test files to list
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If a file can't be read or parsed
+    """
+    from app.utils.junit import aggregate_junit
+
+    try:
+        junit_report = aggregate_junit(paths)
+        if json_path:
+            import json
+
+            with open(json_path, "w") as file:
+                json.dump(junit_report.to_dict(), file, indent=2)
+    except (FileNotFoundError, PermissionError, ValueError) as e:
+        raise click.ClickException(str(e))
+
+    slowest = junit_report.slowest(top)
+    if slowest:
+        click.echo("Slowest test files:")
+        for result in slowest:
+            click.echo(
+                f"  {result.seconds:8.2f}s  {result.path} ({result.tests} tests)"
+            )
+
+    failing = junit_report.failing()
+    if failing:
+        click.echo("Failures:")
+        for result in failing:
+            for node_id in result.failed:
+                click.echo(f"  ❌ {node_id}")
+
+    total = junit_report.totals()
+    click.echo(
+        f"Total: {total.tests} tests in {len(junit_report.files)} files, "
+        f"{total.passed} passed, {total.failures} failed, {total.errors} errors, "
+        f"{total.skipped} skipped in {total.seconds:.2f}s"
+    )
 
 
 @click.command()
-def report() -> None:
-    """Coming Soon."""
-    pass
+@click.option(
+    "-g",
+    "--git",
+    type=bool,
+    is_flag=True,
+    flag_value=True,
+    default=False,
+    required=False,
+    help="Use git for tracking relevant python files.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Rescan and reparse the whole project instead of reusing the caches.",
+)
+@click.option(
+    "-y",
+    "--yes",
+    is_flag=True,
+    default=False,
+    help="Write the skeletons without asking for confirmation.",
+)
+def generate(git: bool, no_cache: bool, yes: bool) -> None:
+    """
+    Generate test skeletons for the public API of each module.
+
+    This command:
+    1. Parses every source module for public functions, classes and methods
+    2. Appends a test function skeleton for each one without a test yet
+    3. Adds the imports the new skeletons need
+
+    Existing test code is never modified. Parsed modules are cached in
+    `.ptm/cache` by content hash, so reruns only parse changed modules.
+
+    Parameters:
+        git (bool): Whether to use git for file discovery
+        no_cache (bool): Whether to bypass the caches in `.ptm/cache`
+        yes (bool): Whether to skip the confirmation prompt
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If project validation fails or file operations fail
+    """
+    from app.utils.skeletons import generate_skeletons
+    from app.utils.workspace import (
+        create_tests_directory,
+        get_python_files,
+        in_tests_directory,
+    )
+
+    try:
+        current_dir: str = resolve_project_root()
+        python_files: List[str] = [
+            python_file
+            for python_file in get_python_files(
+                current_dir, git, use_cache=not no_cache
+            )
+            if not in_tests_directory(python_file)
+        ]
+        if not python_files:
+            raise click.ClickException("No Python files found in the project")
+
+        click.echo(f"Found {len(python_files)} Python files")
+        if not yes and not click.confirm("Generate test skeletons?"):
+            click.echo("Operation cancelled")
+            return
+
+        create_tests_directory(current_dir)
+        result = generate_skeletons(current_dir, python_files, use_cache=not no_cache)
+        click.echo(
+            f"✅ Generated {result.skeletons} test skeletons "
+            f"({result.created} files created, {result.updated} updated)"
+        )
+
+    except (FileNotFoundError, PermissionError, ModuleNotFoundError, RuntimeError) as e:
+        raise click.ClickException(str(e))
 
 
 @click.command()
-def generate() -> None:
-    """Coming Soon."""
-    pass
+@click.option(
+    "--poll",
+    is_flag=True,
+    default=False,
+    help="Poll for file changes instead of using inotify.",
+)
+@click.option(
+    "--stop",
+    is_flag=True,
+    default=False,
+    help="Stop the service running for the project and exit.",
+)
+def serve(poll: bool, stop: bool) -> None:
+    """
+    Answer queries about the project over a Unix socket until stopped.
+
+    The project is detected, its ignore rules compiled and its files listed
+    once. They are then kept up to date from file events. Editor plugins and
+    hooks query the service with JSON-RPC 2.0, one JSON message per line, on
+    `.ptm/serve.sock`. Available methods are sources, tests, untested,
+    test_for, source_for, is_ignored, ping and shutdown.
+
+    Parameters:
+        poll (bool): Whether to poll for changes instead of using inotify
+        stop (bool): Whether to stop the running service instead
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If project validation fails or the service
+            can't be started
+    """
+    from app.utils.service import SOCKET_NAME, Workspace, call_service
+    from app.utils.service import serve as serve_workspace
+    from app.utils.worker import socket_path
+
+    try:
+        current_dir: str = resolve_project_root()
+        if stop:
+            try:
+                call_service(current_dir, "shutdown")
+            except ConnectionError:
+                click.echo("No workspace service is running")
+                return
+            click.echo("Stopped the workspace service")
+            return
+
+        workspace = Workspace(current_dir, use_inotify=not poll)
+        try:
+            click.echo(
+                f"Serving {len(workspace.sources())} source files and "
+                f"{len(workspace.tests())} test files on "
+                f"{socket_path(current_dir, SOCKET_NAME)}"
+            )
+            serve_workspace(workspace)
+            click.echo("Stopped")
+        except KeyboardInterrupt:
+            click.echo("Stopped")
+        finally:
+            workspace.close()
+
+    except (FileNotFoundError, PermissionError, RuntimeError) as e:
+        raise click.ClickException(str(e))
 
 
 ptm.add_command(init)
@@ -123,3 +1324,4 @@ ptm.add_command(update)
 ptm.add_command(test)
 ptm.add_command(report)
 ptm.add_command(generate)
+ptm.add_command(serve)
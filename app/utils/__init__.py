@@ -1,20 +1,52 @@
 """
 Utility modules for the application.
+
+The exported names are resolved lazily on first access, so importing this
+package doesn't import the modules behind them or their dependencies.
 """
 
-from typing import List
-from .workspace import (
-    in_python_project,
-    get_ignore_spec,
-    get_python_files,
-    create_tests_directory,
-    create_test_files,
-)
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .workspace import (
+        in_python_project,
+        find_project_root,
+        get_ignore_spec,
+        get_python_files,
+        iter_python_files,
+        create_tests_directory,
+        create_test_files,
+        in_tests_directory,
+        MaterializeResult,
+    )
+    from .ignore import IgnoreRules
 
 __all__: List[str] = [
     "in_python_project",
+    "find_project_root",
     "get_ignore_spec",
     "get_python_files",
+    "iter_python_files",
     "create_tests_directory",
     "create_test_files",
+    "in_tests_directory",
+    "MaterializeResult",
+    "IgnoreRules",
 ]
+
+# Module each export lives in, when it isn't the workspace module.
+_SOURCES: Dict[str, str] = {"IgnoreRules": "ignore"}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = _SOURCES.get(name, "workspace")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted([*globals(), *__all__])
@@ -0,0 +1,657 @@
+"""
+Low-overhead line and branch coverage for `ptm report`.
+
+On Python 3.12+ coverage is collected through `sys.monitoring`. Every line and
+branch callback returns `DISABLE`, so each location costs one callback the
+first time it runs and nothing afterwards; locations in files outside the
+project are disabled the same way. On Python 3.11 the collector falls back to
+`sys.settrace`, tracing only frames of project files.
+
+Collected data is written to a compact, zlib-compressed binary file holding
+one line bitset and a list of branch arcs per source file. Data files can be
+merged by OR-ing the bitsets and uniting the arcs; `combine` merges the data
+files of many shards with a tree reduction over a process pool. Reports stay
+on bitsets too: the lines a file could run are a bitset, and its uncovered
+lines are that bitset masked with the lines that ran.
+
+This module only depends on the standard library so it can be run as a
+script that starts collecting before pytest and the project are imported:
+
+    python coverage.py --data-file FILE --sources-file FILE -- [pytest args]
+
+where the sources file lists one source path per line, relative to --root.
+"""
+
+import argparse
+import dis
+import os
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+MAGIC: bytes = b"PTMCOV1\n"
+DEFAULT_DATA_FILE: str = os.path.join(".ptm", "coverage.ptmcov")
+COVERAGE_TOOL_ID: int = 3
+MAX_COMBINE_WORKERS: int = os.cpu_count() or 1
+ARC_LINE_MASK: int = 0xFFFFFFFF
+BRANCH_OPCODES: Set[str] = {"FOR_ITER", "JUMP_IF_TRUE_OR_POP", "JUMP_IF_FALSE_OR_POP"}
+
+Arc = Tuple[int, int]
+
+
+@dataclass
+class FileCoverage:
+    """
+    Coverage of one source file.
+
+    lines is a bitset where bit n is set if line n ran, arcs holds the
+    (from line, to line) pairs of the branches taken.
+    """
+
+    lines: int = 0
+    arcs: Set[Arc] = field(default_factory=set)
+
+    def merge(self, other: "FileCoverage") -> None:
+        self.lines |= other.lines
+        self.arcs |= other.arcs
+
+    def line_numbers(self) -> Set[int]:
+        """Returns the executed line numbers as a set."""
+        numbers: Set[int] = set()
+        bits = self.lines
+        while bits:
+            low = bits & -bits
+            numbers.add(low.bit_length() - 1)
+            bits ^= low
+        return numbers
+
+
+class CoverageData:
+    """Coverage of a set of source files, keyed by path."""
+
+    def __init__(self) -> None:
+        self.files: Dict[str, FileCoverage] = {}
+
+    def merge(self, other: "CoverageData") -> None:
+        """Merges another data set into this one."""
+        for path, coverage in other.files.items():
+            self.files.setdefault(path, FileCoverage()).merge(coverage)
+
+    def write(self, path: str) -> None:
+        """
+        Atomically writes the data to a binary data file.
+
+        Parameters:
+            path (str): Path of the data file
+        Returns:
+            None
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(MAGIC + zlib.compress(self.to_bytes()))
+        os.replace(temp_path, path)
+
+    def to_bytes(self) -> bytes:
+        """Returns the uncompressed binary encoding of the data."""
+        return _encode(
+            (source, coverage.lines, (a | b << 32 for a, b in coverage.arcs))
+            for source, coverage in sorted(self.files.items())
+        )
+
+    @classmethod
+    def read(cls, path: str) -> "CoverageData":
+        """
+        Reads a binary data file.
+
+        Parameters:
+            path (str): Path of the data file
+        Returns:
+            CoverageData: The data stored in the file
+        Raises:
+            ValueError: If the file is not a coverage data file
+        """
+        return cls.from_bytes(_read_payload(path))
+
+    @classmethod
+    def from_bytes(cls, encoded: bytes) -> "CoverageData":
+        """Decodes data encoded by `to_bytes`."""
+        data = cls()
+        for source, lines, keys in _decode(encoded):
+            data.files[source] = FileCoverage(
+                lines, {(key & ARC_LINE_MASK, key >> 32) for key in keys}
+            )
+        return data
+
+
+class FileReport(NamedTuple):
+    """
+    Coverage summary of one source file.
+
+    missing_lines is a bitset of the executable lines that never ran.
+    """
+
+    path: str
+    statements: int
+    missed: int
+    branches: int
+    missed_branches: int
+    missing_lines: int = 0
+
+    def missing_ranges(self) -> str:
+        """Returns the lines that never ran as ranges, such as `3-5, 9`."""
+        return format_ranges(self.missing_lines)
+
+    @property
+    def line_percent(self) -> float:
+        if not self.statements:
+            return 100.0
+        return 100.0 * (self.statements - self.missed) / self.statements
+
+    @property
+    def branch_percent(self) -> float:
+        if not self.branches:
+            return 100.0
+        return 100.0 * (self.branches - self.missed_branches) / self.branches
+
+
+class CoverageCollector:
+    """
+    Records executed lines and taken branches of a set of source files.
+
+    Only one collector can be active at a time.
+    """
+
+    def __init__(self, sources: Iterable[str]) -> None:
+        self._lines: Dict[str, Set[int]] = {}
+        self._arcs: Dict[str, Set[Arc]] = {}
+        for source in sources:
+            key = _normalize(source)
+            self._lines[key] = set()
+            self._arcs[key] = set()
+        self._keys: Dict[str, Optional[str]] = {}
+        self._monitoring: bool = hasattr(sys, "monitoring")
+
+    def start(self) -> None:
+        """Starts collecting coverage."""
+        if self._monitoring:
+            self._start_monitoring()
+        else:
+            threading.settrace(self._trace)
+            sys.settrace(self._trace)
+
+    def stop(self) -> None:
+        """Stops collecting coverage."""
+        if self._monitoring:
+            monitoring = sys.monitoring  # type: ignore[attr-defined]
+            monitoring.set_events(COVERAGE_TOOL_ID, 0)
+            monitoring.free_tool_id(COVERAGE_TOOL_ID)
+        else:
+            sys.settrace(None)
+            threading.settrace(None)  # type: ignore[arg-type]
+
+    def data(self, root_dir: str) -> CoverageData:
+        """
+        Returns the collected coverage with paths relative to root_dir.
+
+        Parameters:
+            root_dir (str): Directory the paths are made relative to
+        Returns:
+            CoverageData: The collected coverage
+        """
+        data = CoverageData()
+        for key, lines in self._lines.items():
+            bits = 0
+            for line in lines:
+                bits |= 1 << line
+            data.files[os.path.relpath(key, root_dir)] = FileCoverage(
+                bits, self._arcs[key]
+            )
+        return data
+
+    def _key(self, filename: str) -> Optional[str]:
+        """Returns the tracked path for a code object's filename, if any."""
+        try:
+            return self._keys[filename]
+        except KeyError:
+            key = _normalize(filename)
+            self._keys[filename] = key if key in self._lines else None
+            return self._keys[filename]
+
+    def _start_monitoring(self) -> None:
+        monitoring = sys.monitoring  # type: ignore[attr-defined]
+        events = monitoring.events
+        monitoring.use_tool_id(COVERAGE_TOOL_ID, "pytestmate")
+        disable = monitoring.DISABLE
+        # Python 3.12 and 3.13 raise a single BRANCH event for both directions
+        # of a jump, so it can only be disabled once both have been seen.
+        split_branches = hasattr(events, "BRANCH_LEFT")
+        taken: Dict[Tuple[CodeType, int], Set[int]] = {}
+
+        def on_line(code: CodeType, line: int) -> Any:
+            key = self._key(code.co_filename)
+            if key is not None:
+                self._lines[key].add(line)
+            return disable
+
+        def on_branch(code: CodeType, offset: int, destination: int) -> Any:
+            key = self._key(code.co_filename)
+            if key is None:
+                return disable
+            if not split_branches:
+                destinations = taken.setdefault((code, offset), set())
+                if destination in destinations:
+                    return None
+                destinations.add(destination)
+            arc = _branch_arc(code, offset, destination)
+            if arc is not None:
+                self._arcs[key].add(arc)
+            if split_branches or len(destinations) > 1:
+                return disable
+            return None
+
+        if split_branches:
+            branch_events = [events.BRANCH_LEFT, events.BRANCH_RIGHT]
+        else:
+            branch_events = [events.BRANCH]
+
+        monitoring.register_callback(COVERAGE_TOOL_ID, events.LINE, on_line)
+        mask = events.LINE
+        for event in branch_events:
+            monitoring.register_callback(COVERAGE_TOOL_ID, event, on_branch)
+            mask |= event
+        monitoring.set_events(COVERAGE_TOOL_ID, mask)
+        monitoring.restart_events()
+
+    def _trace(self, frame: FrameType, event: str, _arg: Any) -> Optional[Callable]:
+        """Global trace function used before Python 3.12."""
+        if event != "call":
+            return None
+        key = self._key(frame.f_code.co_filename)
+        if key is None:
+            return None
+
+        lines = self._lines[key]
+        arcs = self._arcs[key]
+        last = 0
+
+        def trace_lines(frame: FrameType, event: str, _arg: Any) -> Callable:
+            nonlocal last
+            if event == "line":
+                line = frame.f_lineno
+                lines.add(line)
+                if last:
+                    arcs.add((last, line))
+                last = line
+            return trace_lines
+
+        return trace_lines
+
+
+def analyze_source(path: str) -> Tuple[Set[int], Set[Arc]]:
+    """
+    Returns the executable lines and the possible branch arcs of a source file.
+
+    Parameters:
+        path (str): Path of the source file
+    Returns:
+        Tuple[Set[int], Set[Arc]]: Executable line numbers and branch arcs
+    """
+    with open(path, "rb") as file:
+        source = file.read()
+    try:
+        module = compile(source, path, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError):
+        return set(), set()
+
+    lines: Set[int] = set()
+    arcs: Set[Arc] = set()
+    stack: List[CodeType] = [module]
+    while stack:
+        code = stack.pop()
+        stack.extend(const for const in code.co_consts if isinstance(const, CodeType))
+        lines.update(line for _, _, line in code.co_lines() if line)
+
+        instructions = list(dis.get_instructions(code))
+        for index, instruction in enumerate(instructions[:-1]):
+            if (
+                "POP_JUMP" not in instruction.opname
+                and instruction.opname not in BRANCH_OPCODES
+            ):
+                continue
+            for destination in (instruction.argval, instructions[index + 1].offset):
+                arc = _branch_arc(code, instruction.offset, destination)
+                if arc is not None:
+                    arcs.add(arc)
+
+    # A module's docstring and the line 0 resume are not statements users write.
+    lines.discard(0)
+    return lines, arcs
+
+
+def summarize(
+    root_dir: str, data: CoverageData, python_files: Iterable[str]
+) -> List[FileReport]:
+    """
+    Compares collected coverage against what each source file could execute.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        data (CoverageData): Collected coverage, keyed by relative path
+        python_files (Iterable[str]): Relative paths of the source files
+    Returns:
+        List[FileReport]: One report per source file, sorted by path
+    """
+    reports: List[FileReport] = []
+    for python_file in sorted(set(python_files)):
+        lines, arcs = analyze_source(os.path.join(root_dir, python_file))
+        coverage = data.files.get(python_file, FileCoverage())
+        missing = to_bitset(lines) & ~coverage.lines
+        reports.append(
+            FileReport(
+                python_file,
+                len(lines),
+                missing.bit_count(),
+                len(arcs),
+                len(arcs - coverage.arcs),
+                missing,
+            )
+        )
+    return reports
+
+
+def combine(
+    paths: Sequence[str], max_workers: int = MAX_COMBINE_WORKERS
+) -> CoverageData:
+    """
+    Merges the data files of many shards with a parallel tree reduction.
+
+    The files are split into one group per worker and each group is read and
+    merged in its own process. The partial results are then merged in pairs,
+    also in parallel, until one is left. Partial results travel between
+    processes in their compact binary encoding.
+
+    Parameters:
+        paths (Sequence[str]): Paths of the data files
+        max_workers (int): Maximum number of processes
+    Returns:
+        CoverageData: Union of the coverage in all files
+    Raises:
+        FileNotFoundError: If a data file doesn't exist
+        ValueError: If a file is not a coverage data file
+    """
+    workers = min(max_workers, len(paths))
+    if workers <= 1:
+        merged = _merge_payloads(_read_payload(path) for path in paths)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(
+                pool.map(_combine_files, [paths[i::workers] for i in range(workers)])
+            )
+            while len(partials) > 2:
+                pairs = [partials[i : i + 2] for i in range(0, len(partials), 2)]
+                partials = list(pool.map(_combine_encoded, pairs))
+        merged = _merge_payloads(partials)
+
+    data = CoverageData()
+    for source, (lines, keys) in merged.items():
+        data.files[source] = FileCoverage(
+            lines, {(key & ARC_LINE_MASK, key >> 32) for key in keys}
+        )
+    return data
+
+
+def to_bitset(numbers: Iterable[int]) -> int:
+    """
+    Returns a bitset with bit n set for every number n.
+
+    Parameters:
+        numbers (Iterable[int]): Non-negative numbers, such as line numbers
+    Returns:
+        int: The bitset
+    """
+    flags = bytearray()
+    for number in numbers:
+        index = number >> 3
+        if index >= len(flags):
+            flags.extend(bytes(index + 1 - len(flags)))
+        flags[index] |= 1 << (number & 7)
+    return int.from_bytes(flags, "little")
+
+
+def format_ranges(bits: int) -> str:
+    """
+    Returns the set bits of a bitset as ranges of numbers, such as `3-5, 9`.
+
+    Parameters:
+        bits (int): The bitset
+    Returns:
+        str: Comma-separated numbers and ranges, empty if no bit is set
+    """
+    ranges: List[str] = []
+    for run in re.finditer("1+", bin(bits)[:1:-1]):
+        first, last = run.start(), run.end() - 1
+        ranges.append(str(first) if first == last else f"{first}-{last}")
+    return ", ".join(ranges)
+
+
+def _read_payload(path: str) -> bytes:
+    """Returns the uncompressed payload of a data file."""
+    with open(path, "rb") as file:
+        raw = file.read()
+    if not raw.startswith(MAGIC):
+        raise ValueError(f"{path} is not a PytestMate coverage data file")
+    try:
+        return zlib.decompress(raw[len(MAGIC) :])
+    except zlib.error as e:
+        raise ValueError(f"{path} is corrupt: {e}") from None
+
+
+def _encode(files: Iterable[Tuple[str, int, Iterable[int]]]) -> bytes:
+    """
+    Encodes (source, line bitset, arc keys) triples. An arc key packs an arc
+    as `from | to << 32`, which is exactly the two little-endian 32-bit line
+    numbers of the arc read as one 64-bit number.
+    """
+    chunks: List[bytes] = [b""]
+    count = 0
+    for source, lines, keys in files:
+        name = source.encode("utf-8", "surrogateescape")
+        bitset = lines.to_bytes((lines.bit_length() + 7) // 8, "little")
+        arcs = array("q", sorted(keys))
+        if sys.byteorder == "big":
+            arcs.byteswap()
+        chunks.append(struct.pack("<I", len(name)) + name)
+        chunks.append(struct.pack("<I", len(bitset)) + bitset)
+        chunks.append(struct.pack("<I", len(arcs)) + arcs.tobytes())
+        count += 1
+    chunks[0] = struct.pack("<I", count)
+    return b"".join(chunks)
+
+
+def _decode(encoded: bytes) -> Iterator[Tuple[str, int, "array[int]"]]:
+    """Yields the (source, line bitset, arc keys) triples encoded by `_encode`."""
+    payload = memoryview(encoded)
+    (count,), offset = struct.unpack_from("<I", payload), 4
+    for _ in range(count):
+        (length,) = struct.unpack_from("<I", payload, offset)
+        name = bytes(payload[offset + 4 : offset + 4 + length])
+        offset += 4 + length
+        (length,) = struct.unpack_from("<I", payload, offset)
+        lines = int.from_bytes(payload[offset + 4 : offset + 4 + length], "little")
+        offset += 4 + length
+        (arc_count,) = struct.unpack_from("<I", payload, offset)
+        keys = array("q")
+        keys.frombytes(payload[offset + 4 : offset + 4 + 8 * arc_count])
+        if sys.byteorder == "big":
+            keys.byteswap()
+        offset += 4 + 8 * arc_count
+        yield name.decode("utf-8", "surrogateescape"), lines, keys
+
+
+def _merge_payloads(payloads: Iterable[bytes]) -> Dict[str, Tuple[int, Set[int]]]:
+    """
+    Merges encoded data sets into a line bitset and a set of arc keys per
+    source file. Arcs stay packed integers here, so merging never builds
+    the tuples of `FileCoverage.arcs`.
+    """
+    merged: Dict[str, Tuple[int, Set[int]]] = {}
+    for payload in payloads:
+        for source, lines, keys in _decode(payload):
+            known = merged.get(source)
+            if known is None:
+                merged[source] = (lines, set(keys))
+            else:
+                known[1].update(keys)
+                merged[source] = (known[0] | lines, known[1])
+    return merged
+
+
+def _combine_files(paths: Sequence[str]) -> bytes:
+    """Reads and merges data files, returning the encoded result."""
+    merged = _merge_payloads(_read_payload(path) for path in paths)
+    return _encode((source, *merged[source]) for source in sorted(merged))
+
+
+def _combine_encoded(encoded: Sequence[bytes]) -> bytes:
+    """Merges encoded data sets, returning the encoded result."""
+    if len(encoded) == 1:
+        return encoded[0]
+    merged = _merge_payloads(encoded)
+    return _encode((source, *merged[source]) for source in sorted(merged))
+
+
+def _branch_arc(code: CodeType, offset: int, destination: int) -> Optional[Arc]:
+    """
+    Returns the (from line, to line) arc of a jump from one bytecode offset
+    to another. The target line is the first line at or after the destination
+    that differs from the jump's own line, so the arc names the statement the
+    branch leads to rather than loop or conditional bookkeeping.
+    """
+    source_line: Optional[int] = None
+    ranges = list(code.co_lines())
+    for start, end, line in ranges:
+        if start <= offset < end:
+            source_line = line
+            break
+    if not source_line:
+        return None
+
+    for start, end, line in ranges:
+        if end > destination and line and line != source_line:
+            return source_line, line
+    return None
+
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def run_coverage(
+    root_dir: str, python_files: Iterable[str], data_file: str, args: Sequence[str]
+) -> int:
+    """
+    Runs pytest under coverage in a separate interpreter and writes the data file.
+
+    Parameters:
+        root_dir (str): Directory pytest runs in
+        python_files (Iterable[str]): Relative paths of the sources to measure
+        data_file (str): Path of the coverage data file to write
+        args (Sequence[str]): Extra arguments passed through to pytest
+    Returns:
+        int: Exit code of pytest
+    """
+    with tempfile.NamedTemporaryFile(
+        "w",
+        prefix="ptm-sources-",
+        suffix=".txt",
+        delete=False,
+        encoding="utf-8",
+        errors="surrogateescape",
+    ) as sources:
+        sources.write("".join(f"{python_file}\n" for python_file in python_files))
+    try:
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--data-file",
+            data_file,
+            "--root",
+            root_dir,
+            "--sources-file",
+            sources.name,
+            "--",
+            *args,
+        ]
+        return subprocess.call(command, cwd=root_dir)
+    finally:
+        os.unlink(sources.name)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs pytest under coverage and writes the collected data file.
+
+    Parameters:
+        argv (Optional[List[str]]): Command-line arguments
+    Returns:
+        int: Exit code of pytest
+    """
+    parser = argparse.ArgumentParser(description="Run pytest under coverage.")
+    parser.add_argument("--data-file", required=True)
+    parser.add_argument("--root", default=os.getcwd())
+    parser.add_argument("--sources-file", required=True)
+    parser.add_argument("pytest_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    pytest_args = args.pytest_args
+    if pytest_args[:1] == ["--"]:
+        pytest_args = pytest_args[1:]
+
+    with open(
+        args.sources_file, "r", encoding="utf-8", errors="surrogateescape"
+    ) as file:
+        sources = [os.path.join(args.root, line) for line in file.read().splitlines()]
+    collector = CoverageCollector(sources)
+    collector.start()
+    try:
+        import pytest
+
+        exit_code = int(pytest.main(pytest_args))
+    finally:
+        collector.stop()
+
+    collector.data(args.root).write(args.data_file)
+    return exit_code
+
+
+if __name__ == "__main__":
+    # Behave like `python -m pytest`: the working directory comes first on the
+    # path instead of this script's directory, whose modules would shadow
+    # top-level modules of the project under test.
+    sys.path[0] = os.getcwd()
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Static import graph of a project for transitive test selection.
+
+Every Python file is parsed with `ast` for the modules it imports, and import
+names are resolved to files of the project. The graph is persisted in
+`.ptm/cache/imports.json`; on the next run a file whose stat is unchanged is
+reused without reading it, one whose content hash is unchanged is reused
+without parsing it, and only the rest is parsed again, across a process pool
+when there are many.
+
+Selecting tests is a reverse reachability query: starting from the changed
+files, follow import edges backwards and collect every test file reached.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Container, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .index import CACHE_DIR, RACY_WINDOW_NS, make_state_dir
+from .skeletons import PARALLEL_THRESHOLD, module_name
+from .workspace import in_tests_directory
+
+GRAPH_FILE: str = "imports.json"
+GRAPH_VERSION: int = 1
+
+
+def parse_imports(source: bytes, module: str, is_package: bool = False) -> List[str]:
+    """
+    Returns the absolute names of the modules a module may import.
+
+    Importing `a.b.c` also runs `a` and `a.b`, so parent packages are included.
+    `from a import b` lists both `a` and `a.b` since b may be a submodule.
+    Relative imports are resolved against the module's own package.
+
+    Parameters:
+        source (bytes): Source code of the module
+        module (str): Dotted name of the module
+        is_package (bool): Whether the module is a package's `__init__.py`
+    Returns:
+        List[str]: Sorted module names; empty if the module doesn't parse
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+
+    package = module.split(".") if is_package else module.split(".")[:-1]
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            targets = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if node.level - 1 > len(package):
+                    continue
+                base = package[: len(package) - node.level + 1]
+                if node.module:
+                    base = base + node.module.split(".")
+            else:
+                base = (node.module or "").split(".")
+            prefix = ".".join(base)
+            targets = [prefix] if prefix else []
+            targets.extend(
+                f"{prefix}.{alias.name}" if prefix else alias.name
+                for alias in node.names
+                if alias.name != "*"
+            )
+        else:
+            continue
+
+        for target in targets:
+            parts = target.split(".")
+            names.update(".".join(parts[:end]) for end in range(1, len(parts) + 1))
+
+    return sorted(names)
+
+
+def import_names(python_file: str, packages: Container[str]) -> List[str]:
+    """
+    Returns the names a Python file can be imported under.
+
+    Besides its full dotted path from the project root, a file can be imported
+    relative to the first directory above it that isn't a package, which is
+    the directory pytest and most `src` layouts put on `sys.path`.
+
+    Parameters:
+        python_file (str): Relative path of a Python file from project root
+        packages (Container[str]): Relative paths of the project's directories
+            that hold an `__init__.py`
+    Returns:
+        List[str]: Dotted names of the file
+    """
+    full = module_name(python_file)
+    parts = full.split(".")
+    directory = os.path.dirname(python_file)
+    depth = 0
+    while directory and directory in packages:
+        directory = os.path.dirname(directory)
+        depth += 1
+
+    if os.path.basename(python_file) == "__init__.py":
+        depth -= 1
+    short = ".".join(parts[len(parts) - depth - 1 :])
+    return [full] if short == full else [full, short]
+
+
+class ImportGraph:
+    """
+    Import edges between the files of a project, kept up to date
+    incrementally per file.
+
+    Next to the edges, the graph keeps the names each file is imported under
+    and, for every module name, the files named so and the files importing
+    it. Both are patched in `update` for the files whose imports changed, so
+    queries only walk them.
+    """
+
+    def __init__(self, root_dir: str) -> None:
+        self.root_dir: str = root_dir
+        self._entries: Dict[str, List] = {}
+        self._current: Dict[str, List] = {}
+        self._started_ns: int = time.time_ns()
+        self._packages: Optional[Set[str]] = None
+        self._names: Dict[str, List[str]] = {}
+        self._owners: Dict[str, Set[str]] = {}
+        self._importers: Dict[str, Set[str]] = {}
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.root_dir, CACHE_DIR, GRAPH_FILE)
+
+    @classmethod
+    def load(cls, root_dir: str) -> "ImportGraph":
+        """
+        Loads the persisted graph of a project, or returns an empty one.
+
+        Parameters:
+            root_dir (str): Root directory of the project
+        Returns:
+            ImportGraph: The loaded or empty graph
+        """
+        graph = cls(root_dir)
+        try:
+            with open(graph.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return graph
+        if isinstance(data, dict) and data.get("version") == GRAPH_VERSION:
+            graph._entries = data.get("files", {})
+        return graph
+
+    def update(
+        self, python_files: Iterable[str], max_workers: Optional[int] = None
+    ) -> None:
+        """
+        Brings the graph up to date with the current content of a set of
+        files. Files not listed are dropped from the graph.
+
+        Parameters:
+            python_files (Iterable[str]): Relative paths of all Python files
+            max_workers (Optional[int]): Size of the parsing process pool
+        Returns:
+            None
+        """
+        previous = self._current
+        self._current = {}
+        stale: List[Tuple[str, List[int], str]] = []
+        for python_file in python_files:
+            path = os.path.join(self.root_dir, python_file)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = [stat.st_mtime_ns, stat.st_size]
+            if stat.st_mtime_ns >= self._started_ns - RACY_WINDOW_NS:
+                signature = [0, 0]
+
+            entry = previous.get(python_file) or self._entries.get(python_file)
+            if entry is not None and signature[0] and entry[0] == signature:
+                self._current[python_file] = entry
+                continue
+
+            with open(path, "rb") as file:
+                source = file.read()
+            digest = hashlib.blake2b(source, digest_size=16).hexdigest()
+            if entry is not None and entry[1] == digest:
+                self._current[python_file] = [signature, digest, entry[2]]
+            else:
+                stale.append((python_file, signature, digest))
+
+        jobs = [
+            (
+                os.path.join(self.root_dir, python_file),
+                module_name(python_file),
+                os.path.basename(python_file) == "__init__.py",
+            )
+            for python_file, _, _ in stale
+        ]
+        if len(jobs) < PARALLEL_THRESHOLD:
+            parsed = [_parse_file(*job) for job in jobs]
+        else:
+            workers = max_workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                parsed = list(
+                    pool.map(
+                        _parse_file,
+                        *zip(*jobs),
+                        chunksize=max(1, len(jobs) // (4 * workers)),
+                    )
+                )
+
+        for (python_file, signature, digest), imports in zip(stale, parsed):
+            self._current[python_file] = [signature, digest, imports]
+        self._reindex(previous)
+
+    def _reindex(self, previous: Dict[str, List]) -> None:
+        """
+        Patches the import names, the files owning each module name and the
+        importers of each module name for the files added, removed or with
+        changed imports since previous.
+        """
+        packages = {
+            os.path.dirname(python_file)
+            for python_file in self._current
+            if os.path.basename(python_file) == "__init__.py"
+        }
+        if packages != self._packages:
+            # Adding or removing a package renames every file below it.
+            self._packages = packages
+            self._names = {
+                python_file: import_names(python_file, packages)
+                for python_file in self._current
+            }
+            self._owners = {}
+            for python_file, names in self._names.items():
+                for name in names:
+                    self._owners.setdefault(name, set()).add(python_file)
+        else:
+            for python_file in previous.keys() - self._current.keys():
+                for name in self._names.pop(python_file):
+                    owners = self._owners[name]
+                    owners.discard(python_file)
+                    if not owners:
+                        del self._owners[name]
+            for python_file in self._current.keys() - previous.keys():
+                names = self._names[python_file] = import_names(python_file, packages)
+                for name in names:
+                    self._owners.setdefault(name, set()).add(python_file)
+
+        for python_file, entry in previous.items():
+            current = self._current.get(python_file)
+            if current is not None and current[2] == entry[2]:
+                continue
+            for name in entry[2]:
+                importers = self._importers.get(name)
+                if importers is not None:
+                    importers.discard(python_file)
+                    if not importers:
+                        del self._importers[name]
+        for python_file, entry in self._current.items():
+            old = previous.get(python_file)
+            if old is not None and old[2] == entry[2]:
+                continue
+            for name in entry[2]:
+                self._importers.setdefault(name, set()).add(python_file)
+
+    def save(self) -> None:
+        """
+        Atomically writes the graph to disk. Failures are ignored since the
+        graph is rebuilt from the sources when it is missing.
+
+        Returns:
+            None
+        """
+        data = {"version": GRAPH_VERSION, "files": self._current}
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            make_state_dir(os.path.dirname(self.path))
+            with open(temp_path, "w") as file:
+                json.dump(data, file, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def files(self) -> List[str]:
+        """Returns the files of the graph."""
+        return list(self._current)
+
+    def imports(self, python_file: str) -> List[str]:
+        """Returns the module names a file of the graph imports."""
+        entry = self._current.get(python_file)
+        return entry[2] if entry is not None else []
+
+    def dependencies(self, python_files: Iterable[str]) -> Set[str]:
+        """
+        Returns every file of the graph that one of the given files imports,
+        directly or through other files, including the given files.
+
+        Parameters:
+            python_files (Iterable[str]): Relative paths of files of the graph
+        Returns:
+            Set[str]: Relative paths of the imported files
+        """
+        seen: Set[str] = set(python_files)
+        queue: Deque[str] = deque(seen)
+        while queue:
+            for name in self.imports(queue.popleft()):
+                for owner in self._owners.get(name, ()):
+                    if owner not in seen:
+                        seen.add(owner)
+                        queue.append(owner)
+        return seen
+
+    def dependents(
+        self, changed_files: Iterable[str], removed_files: Iterable[str] = ()
+    ) -> Set[str]:
+        """
+        Returns every file of the graph that imports one of the changed files,
+        directly or through other files, including the changed files.
+
+        Parameters:
+            changed_files (Iterable[str]): Relative paths of changed files
+            removed_files (Iterable[str]): Relative paths of deleted files,
+                whose importers are affected even though they are gone
+        Returns:
+            Set[str]: Relative paths of the affected files
+        """
+        removed = set(removed_files)
+        seen: Set[str] = set(changed_files) | removed
+        queue: Deque[str] = deque(seen)
+        while queue:
+            python_file = queue.popleft()
+            names = self._names.get(python_file)
+            if names is None:
+                if python_file not in removed:
+                    continue
+                names = import_names(python_file, self._packages or ())
+            for name in names:
+                for importer in self._importers.get(name, ()):
+                    if importer not in seen:
+                        seen.add(importer)
+                        queue.append(importer)
+        return seen
+
+
+def impacted_test_files(
+    graph: ImportGraph,
+    changed_files: Iterable[str],
+    removed_files: Iterable[str] = (),
+    tests_dirname: str = "tests",
+) -> List[str]:
+    """
+    Returns the test files that transitively import any changed file. An
+    affected `conftest.py` affects every test file below its directory.
+
+    Parameters:
+        graph (ImportGraph): Up-to-date import graph of the project
+        changed_files (Iterable[str]): Relative paths of changed files
+        removed_files (Iterable[str]): Relative paths of deleted files
+        tests_dirname (str): Name of the tests directory in the project root
+    Returns:
+        List[str]: Sorted relative paths of the affected test files
+    """
+    affected = graph.dependents(changed_files, removed_files)
+    conftest_dirs = [
+        os.path.dirname(python_file)
+        for python_file in affected
+        if os.path.basename(python_file) == "conftest.py"
+    ]
+
+    selected: Set[str] = set()
+    for python_file in graph.files():
+        if not in_tests_directory(python_file, tests_dirname):
+            continue
+        if not os.path.basename(python_file).startswith("test_"):
+            continue
+        # A root conftest.py has the directory "", which holds every test.
+        if python_file in affected or any(
+            not directory or python_file.startswith(directory + os.sep)
+            for directory in conftest_dirs
+        ):
+            selected.add(python_file)
+    return sorted(selected)
+
+
+def _parse_file(path: str, module: str, is_package: bool) -> List[str]:
+    """Reads and parses one module; runs in the worker processes."""
+    with open(path, "rb") as file:
+        return parse_imports(file.read(), module, is_package)
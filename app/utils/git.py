@@ -0,0 +1,245 @@
+"""
+Git helpers for incremental PytestMate commands.
+
+This module wraps the few git plumbing calls PytestMate needs to list the
+Python files of a repository and its submodules, and to find out what changed
+in a working tree so commands can limit their work to those files instead of
+rescanning the whole project.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Iterator, List, NamedTuple, Optional
+
+READ_CHUNK_SIZE: int = 1 << 16
+
+
+class FileChange(NamedTuple):
+    """
+    A file changed between a git ref and the working tree.
+
+    status is one of "A" (added), "M" (modified), "D" (deleted) or
+    "R" (renamed, in which case old_path holds the previous path).
+    """
+
+    status: str
+    path: str
+    old_path: Optional[str] = None
+
+
+def ensure_git_repo(root_dir: str) -> None:
+    """
+    Checks that git is installed and root_dir is a git repository.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+    Returns:
+        None
+    Raises:
+        RuntimeError: If git is not installed
+        ModuleNotFoundError: If root_dir is not a git repository
+    """
+    if not shutil.which("git"):
+        raise RuntimeError("Git is not installed on the system.")
+    if not os.path.exists(os.path.join(root_dir, ".git")):
+        raise ModuleNotFoundError(f"{root_dir} is not a git repo.")
+
+
+def run_git(root_dir: str, *args: str) -> bytes:
+    """
+    Runs a git command in root_dir and returns its raw output.
+
+    Parameters:
+        root_dir (str): Directory to run git in
+        args (str): Arguments passed to git
+    Returns:
+        bytes: Standard output of the command
+    Raises:
+        RuntimeError: If the command fails
+    """
+    try:
+        return subprocess.check_output(
+            ["git", "-C", root_dir, *args], stderr=subprocess.PIPE
+        )
+    except subprocess.CalledProcessError as error:
+        message = error.stderr.decode(errors="replace").strip() if error.stderr else ""
+        raise RuntimeError(f"git {args[0]} failed: {message}") from error
+
+
+def iter_git_python_files(root_dir: str) -> Iterator[str]:
+    """
+    Yields the Python files git knows about in a repository and, recursively,
+    in its checked-out submodules.
+
+    A single `git ls-files` call lists both tracked files and untracked files
+    that aren't ignored. Its NUL-delimited output is parsed while it streams
+    in, so paths with spaces, quotes or non-ASCII characters come through
+    unchanged. Submodules are listed by one git process each, all running
+    concurrently with the listing of the parent repository.
+
+    Parameters:
+        root_dir (str): Root directory of the git repository
+    Returns:
+        Iterator[str]: Relative paths of the Python files
+    Raises:
+        RuntimeError: If a git command fails
+    """
+    submodules = _get_submodule_paths(root_dir)
+    if not submodules:
+        yield from _ls_python_files(root_dir)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(len(submodules), 8)) as pool:
+        futures: List[Future] = [
+            pool.submit(_list_submodule, root_dir, submodule)
+            for submodule in submodules
+        ]
+        yield from _ls_python_files(root_dir)
+        for future in futures:
+            yield from future.result()
+
+
+def _list_submodule(root_dir: str, submodule: str) -> List[str]:
+    """Lists a submodule's Python files, relative to the parent repository."""
+    return [
+        os.path.join(submodule, path)
+        for path in iter_git_python_files(os.path.join(root_dir, submodule))
+    ]
+
+
+def _get_submodule_paths(root_dir: str) -> List[str]:
+    """Returns the paths of the submodules of a repository that are checked out."""
+    if not os.path.isfile(os.path.join(root_dir, ".gitmodules")):
+        return []
+
+    try:
+        output = run_git(
+            root_dir,
+            "config",
+            "-z",
+            "--file",
+            ".gitmodules",
+            "--get-regexp",
+            r"^submodule\..*\.path$",
+        )
+    except RuntimeError:
+        return []
+
+    paths: List[str] = []
+    for record in output.split(b"\0"):
+        if b"\n" not in record:
+            continue
+        path = os.fsdecode(record.split(b"\n", 1)[1])
+        if os.path.exists(os.path.join(root_dir, path, ".git")):
+            paths.append(path)
+    return paths
+
+
+def _ls_python_files(root_dir: str) -> Iterator[str]:
+    """Streams the tracked and untracked, non-ignored Python files of one repository."""
+    # Errors go to a file rather than a pipe, which could fill up unread.
+    stderr = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        [
+            "git",
+            "-C",
+            root_dir,
+            "ls-files",
+            "-z",
+            "--cached",
+            "--others",
+            "--exclude-standard",
+            "--",
+            "*.py",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=stderr,
+    )
+
+    assert process.stdout is not None
+    try:
+        previous: Optional[str] = None
+        for path in _split_nul(process.stdout):
+            # Unmerged paths are listed once per conflict stage.
+            if path != previous:
+                yield path
+            previous = path
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+        stderr.seek(0)
+        message = stderr.read().decode(errors="replace").strip()
+        stderr.close()
+
+    if returncode != 0:
+        raise RuntimeError(f"Could not filter files using git: {message}")
+
+
+def _split_nul(stream: IO[bytes]) -> Iterator[str]:
+    """Splits a binary stream on NUL bytes as it is read."""
+    pending = b""
+    while True:
+        chunk = stream.read1(READ_CHUNK_SIZE)  # type: ignore[attr-defined]
+        if not chunk:
+            break
+        *fields, pending = (pending + chunk).split(b"\0")
+        for field in fields:
+            yield os.fsdecode(field)
+    if pending:
+        yield os.fsdecode(pending)
+
+
+def get_changed_files(root_dir: str, ref: str) -> List[FileChange]:
+    """
+    Returns the files that differ between ref and the working tree,
+    including staged changes and untracked files that aren't ignored.
+    Renames are detected by git.
+
+    Parameters:
+        root_dir (str): Root directory of the git repository
+        ref (str): Commit, branch or tag to compare against
+    Returns:
+        List[FileChange]: Changed files, relative to root_dir
+    Raises:
+        RuntimeError: If git is missing or a git command fails
+        ModuleNotFoundError: If root_dir is not a git repository
+    """
+    ensure_git_repo(root_dir)
+
+    diff = run_git(root_dir, "diff", "--name-status", "-z", "-M", ref, "--")
+    fields = [os.fsdecode(field) for field in diff.split(b"\0") if field]
+    changes: List[FileChange] = []
+
+    position = 0
+    while position < len(fields):
+        status = fields[position][0]
+        if status in ("R", "C"):
+            old_path, path = fields[position + 1], fields[position + 2]
+            position += 3
+            if status == "R":
+                changes.append(FileChange("R", path, old_path))
+            else:
+                changes.append(FileChange("A", path))
+            continue
+
+        path = fields[position + 1]
+        position += 2
+        if status == "D":
+            changes.append(FileChange("D", path))
+        elif status == "A":
+            changes.append(FileChange("A", path))
+        else:
+            changes.append(FileChange("M", path))
+
+    untracked = run_git(root_dir, "ls-files", "-z", "--others", "--exclude-standard")
+    for field in untracked.split(b"\0"):
+        if field:
+            changes.append(FileChange("A", os.fsdecode(field)))
+
+    return changes
@@ -0,0 +1,164 @@
+"""
+Layered ignore rules for Python project trees.
+
+This module resolves ignore patterns the way git does: patterns from
+`.git/info/exclude` apply first, followed by the root `.gitignore` (or the
+bundled template when the project has none) and then every nested `.gitignore`
+on the way down to a directory. Later patterns take precedence, so a nested
+file can re-include what an ancestor excluded, except below a directory that is
+itself excluded. The `.git` and `.ptm` directories are always ignored.
+
+The combined matcher for a directory is compiled once into an `IgnoreMatcher`
+and shared by all of its entries. Directories without a `.gitignore` of their
+own reuse their parent's matcher. Long-running callers such as the watcher
+call `invalidate` when a `.gitignore` changes, so the affected matchers are
+compiled again from the new patterns.
+"""
+
+import os
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional
+
+from .matcher import IgnoreMatcher
+
+if TYPE_CHECKING:
+    from pathspec import PathSpec
+
+GITIGNORE: str = ".gitignore"
+ALWAYS_IGNORED: FrozenSet[str] = frozenset({".git", ".ptm"})
+
+
+class IgnoreRules:
+    """
+    Git-accurate ignore rules for the tree rooted at root_dir.
+
+    All paths given to and returned by this class are relative to root_dir.
+    The root_spec holds the patterns of the root ignore file, as returned by
+    `get_ignore_spec`.
+    """
+
+    def __init__(self, root_dir: str, root_spec: "PathSpec") -> None:
+        self.root_dir: str = root_dir
+        self.root_spec: "PathSpec" = root_spec
+        self._specs: Dict[str, IgnoreMatcher] = {}
+
+    def spec_for(
+        self, rel_dir: str, has_gitignore: Optional[bool] = None
+    ) -> IgnoreMatcher:
+        """
+        Returns the combined matcher for the entries of a directory.
+
+        Parameters:
+            rel_dir (str): Directory relative to the root, "" for the root itself
+            has_gitignore (Optional[bool]): Whether the directory is known to
+                contain a `.gitignore`. Saves a failed open when the caller has
+                already listed the directory.
+        Returns:
+            IgnoreMatcher: Matcher for root-relative paths of the directory's
+            entries
+        """
+        spec = self._specs.get(rel_dir)
+        if spec is not None:
+            return spec
+
+        if not rel_dir:
+            exclude_path = os.path.join(self.root_dir, ".git", "info", "exclude")
+            patterns = _compile(_read_lines(exclude_path))
+            spec = IgnoreMatcher(patterns + list(self.root_spec.patterns))
+        else:
+            parent = self.spec_for(os.path.dirname(rel_dir))
+            lines: List[str] = []
+            if has_gitignore is not False:
+                lines = _read_lines(os.path.join(self.root_dir, rel_dir, GITIGNORE))
+            patterns = _compile(_rebase_lines(lines, rel_dir))
+            spec = IgnoreMatcher(parent.patterns + patterns) if patterns else parent
+
+        self._specs[rel_dir] = spec
+        return spec
+
+    def invalidate(self, rel_dir: str, root_spec: Optional["PathSpec"] = None) -> None:
+        """
+        Drops the compiled matchers of a directory and of every directory
+        below it, which inherit its patterns, after its `.gitignore` changed.
+
+        Parameters:
+            rel_dir (str): Directory whose ignore file changed, "" for the root
+            root_spec (Optional[PathSpec]): New patterns of the root ignore
+                file, when it is the one that changed
+        Returns:
+            None
+        """
+        if root_spec is not None:
+            self.root_spec = root_spec
+        if not rel_dir:
+            self._specs.clear()
+            return
+        prefix = rel_dir + os.sep
+        for directory in [
+            d for d in self._specs if d == rel_dir or d.startswith(prefix)
+        ]:
+            del self._specs[directory]
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """
+        Returns true if a path is ignored by itself or through an ancestor.
+
+        Parameters:
+            rel_path (str): Path relative to the root
+            is_dir (bool): Whether the path is a directory
+        Returns:
+            bool: True if the path is ignored, else false
+        """
+        parts = os.path.normpath(rel_path).split(os.sep)
+        parent = ""
+        for part in parts[:-1]:
+            current = os.path.join(parent, part)
+            if part in ALWAYS_IGNORED or self.spec_for(parent).match_file(
+                current + "/"
+            ):
+                return True
+            parent = current
+
+        if parts[-1] in ALWAYS_IGNORED:
+            return True
+        return self.spec_for(parent).match_file(rel_path + ("/" if is_dir else ""))
+
+
+def _read_lines(path: str) -> List[str]:
+    """Returns the lines of an ignore file, or no lines if it can't be read."""
+    try:
+        with open(path, "r") as file:
+            return file.read().splitlines()
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return []
+
+
+def _compile(lines: Iterable[str]) -> List:
+    """Compiles gitignore lines into pathspec patterns, dropping no-op lines."""
+    from pathspec import PathSpec
+
+    spec = PathSpec.from_lines(pattern_factory="gitwildmatch", lines=lines)
+    return [pattern for pattern in spec.patterns if pattern.include is not None]
+
+
+def _rebase_lines(lines: Iterable[str], rel_dir: str) -> List[str]:
+    """
+    Rewrites the lines of a nested `.gitignore` so they match paths relative
+    to the project root instead of the directory holding the file.
+    """
+    base = rel_dir.replace(os.sep, "/").strip("/")
+    rebased: List[str] = []
+
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+
+        negate = line.startswith("!")
+        body = line[1:] if negate else line
+        if "/" in body.rstrip("/"):
+            body = f"{base}/{body.lstrip('/')}"
+        else:
+            body = f"{base}/**/{body}"
+
+        rebased.append(f"!{body}" if negate else body)
+
+    return rebased
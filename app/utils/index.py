@@ -0,0 +1,240 @@
+"""
+Persistent file index for incremental Python file discovery.
+
+The index lives under `.ptm/cache` in the project root and remembers, for every
+directory visited by the last walk, the Python files and subdirectories it
+contained together with the directory's modification time and inode. On the
+next run a directory whose stat is unchanged is reused without listing it, so a
+warm discovery only stats directories.
+
+Everything ptm keeps in a project lives under `.ptm`, which `make_state_dir`
+creates with a `.gitignore` of its own, so none of it shows up in git.
+
+The whole index is discarded when the root ignore rules change. A directory is
+listed again when its own `.gitignore` changes, and so are all of its
+descendants because their matchers depend on it. Directories modified within
+the last couple of seconds of a scan are never trusted, since a change in the
+same timestamp tick would not move their mtime.
+"""
+
+import hashlib
+import json
+import os
+import time
+from importlib.resources import files as package_files
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ignore import GITIGNORE
+
+STATE_DIR: str = ".ptm"
+CACHE_DIR: str = os.path.join(STATE_DIR, "cache")
+INDEX_FILE: str = "files.json"
+INDEX_VERSION: int = 1
+RACY_WINDOW_NS: int = 2_000_000_000
+
+
+def make_state_dir(directory: str) -> None:
+    """
+    Creates a directory, and when it lies in a project's `.ptm` directory,
+    a `.ptm/.gitignore` ignoring everything in it, the way `.pytest_cache`
+    does. The project's own ignore files are left alone.
+
+    Parameters:
+        directory (str): Directory to create
+    Returns:
+        None
+    Raises:
+        OSError: If the directory can't be created
+    """
+    os.makedirs(directory, exist_ok=True)
+    state_dir = os.path.abspath(directory)
+    while os.path.basename(state_dir) != STATE_DIR:
+        parent = os.path.dirname(state_dir)
+        if parent == state_dir:
+            return
+        state_dir = parent
+
+    try:
+        fd = os.open(
+            os.path.join(state_dir, GITIGNORE), os.O_WRONLY | os.O_CREAT | os.O_EXCL
+        )
+    except OSError:
+        return
+    with os.fdopen(fd, "w") as file:
+        file.write("# Created by ptm.\n*\n")
+
+
+def rules_fingerprint(root_dir: str) -> str:
+    """
+    Returns a hash of the ignore rules that apply to the whole tree.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+    Returns:
+        str: Hex digest over `.git/info/exclude` and the root ignore file
+    """
+    digest = hashlib.sha256()
+    for path in (
+        os.path.join(root_dir, ".git", "info", "exclude"),
+        os.path.join(root_dir, GITIGNORE),
+    ):
+        try:
+            with open(path, "rb") as file:
+                digest.update(file.read())
+        except OSError:
+            digest.update(b"\0missing\0")
+
+    if not os.path.exists(os.path.join(root_dir, GITIGNORE)):
+        template = package_files("app.templates").joinpath("python.gitignore")
+        digest.update(template.read_bytes())
+
+    return digest.hexdigest()
+
+
+class FileIndex:
+    """
+    On-disk record of the last discovery walk of a project.
+
+    Entries are keyed by directory path relative to the project root. Only
+    directories visited during the current run are written back, so removed
+    directories drop out of the index on save.
+    """
+
+    def __init__(self, root_dir: str, fingerprint: str) -> None:
+        self.root_dir: str = root_dir
+        self.fingerprint: str = fingerprint
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._visited: Dict[str, Dict[str, Any]] = {}
+        self._started_ns: int = time.time_ns()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.root_dir, CACHE_DIR, INDEX_FILE)
+
+    @classmethod
+    def load(cls, root_dir: str) -> "FileIndex":
+        """
+        Loads the index of a project, or returns an empty one if there is no
+        usable index on disk.
+
+        Parameters:
+            root_dir (str): Root directory of the project
+        Returns:
+            FileIndex: The loaded or empty index
+        """
+        index = cls(root_dir, rules_fingerprint(root_dir))
+        try:
+            with open(index.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return index
+
+        if (
+            isinstance(data, dict)
+            and data.get("version") == INDEX_VERSION
+            and data.get("rules") == index.fingerprint
+        ):
+            index._entries = data.get("dirs", {})
+        return index
+
+    def lookup(self, rel_dir: str) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        Returns the cached listing of a directory if it is still valid.
+
+        Parameters:
+            rel_dir (str): Directory relative to the project root
+        Returns:
+            Optional[Tuple[List[str], List[str]]]: Python file names and
+            subdirectory names, or None if the directory must be listed
+        """
+        entry = self._entries.get(rel_dir)
+        if entry is None or entry.get("stat") is None:
+            return None
+        if entry["stat"] != self._stat(rel_dir):
+            return None
+        # Creating or deleting a .gitignore moves the directory's mtime, so the
+        # file itself only needs a stat when the previous walk saw one.
+        if entry.get("ignore") is not None and entry["ignore"] != self._stat(
+            os.path.join(rel_dir, GITIGNORE)
+        ):
+            return None
+
+        self._visited[rel_dir] = entry
+        return entry["files"], entry["subdirs"]
+
+    def ignore_changed(self, rel_dir: str) -> bool:
+        """
+        Returns true if the `.gitignore` of a directory differs from the one
+        seen by the previous walk, which invalidates every descendant.
+
+        Parameters:
+            rel_dir (str): Directory relative to the project root
+        Returns:
+            bool: True if the directory's ignore file changed, else false
+        """
+        entry = self._entries.get(rel_dir)
+        if entry is None:
+            return False
+        return entry.get("ignore") != self._stat(os.path.join(rel_dir, GITIGNORE))
+
+    def record(self, rel_dir: str, files: List[str], subdirs: List[str]) -> None:
+        """
+        Stores a fresh listing of a directory.
+
+        Parameters:
+            rel_dir (str): Directory relative to the project root
+            files (List[str]): Names of the non-ignored Python files
+            subdirs (List[str]): Names of the non-ignored subdirectories
+        Returns:
+            None
+        """
+        stat = self._stat(rel_dir)
+        ignore = self._stat(os.path.join(rel_dir, GITIGNORE))
+        if stat is not None and self._is_racy(stat):
+            stat = None
+        if ignore is not None and self._is_racy(ignore):
+            ignore = [0, 0, 0]
+
+        self._visited[rel_dir] = {
+            "stat": stat,
+            "ignore": ignore,
+            "files": files,
+            "subdirs": subdirs,
+        }
+
+    def save(self) -> None:
+        """
+        Atomically writes the directories visited during this run to disk.
+        Failures are ignored since the index is only an optimization.
+
+        Returns:
+            None
+        """
+        data = {
+            "version": INDEX_VERSION,
+            "rules": self.fingerprint,
+            "dirs": self._visited,
+        }
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            make_state_dir(os.path.dirname(self.path))
+            with open(temp_path, "w") as file:
+                json.dump(data, file, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def _is_racy(self, stat: List[int]) -> bool:
+        """Returns true if a stat is too recent to detect later changes."""
+        return stat[0] >= self._started_ns - RACY_WINDOW_NS
+
+    def _stat(self, rel_path: str) -> Optional[List[int]]:
+        """Returns the mtime, inode and device of a path, or None if missing."""
+        try:
+            stat = os.stat(os.path.join(self.root_dir, rel_path))
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_ino, stat.st_dev]
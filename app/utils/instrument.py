@@ -0,0 +1,182 @@
+"""
+Phase timers and operation counters for `ptm --timings`.
+
+Workspace operations report what they do through `phase`, `timed` and
+`count`. Until a `Recorder` is enabled these return immediately: `phase`
+hands back a shared no-op context manager, `timed` returns its iterator
+unchanged and `count` is a single global check, so instrumented code runs
+at full speed by default.
+
+Phases nest. The time of a phase excludes the phases nested in it, so every
+moment is attributed to exactly one phase and the phase times add up. Only
+the thread that enabled the recorder records phases; phases opened on other
+threads, such as the writers of a thread pool, are ignored. Counters are
+shared by all threads.
+"""
+
+import contextlib
+import threading
+import time
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+_NULL_PHASE: ContextManager[None] = contextlib.nullcontext()
+_recorder: Optional["Recorder"] = None
+
+
+class Recorder:
+    """
+    Collects the time spent per phase and the value of each counter.
+    """
+
+    def __init__(self) -> None:
+        self.started: float = time.perf_counter()
+        self.thread: int = threading.get_ident()
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counts: Dict[str, int] = {}
+        self._count_lock = threading.Lock()
+        # Open phases as [name, start time, time spent in nested phases].
+        self._stack: List[List[Any]] = []
+
+    def start(self, name: str) -> None:
+        """Opens a phase, pausing the phase it is nested in."""
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def stop(self) -> None:
+        """Closes the innermost phase and adds its own time to its total."""
+        name, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - nested
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def total(self) -> float:
+        """Returns the seconds elapsed since the recorder was created."""
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the recorded timings and counters as JSON-ready data."""
+        return {
+            "total_seconds": self.total(),
+            "phases": {
+                name: {"seconds": seconds, "calls": self.calls[name]}
+                for name, seconds in self.seconds.items()
+            },
+            "counters": dict(self.counts),
+        }
+
+    def format_table(self) -> str:
+        """Returns the recorded timings and counters as a text table."""
+        total = self.total()
+        other = max(0.0, total - sum(self.seconds.values()))
+        lines = [f"{'phase':<24}{'calls':>8}{'time (ms)':>12}{'share':>8}"]
+        for name, seconds in [*self.seconds.items(), ("other", other)]:
+            calls = str(self.calls[name]) if name in self.calls else ""
+            share = seconds / total if total else 0.0
+            lines.append(f"{name:<24}{calls:>8}{seconds * 1000:12.1f}{share:8.1%}")
+        lines.append(f"{'total':<24}{'':>8}{total * 1000:12.1f}")
+        if self.counts:
+            lines.append("")
+            lines.append(f"{'counter':<32}{'value':>12}")
+            for name, value in self.counts.items():
+                lines.append(f"{name:<32}{value:>12}")
+        return "\n".join(lines)
+
+
+def enable() -> Recorder:
+    """
+    Starts recording phases and counters on the current thread.
+
+    Returns:
+        Recorder: The recorder that collects from now on
+    """
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+
+def disable() -> None:
+    """Stops recording; instrumented code becomes a no-op again."""
+    global _recorder
+    _recorder = None
+
+
+def phase(name: str) -> ContextManager[None]:
+    """
+    Returns a context manager that attributes the time spent inside it to
+    the named phase.
+
+    Parameters:
+        name (str): Name of the phase
+    Returns:
+        ContextManager[None]: Timer for the phase, or a no-op when disabled
+    """
+    recorder = _recorder
+    if recorder is None or threading.get_ident() != recorder.thread:
+        return _NULL_PHASE
+    return _timed_phase(recorder, name)
+
+
+def timed(name: str, items: Iterable[T]) -> Iterable[T]:
+    """
+    Attributes the time spent producing each item of a lazy iterable to the
+    named phase, so a generator consumed piecemeal is timed only while it
+    runs.
+
+    Parameters:
+        name (str): Name of the phase
+        items (Iterable[T]): Iterable to time
+    Returns:
+        Iterable[T]: The same items, or items itself when disabled
+    """
+    recorder = _recorder
+    if recorder is None or threading.get_ident() != recorder.thread:
+        return items
+    return _timed_iter(recorder, name, iter(items))
+
+
+def count(name: str, amount: int = 1) -> None:
+    """
+    Adds amount to the named counter when recording.
+
+    Parameters:
+        name (str): Name of the counter
+        amount (int): Value to add
+    """
+    recorder = _recorder
+    if recorder is not None:
+        with recorder._count_lock:
+            recorder.counts[name] = recorder.counts.get(name, 0) + amount
+
+
+@contextlib.contextmanager
+def _timed_phase(recorder: Recorder, name: str) -> Iterator[None]:
+    recorder.start(name)
+    try:
+        yield
+    finally:
+        recorder.stop()
+
+
+def _timed_iter(recorder: Recorder, name: str, iterator: Iterator[T]) -> Iterator[T]:
+    while True:
+        recorder.start(name)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            recorder.stop()
+        yield item
@@ -0,0 +1,259 @@
+"""
+Streaming JUnit XML aggregation for `ptm report --junit`.
+
+Sharded nightly runs leave JUnit XML files of hundreds of megabytes, mostly
+captured output. Building a DOM of them costs gigabytes, so each file is read
+with `iterparse` instead: every `testcase` is folded into the totals of its
+test file as soon as its end tag is parsed, then removed from the tree. Only
+one test case is held in memory at a time, whatever the size of the input.
+
+Test cases are grouped by test file, recovered from the `file` attribute when
+pytest wrote one and otherwise from the dotted `classname`, and each test file
+is linked to its source file through the naming that `create_test_files`
+uses. Separate files are parsed in parallel processes, since parsing is
+bound by the CPU.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .instrument import phase
+from .workspace import get_source_file_path
+
+OUTCOME_TAGS: Dict[str, str] = {
+    "failure": "failures",
+    "error": "errors",
+    "skipped": "skipped",
+}
+MAX_PARSE_WORKERS: int = os.cpu_count() or 1
+
+
+@dataclass
+class FileResult:
+    """
+    Aggregated results of the test cases of one test file.
+
+    failed lists the node ids of the failing and erroring test cases.
+    """
+
+    path: str
+    tests: int = 0
+    failures: int = 0
+    errors: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    failed: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> int:
+        return self.tests - self.failures - self.errors - self.skipped
+
+    def merge(self, other: "FileResult") -> None:
+        """Adds the results of another shard of the same test file."""
+        self.tests += other.tests
+        self.failures += other.failures
+        self.errors += other.errors
+        self.skipped += other.skipped
+        self.seconds += other.seconds
+        self.failed.extend(other.failed)
+
+
+@dataclass
+class JUnitReport:
+    """
+    Results of one or more JUnit XML files, keyed by test file.
+    """
+
+    files: Dict[str, FileResult] = field(default_factory=dict)
+
+    def merge(self, results: Iterable[FileResult]) -> None:
+        """Adds the results of test files, merging those seen before."""
+        for result in results:
+            known = self.files.get(result.path)
+            if known is None:
+                self.files[result.path] = result
+            else:
+                known.merge(result)
+
+    def totals(self) -> FileResult:
+        """Returns the results of all test files added up."""
+        total = FileResult("")
+        for result in self.files.values():
+            total.merge(result)
+        return total
+
+    def slowest(self, count: int) -> List[FileResult]:
+        """Returns the count test files that took the longest."""
+        return sorted(self.files.values(), key=lambda r: (-r.seconds, r.path))[:count]
+
+    def failing(self) -> List[FileResult]:
+        """Returns the test files with failing or erroring test cases."""
+        return [
+            result
+            for _, result in sorted(self.files.items())
+            if result.failures or result.errors
+        ]
+
+    def to_dict(self, tests_dirname: str = "tests") -> Dict[str, Any]:
+        """Returns the report as JSON-ready data."""
+        total = self.totals()
+        return {
+            "totals": {
+                "files": len(self.files),
+                "tests": total.tests,
+                "passed": total.passed,
+                "failures": total.failures,
+                "errors": total.errors,
+                "skipped": total.skipped,
+                "seconds": round(total.seconds, 6),
+            },
+            "files": [
+                {
+                    "test": result.path,
+                    "source": source_for(result.path, tests_dirname),
+                    "tests": result.tests,
+                    "passed": result.passed,
+                    "failures": result.failures,
+                    "errors": result.errors,
+                    "skipped": result.skipped,
+                    "seconds": round(result.seconds, 6),
+                    "failed": result.failed,
+                }
+                for _, result in sorted(self.files.items())
+            ],
+        }
+
+
+def source_for(test_path: str, tests_dirname: str = "tests") -> Optional[str]:
+    """
+    Returns the source file a root-relative test file is mapped to.
+
+    Parameters:
+        test_path (str): Path of the test file, relative to the project root
+        tests_dirname (str): Name of the tests directory in the project root
+    Returns:
+        Optional[str]: Root-relative path of the source file with `/`
+        separators, or None if the test file doesn't follow the layout
+    """
+    prefix = tests_dirname + "/"
+    if not test_path.startswith(prefix):
+        return None
+    source = get_source_file_path(test_path[len(prefix) :])
+    return source.replace(os.sep, "/") if source is not None else None
+
+
+def parse_junit(path: str) -> List[FileResult]:
+    """
+    Streams one JUnit XML file and aggregates its test cases per test file.
+
+    Parameters:
+        path (str): Path of the JUnit XML file
+    Returns:
+        List[FileResult]: Results of each test file in the XML file
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file isn't well-formed XML
+    """
+    from xml.etree.ElementTree import ParseError, iterparse
+
+    results: Dict[str, FileResult] = {}
+    parents: List[Any] = []
+    try:
+        for event, element in iterparse(path, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            if element.tag != "testcase":
+                continue
+
+            test_file = _test_file(element.get("file"), element.get("classname", ""))
+            result = results.get(test_file)
+            if result is None:
+                result = results[test_file] = FileResult(test_file)
+            _add_case(result, element)
+
+            # Drop the finished case, and its captured output, from the tree.
+            element.clear()
+            if parents:
+                del parents[-1][:]
+    except ParseError as e:
+        raise ValueError(f"{path} is not valid JUnit XML: {e}") from None
+
+    return list(results.values())
+
+
+def aggregate_junit(
+    paths: Sequence[str], max_workers: int = MAX_PARSE_WORKERS
+) -> JUnitReport:
+    """
+    Parses JUnit XML files, in parallel processes when there are several,
+    and merges their results per test file.
+
+    Parameters:
+        paths (Sequence[str]): Paths of the JUnit XML files
+        max_workers (int): Maximum number of files parsed at once
+    Returns:
+        JUnitReport: Merged results
+    Raises:
+        FileNotFoundError: If a file doesn't exist
+        ValueError: If a file isn't well-formed XML
+    """
+    report = JUnitReport()
+    with phase("parse"):
+        workers = min(max_workers, len(paths))
+        if workers <= 1:
+            for path in paths:
+                report.merge(parse_junit(path))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for results in pool.map(parse_junit, paths):
+                    report.merge(results)
+    return report
+
+
+def _test_file(file: Optional[str], classname: str) -> str:
+    """
+    Returns the root-relative test file of a test case. Without a `file`
+    attribute, the last dotted part of the classname naming a test module
+    ends the path: `tests.pkg.test_mod.TestA` is `tests/pkg/test_mod.py`.
+    """
+    if file:
+        return file.replace(os.sep, "/")
+    parts = classname.split(".")
+    for index in range(len(parts) - 1, -1, -1):
+        if parts[index].startswith("test_"):
+            return "/".join(parts[: index + 1]) + ".py"
+    return classname
+
+
+def _add_case(result: FileResult, element: Any) -> None:
+    """Counts one finished `testcase` element into the results of its file."""
+    result.tests += 1
+    try:
+        result.seconds += float(element.get("time", 0) or 0)
+    except ValueError:
+        pass
+
+    for child in element:
+        outcome = OUTCOME_TAGS.get(child.tag)
+        if outcome is None:
+            continue
+        setattr(result, outcome, getattr(result, outcome) + 1)
+        if outcome != "skipped":
+            result.failed.append(_node_id(result.path, element))
+        break
+
+
+def _node_id(test_file: str, element: Any) -> str:
+    """Returns the pytest-style node id of a test case."""
+    classname = element.get("classname", "")
+    module = test_file[: -len(".py")].replace("/", ".")
+    parts = [test_file]
+    if classname.startswith(module + "."):
+        parts.extend(classname[len(module) + 1 :].split("."))
+    parts.append(element.get("name", ""))
+    return "::".join(parts)
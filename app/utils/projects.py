@@ -0,0 +1,185 @@
+"""
+Monorepo support for `ptm init --workspace`.
+
+A workspace is a directory holding many Python projects, each marked by one
+of the project marker files or virtual environment directories that
+`in_python_project` recognizes. `find_projects` finds them all in a single
+walk of the workspace and assigns every Python file to the nearest project
+enclosing it, so nested projects own their own files. Each project gets its
+own `tests/` directory.
+
+The projects are then planned and scaffolded concurrently on a thread pool,
+since the work is dominated by directory listings and file writes.
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .ignore import IgnoreRules
+from .instrument import count, phase
+from .scaffold import ScaffoldPlan, apply_plan, plan_scaffold
+from .workspace import (
+    PROJECT_MARKER_DIRS,
+    PROJECT_MARKER_FILES,
+    MaterializeResult,
+    has_project_marker,
+    match_entries,
+    get_ignore_spec,
+    in_tests_directory,
+)
+
+MAX_PROJECT_WORKERS: int = 8
+PROJECT_WRITE_WORKERS: int = 4
+
+
+def find_projects(root_dir: str, use_git: bool = False) -> Dict[str, List[str]]:
+    """
+    Finds the Python projects below root_dir and the source files of each.
+
+    Without git, one walk of the workspace both detects projects and lists
+    their files, honoring the same ignore rules as `get_python_files`. With
+    git, the files git reports are assigned to the nearest directory holding
+    a project marker. Files outside every project and files in a project's
+    tests directory are left out.
+
+    Parameters:
+        root_dir (str): Root directory of the workspace
+        use_git (bool): Whether to list the files with git
+    Returns:
+        Dict[str, List[str]]: Source files relative to their project, keyed by
+        the project directory relative to root_dir ("" for root_dir itself)
+    Raises:
+        FileNotFoundError: If the workspace directory is not found
+        RuntimeError: If a git command fails
+    """
+    if not os.path.isdir(root_dir):
+        raise FileNotFoundError(f"Directory {root_dir} not found")
+
+    if use_git:
+        from .git import ensure_git_repo, iter_git_python_files
+
+        ensure_git_repo(root_dir)
+        owned = _assign_files(root_dir, iter_git_python_files(root_dir))
+    else:
+        owned = _walk_projects(root_dir)
+
+    projects: Dict[str, List[str]] = {}
+    for project, python_file in owned:
+        rel_path = os.path.relpath(python_file, project) if project else python_file
+        if not in_tests_directory(rel_path):
+            projects.setdefault(project, []).append(rel_path)
+    return dict(sorted(projects.items()))
+
+
+def plan_projects(
+    root_dir: str,
+    projects: Dict[str, List[str]],
+    max_workers: int = MAX_PROJECT_WORKERS,
+) -> Dict[str, ScaffoldPlan]:
+    """
+    Plans the test scaffold of every project concurrently.
+
+    Parameters:
+        root_dir (str): Root directory of the workspace
+        projects (Dict[str, List[str]]): Source files per project, as
+            returned by `find_projects`
+        max_workers (int): Maximum number of projects planned at once
+    Returns:
+        Dict[str, ScaffoldPlan]: Plan of each project
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with phase("plan"), ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        plans = pool.map(
+            lambda item: plan_scaffold(os.path.join(root_dir, item[0]), item[1]),
+            projects.items(),
+        )
+        return dict(zip(projects, plans))
+
+
+def apply_plans(
+    plans: Dict[str, ScaffoldPlan], max_workers: int = MAX_PROJECT_WORKERS
+) -> Dict[str, MaterializeResult]:
+    """
+    Applies the plans of many projects concurrently.
+
+    Parameters:
+        plans (Dict[str, ScaffoldPlan]): Plan of each project
+        max_workers (int): Maximum number of projects written at once
+    Returns:
+        Dict[str, MaterializeResult]: Test files created and already present
+        per project
+    Raises:
+        PermissionError: If a directory or test file can't be written
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with phase("write"), ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        results = pool.map(
+            lambda plan: apply_plan(plan, PROJECT_WRITE_WORKERS), plans.values()
+        )
+        return dict(zip(plans, results))
+
+
+def _walk_projects(root_dir: str) -> List[Tuple[str, str]]:
+    """
+    Walks the workspace once and returns each non-ignored Python file with
+    the project that owns it.
+    """
+    rules = IgnoreRules(root_dir, get_ignore_spec(root_dir))
+    owned: List[Tuple[str, str]] = []
+    stack: List[Tuple[str, Optional[str]]] = [("", None)]
+
+    with phase("walk"):
+        while stack:
+            rel_dir, project = stack.pop()
+            try:
+                with os.scandir(os.path.join(root_dir, rel_dir)) as iterator:
+                    entries: List[os.DirEntry] = list(iterator)
+            except OSError:
+                continue
+
+            if any(_is_marker(entry) for entry in entries):
+                project = rel_dir
+                count("projects found")
+
+            files, subdirs = match_entries(rel_dir, entries, rules)
+            if project is not None:
+                owned.extend((project, os.path.join(rel_dir, name)) for name in files)
+            stack.extend(
+                (os.path.join(rel_dir, name), project) for name in reversed(subdirs)
+            )
+
+    return owned
+
+
+def _is_marker(entry: os.DirEntry) -> bool:
+    """Returns true if a directory entry marks its directory as a project."""
+    try:
+        if entry.name in PROJECT_MARKER_FILES:
+            return entry.is_file()
+        if entry.name in PROJECT_MARKER_DIRS:
+            return entry.is_dir()
+    except OSError:
+        pass
+    return False
+
+
+def _assign_files(root_dir: str, python_files: Iterable[str]) -> List[Tuple[str, str]]:
+    """Pairs each Python file with the nearest project directory above it."""
+    owners: Dict[str, Optional[str]] = {}
+
+    def owner(rel_dir: str) -> Optional[str]:
+        if rel_dir not in owners:
+            if has_project_marker(os.path.join(root_dir, rel_dir)):
+                owners[rel_dir] = rel_dir
+            else:
+                owners[rel_dir] = owner(os.path.dirname(rel_dir)) if rel_dir else None
+        return owners[rel_dir]
+
+    owned: List[Tuple[str, str]] = []
+    for python_file in python_files:
+        project = owner(os.path.dirname(python_file))
+        if project is not None:
+            owned.append((project, python_file))
+    return owned
@@ -0,0 +1,206 @@
+"""
+Incremental reconciliation of source files and test files.
+
+`ptm update` uses this module to bring an existing tests directory back in
+line with the project's sources. The difference between the two trees is
+computed in a single pass over the tests directory and split into test files
+that are missing, test files whose source is gone, and test files that should
+follow a moved or renamed module. Only that difference is applied.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .git import FileChange
+from .workspace import (
+    create_test_files,
+    get_test_file_path,
+    in_tests_directory,
+    is_stub,
+)
+
+
+@dataclass
+class Reconciliation:
+    """
+    Changes needed to make a tests directory match the sources.
+
+    Paths of test files are relative to the tests directory, paths of
+    sources are relative to the project root.
+    """
+
+    missing: Dict[str, str] = field(default_factory=dict)
+    moved: List[Tuple[str, str]] = field(default_factory=list)
+    orphaned: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.missing or self.moved or self.orphaned)
+
+
+def list_test_files(tests_dir: str) -> Set[str]:
+    """
+    Returns every `test_*.py` file below the tests directory.
+
+    Parameters:
+        tests_dir (str): Path to the tests directory
+    Returns:
+        Set[str]: Paths of the test files, relative to tests_dir
+    """
+    test_files: Set[str] = set()
+    stack: List[str] = [""]
+
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(tests_dir, rel_dir)) as iterator:
+                for entry in iterator:
+                    rel_path = os.path.join(rel_dir, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != "__pycache__":
+                            stack.append(rel_path)
+                    elif entry.name.startswith("test_") and entry.name.endswith(".py"):
+                        test_files.add(rel_path)
+        except OSError:
+            continue
+
+    return test_files
+
+
+def reconcile(
+    tests_dir: str, python_files: Iterable[str], tests_dirname: str = "tests"
+) -> Reconciliation:
+    """
+    Compares every source file against one listing of the tests directory.
+
+    A missing and an orphaned test file with the same name are paired up as a
+    move when neither name is ambiguous.
+
+    Parameters:
+        tests_dir (str): Path to the tests directory
+        python_files (Iterable[str]): Relative paths of all source files
+        tests_dirname (str): Name of the tests directory in the project root,
+            whose own files are never treated as sources
+    Returns:
+        Reconciliation: The changes needed
+    """
+    expected: Dict[str, str] = {}
+    for python_file in python_files:
+        if in_tests_directory(python_file, tests_dirname):
+            continue
+        test_file = get_test_file_path(python_file)
+        if test_file is not None:
+            expected[test_file] = python_file
+
+    existing = list_test_files(tests_dir)
+    missing = {
+        test: source for test, source in expected.items() if test not in existing
+    }
+    orphaned = sorted(test for test in existing if test not in expected)
+
+    return _pair_moves(missing, orphaned)
+
+
+def reconcile_changes(
+    tests_dir: str, changes: Iterable[FileChange], tests_dirname: str = "tests"
+) -> Reconciliation:
+    """
+    Computes the changes needed for a set of changed source files only,
+    such as those reported by `git diff` since a ref.
+
+    Parameters:
+        tests_dir (str): Path to the tests directory
+        changes (Iterable[FileChange]): Changed files relative to project root
+        tests_dirname (str): Name of the tests directory in the project root
+    Returns:
+        Reconciliation: The changes needed
+    """
+    result = Reconciliation()
+
+    def test_path(python_file: str) -> Optional[str]:
+        if not python_file.endswith(".py") or in_tests_directory(
+            python_file, tests_dirname
+        ):
+            return None
+        return get_test_file_path(python_file)
+
+    def exists(test_file: str) -> bool:
+        return os.path.exists(os.path.join(tests_dir, test_file))
+
+    for change in changes:
+        new_test = test_path(change.path)
+        if change.status == "D":
+            if new_test is not None and exists(new_test):
+                result.orphaned.append(new_test)
+            continue
+
+        old_test = test_path(change.old_path) if change.old_path else None
+        if old_test is not None and old_test != new_test and exists(old_test):
+            if new_test is not None and not exists(new_test):
+                result.moved.append((old_test, new_test))
+            else:
+                result.orphaned.append(old_test)
+        elif new_test is not None and not exists(new_test):
+            result.missing[new_test] = change.path
+
+    return result
+
+
+def apply_reconciliation(
+    tests_dir: str, result: Reconciliation, prune: bool = False
+) -> List[str]:
+    """
+    Applies a reconciliation to the tests directory. Test files are moved
+    with their content; orphaned test files are only deleted when prune is
+    set, and only while they are still empty or the generated stub, so
+    tests written by hand are never deleted.
+
+    Parameters:
+        tests_dir (str): Path to the tests directory
+        result (Reconciliation): Changes to apply
+        prune (bool): Whether to delete orphaned stubs
+    Returns:
+        List[str]: Orphaned test files that were kept
+    Raises:
+        FileNotFoundError: If the tests directory is not found
+        PermissionError: If the tests directory is not writable
+    """
+    create_test_files(tests_dir, list(result.missing.values()))
+
+    for old_test, new_test in result.moved:
+        destination = os.path.join(tests_dir, new_test)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(os.path.join(tests_dir, old_test), destination)
+
+    kept: List[str] = []
+    for test_file in result.orphaned:
+        path = os.path.join(tests_dir, test_file)
+        if prune and is_stub(path):
+            os.remove(path)
+        else:
+            kept.append(test_file)
+    return kept
+
+
+def _pair_moves(missing: Dict[str, str], orphaned: List[str]) -> Reconciliation:
+    """Pairs missing and orphaned test files that share an unambiguous name."""
+    missing_by_name: Dict[str, List[str]] = {}
+    for test_file in missing:
+        missing_by_name.setdefault(os.path.basename(test_file), []).append(test_file)
+    orphaned_by_name: Dict[str, List[str]] = {}
+    for test_file in orphaned:
+        orphaned_by_name.setdefault(os.path.basename(test_file), []).append(test_file)
+
+    result = Reconciliation()
+    for name, candidates in orphaned_by_name.items():
+        targets = missing_by_name.get(name, [])
+        if len(candidates) == 1 and len(targets) == 1:
+            result.moved.append((candidates[0], targets[0]))
+            del missing[targets[0]]
+        else:
+            result.orphaned.extend(candidates)
+
+    result.missing = missing
+    result.orphaned.sort()
+    result.moved.sort()
+    return result
@@ -0,0 +1,275 @@
+"""
+Content-addressed test result cache for `ptm test --cache`.
+
+A test file's outcome is a function of its inputs: the test file itself, the
+source module it is mapped to by the naming `create_test_files` uses, the
+`conftest.py` files above it, every project file those import directly or
+transitively according to the import graph, and the project's lockfiles,
+plus the Python version and the pytest arguments of the run. Those are
+hashed into a key, and a test file that passed with the same key before is
+reported as cached instead of being run again. Only passes are cached, so a
+failing test file always runs.
+
+Dependencies the import graph can't see, such as modules loaded by name with
+`importlib`, data files or plugins outside the project, are not part of the
+key; a test depending on them may be reported as cached after they change.
+
+Each pass is one small file under `.ptm/cache/results` named by its key.
+Looking a test file up touches the entry's modification time, which keeps
+the entries ordered by last use; when the directory grows past its size cap,
+the least recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .index import CACHE_DIR, make_state_dir
+from .junit import parse_junit
+from .worker import lockfile_fingerprint
+from .workspace import get_source_file_path
+
+if TYPE_CHECKING:
+    from .depgraph import ImportGraph
+
+RESULTS_DIR: str = os.path.join(CACHE_DIR, "results")
+RESULTS_VERSION: int = 1
+MAX_CACHE_BYTES: int = 32 * 1024 * 1024
+EVICT_TO: float = 0.75
+
+
+class ResultCache:
+    """
+    Passing test files of a project, keyed by a hash of their inputs.
+
+    Keys are computed once per test file and run, so a file that changes
+    while its tests run is stored under the inputs it was run with.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        args: Sequence[str] = (),
+        max_bytes: int = MAX_CACHE_BYTES,
+        tests_dirname: str = "tests",
+        graph: Optional["ImportGraph"] = None,
+    ) -> None:
+        self.root_dir: str = root_dir
+        self.max_bytes: int = max_bytes
+        self.tests_dirname: str = tests_dirname
+        self.graph: Optional["ImportGraph"] = graph
+        self.directory: str = os.path.join(root_dir, RESULTS_DIR)
+        self._keys: Dict[str, str] = {}
+        self._digests: Dict[str, bytes] = {}
+
+        digest = hashlib.sha256(f"ptm-results-{RESULTS_VERSION}\0".encode())
+        digest.update(sys.version.encode() + b"\0")
+        digest.update("\0".join(args).encode("utf-8", "surrogateescape") + b"\0")
+        digest.update(lockfile_fingerprint(root_dir).encode())
+        self._base: bytes = digest.digest()
+
+    def key(self, test_file: str) -> str:
+        """
+        Returns the hash of the inputs of a test file.
+
+        Parameters:
+            test_file (str): Path of the test file, relative to the project root
+        Returns:
+            str: Hex digest that changes whenever one of the inputs changes
+        """
+        key = self._keys.get(test_file)
+        if key is not None:
+            return key
+
+        digest = hashlib.sha256(self._base)
+        for path in self._inputs(test_file):
+            digest.update(path.encode("utf-8", "surrogateescape") + b"\0")
+            digest.update(self._digest(path))
+        key = self._keys[test_file] = digest.hexdigest()
+        return key
+
+    def partition(self, test_files: Sequence[str]) -> Tuple[List[str], List[str]]:
+        """
+        Splits test files into those with a cached pass and those to run,
+        marking the cached ones as recently used.
+
+        Parameters:
+            test_files (Sequence[str]): Test files relative to the project root
+        Returns:
+            Tuple[List[str], List[str]]: The cached and the uncached test files
+        """
+        cached: List[str] = []
+        uncached: List[str] = []
+        for test_file in test_files:
+            try:
+                os.utime(self._entry(self.key(test_file)))
+                cached.append(test_file)
+            except OSError:
+                uncached.append(test_file)
+        return cached, uncached
+
+    def store(self, passed: Dict[str, float]) -> None:
+        """
+        Records passing test files, then evicts the least recently used
+        entries if the cache is over its size cap.
+
+        Parameters:
+            passed (Dict[str, float]): Seconds per passing test file
+        Returns:
+            None
+        """
+        if not passed:
+            return
+        make_state_dir(self.directory)
+        for test_file, seconds in passed.items():
+            path = self._entry(self.key(test_file))
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.directory, suffix=".tmp", delete=False
+            ) as file:
+                json.dump({"test_file": test_file, "seconds": seconds}, file)
+            os.replace(file.name, path)
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used entries until the cache is below
+        three quarters of its size cap, if it is over the cap.
+
+        Returns:
+            int: Number of entries removed
+        """
+        entries: List[Tuple[float, int, str]] = []
+        try:
+            with os.scandir(self.directory) as iterator:
+                for entry in iterator:
+                    stat = entry.stat(follow_symlinks=False)
+                    entries.append((stat.st_mtime, _disk_usage(stat), entry.path))
+        except OSError:
+            return 0
+
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _digest(self, path: str) -> bytes:
+        """Returns the content hash of a root-relative file, read once per run."""
+        digest = self._digests.get(path)
+        if digest is None:
+            try:
+                with open(os.path.join(self.root_dir, path), "rb") as file:
+                    digest = hashlib.sha256(file.read()).digest()
+            except OSError:
+                digest = b"\0missing\0"
+            self._digests[path] = digest
+        return digest
+
+    def _inputs(self, test_file: str) -> List[str]:
+        """
+        Returns the root-relative files a test file's outcome depends on: the
+        test file, its mapped source, every conftest.py above it and all the
+        project files these import.
+        """
+        inputs = [test_file]
+        parts = test_file.replace(os.sep, "/").split("/")
+        if parts[0] == self.tests_dirname and len(parts) > 1:
+            source = get_source_file_path(os.path.join(*parts[1:]))
+            if source is not None:
+                inputs.append(source)
+        for depth in range(len(parts)):
+            inputs.append(os.path.join(*parts[:depth], "conftest.py"))
+        if self.graph is not None:
+            closure = self.graph.dependencies(inputs) - set(inputs)
+            inputs.extend(sorted(closure))
+        return inputs
+
+
+def run_uncached(
+    root_dir: str,
+    test_files: Sequence[str],
+    args: Sequence[str],
+    cache: ResultCache,
+) -> Tuple[int, Dict[str, float]]:
+    """
+    Runs test files without a cached pass in one pytest process and caches
+    the ones that pass.
+
+    Parameters:
+        root_dir (str): Directory pytest runs in
+        test_files (Sequence[str]): Uncached test files relative to the root
+        args (Sequence[str]): Extra arguments passed through to pytest
+        cache (ResultCache): Cache of the project
+    Returns:
+        Tuple[int, Dict[str, float]]: Exit code of pytest and the seconds
+        per test file that passed
+    """
+    with tempfile.TemporaryDirectory(prefix="ptm-results-") as temp_dir:
+        report = os.path.join(temp_dir, "junit.xml")
+        command = [
+            sys.executable,
+            "-m",
+            "pytest",
+            f"--junitxml={report}",
+            "-o",
+            "junit_family=xunit1",
+            *args,
+            *test_files,
+        ]
+        exit_code = subprocess.call(command, cwd=root_dir)
+        # Interrupted, crashed or misused runs don't vouch for any file.
+        if exit_code not in (0, 1) or not os.path.exists(report):
+            return exit_code, {}
+        try:
+            results = parse_junit(report)
+        except ValueError:
+            return exit_code, {}
+
+    requested = _by_suffix(test_files)
+    passed: Dict[str, float] = {}
+    for result in results:
+        test_file = requested.get(result.path.replace(os.sep, "/"))
+        if test_file is not None and result.tests and not result.failed:
+            passed[test_file] = round(passed.get(test_file, 0.0) + result.seconds, 6)
+    cache.store(passed)
+    return exit_code, passed
+
+
+def _by_suffix(test_files: Sequence[str]) -> Dict[str, Optional[str]]:
+    """
+    Maps every trailing part of the requested test files' paths back to the
+    file. pytest reports paths relative to its rootdir, a common ancestor of
+    the requested files, so a reported path is the suffix of exactly one of
+    them; suffixes shared by several files map to None.
+    """
+    by_suffix: Dict[str, Optional[str]] = {}
+    for test_file in test_files:
+        parts = test_file.replace(os.sep, "/").split("/")
+        for index in range(len(parts)):
+            suffix = "/".join(parts[index:])
+            known = by_suffix.get(suffix, test_file)
+            by_suffix[suffix] = test_file if known == test_file else None
+    return by_suffix
+
+
+def _disk_usage(stat: os.stat_result) -> int:
+    """Returns the bytes a file takes on disk, or its size where unknown."""
+    blocks = getattr(stat, "st_blocks", None)
+    return blocks * 512 if blocks else stat.st_size
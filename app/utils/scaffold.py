@@ -0,0 +1,179 @@
+"""
+Planning and applying the test scaffold of `ptm init`.
+
+Scaffolding is split in two stages. `plan_scaffold` compares the source files
+against a single snapshot of the tests directory, taken with one walk, and
+returns a `ScaffoldPlan` listing the directories and test files to create and
+the test files already present. Planning only reads the disk, so the plan can
+be shown, written as JSON or checked for completeness in CI without changing
+anything. `apply_plan` then executes a plan as one batch: it creates the
+directories parent first and writes the stubs through a thread pool, never
+overwriting a test file that appeared after planning.
+
+All paths in a plan are relative to the project root and use `/` separators.
+"""
+
+import os
+import posixpath
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from .instrument import count, phase
+from .workspace import (
+    MAX_WRITE_WORKERS,
+    MaterializeResult,
+    write_stub,
+    get_test_file_path,
+    in_tests_directory,
+)
+
+
+@dataclass
+class ScaffoldPlan:
+    """
+    Work needed to give every source file a test file.
+
+    create maps each test file to write to the source file it tests.
+    """
+
+    root_dir: str
+    directories: List[str] = field(default_factory=list)
+    create: Dict[str, str] = field(default_factory=dict)
+    present: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        """Whether every source file already has its test file."""
+        return not self.directories and not self.create
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the plan as JSON-ready data."""
+        return {
+            "complete": self.complete,
+            "directories": self.directories,
+            "create": [
+                {"test": test_file, "source": source}
+                for test_file, source in self.create.items()
+            ],
+            "present": self.present,
+        }
+
+
+def plan_scaffold(
+    root_dir: str, python_files: Iterable[str], tests_dirname: str = "tests"
+) -> ScaffoldPlan:
+    """
+    Plans the test files and directories missing for a set of source files,
+    from one walk of the tests directory. Nothing is written.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        python_files (Iterable[str]): Relative paths of the source files
+        tests_dirname (str): Name of the tests directory in the project root
+    Returns:
+        ScaffoldPlan: Directories and test files to create, and test files
+        already present
+    """
+    with phase("plan"):
+        directories, files = _snapshot(root_dir, tests_dirname)
+        plan = ScaffoldPlan(root_dir)
+        missing_dirs: Set[str] = set()
+        seen: Set[str] = set()
+
+        for python_file in python_files:
+            if in_tests_directory(python_file, tests_dirname):
+                continue
+            test_file = get_test_file_path(python_file)
+            if test_file is None:
+                continue
+
+            test_path = _join(tests_dirname, test_file)
+            if test_path in seen:
+                continue
+            seen.add(test_path)
+            if test_path in files:
+                plan.present.append(test_path)
+                continue
+            plan.create[test_path] = python_file.replace(os.sep, "/")
+
+            parent = posixpath.dirname(test_path)
+            while parent and parent not in directories and parent not in missing_dirs:
+                missing_dirs.add(parent)
+                parent = posixpath.dirname(parent)
+
+    plan.directories = sorted(missing_dirs)
+    plan.create = dict(sorted(plan.create.items()))
+    plan.present.sort()
+    return plan
+
+
+def apply_plan(
+    plan: ScaffoldPlan, max_workers: int = MAX_WRITE_WORKERS
+) -> MaterializeResult:
+    """
+    Creates the directories and test files of a plan as one batch. Test
+    files that exist by the time they are written are left untouched.
+
+    Parameters:
+        plan (ScaffoldPlan): Plan to apply
+        max_workers (int): Maximum number of concurrent writes
+    Returns:
+        MaterializeResult: Number of test files created and already present
+    Raises:
+        PermissionError: If a directory or test file can't be written
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with phase("write"):
+        for directory in plan.directories:
+            os.makedirs(os.path.join(plan.root_dir, directory), exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            created = sum(
+                future.result()
+                for future in [
+                    pool.submit(write_stub, os.path.join(plan.root_dir, test_file))
+                    for test_file in plan.create
+                ]
+            )
+
+    # Test files created since the plan was made are kept and count as present.
+    skipped = len(plan.present) + len(plan.create) - created
+    count("files created", created)
+    count("files skipped", skipped)
+    return MaterializeResult(created=created, skipped=skipped)
+
+
+def _snapshot(root_dir: str, tests_dirname: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Returns the directories and Python files below the tests directory,
+    including the tests directory itself, as root-relative paths.
+    """
+    directories: Set[str] = set()
+    files: Set[str] = set()
+    stack: List[str] = [tests_dirname]
+
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(root_dir, rel_dir)) as iterator:
+                entries = list(iterator)
+        except OSError:
+            continue
+        directories.add(rel_dir)
+        count("directories visited")
+
+        for entry in entries:
+            rel_path = _join(rel_dir, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name != "__pycache__":
+                    stack.append(rel_path)
+            elif entry.name.endswith(".py"):
+                files.add(rel_path)
+
+    return directories, files
+
+
+def _join(rel_dir: str, name: str) -> str:
+    """Joins root-relative path parts with `/`, whatever the platform."""
+    return f"{rel_dir}/{name.replace(os.sep, '/')}"
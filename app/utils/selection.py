@@ -0,0 +1,119 @@
+"""
+Test selection and execution for `ptm test`.
+
+Changed files are mapped to the test files that cover them with the same
+naming rule `create_test_files` uses to scaffold them, so a change to
+`pkg/mod.py` selects `tests/pkg/test_mod.py`. Changed test files select
+themselves. On top of that, the project's import graph selects every test
+file that depends on a changed file through its imports.
+"""
+
+import os
+import subprocess
+import sys
+from typing import Iterable, List, Sequence, Set
+
+from .depgraph import ImportGraph, impacted_test_files
+from .git import FileChange
+from .workspace import get_test_file_path, in_tests_directory
+
+
+def map_to_test_files(
+    root_dir: str, python_files: Iterable[str], tests_dirname: str = "tests"
+) -> List[str]:
+    """
+    Returns the existing test files for a set of Python files.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        python_files (Iterable[str]): Relative paths of sources or test files
+        tests_dirname (str): Name of the tests directory in the project root
+    Returns:
+        List[str]: Sorted relative paths of the test files that exist
+    """
+    selected: Set[str] = set()
+
+    for python_file in python_files:
+        if not python_file.endswith(".py"):
+            continue
+        if in_tests_directory(python_file, tests_dirname):
+            if os.path.basename(python_file).startswith("test_"):
+                candidate = python_file
+            else:
+                continue
+        else:
+            test_file = get_test_file_path(python_file)
+            if test_file is None:
+                continue
+            candidate = os.path.join(tests_dirname, test_file)
+
+        if os.path.isfile(os.path.join(root_dir, candidate)):
+            selected.add(candidate)
+
+    return sorted(selected)
+
+
+def select_changed_tests(
+    root_dir: str, changes: Iterable[FileChange], tests_dirname: str = "tests"
+) -> List[str]:
+    """
+    Returns the test files affected by a set of changed files. Deleted files
+    select nothing; renamed files select the test file of their new path.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        changes (Iterable[FileChange]): Changed files relative to root_dir
+        tests_dirname (str): Name of the tests directory in the project root
+    Returns:
+        List[str]: Sorted relative paths of the affected test files
+    """
+    paths = (change.path for change in changes if change.status != "D")
+    return map_to_test_files(root_dir, paths, tests_dirname)
+
+
+def select_impacted_tests(
+    root_dir: str,
+    changes: Iterable[FileChange],
+    python_files: Iterable[str],
+    tests_dirname: str = "tests",
+) -> List[str]:
+    """
+    Returns the test files mapped to a set of changed files together with the
+    test files that import them, directly or transitively. The import graph
+    in `.ptm/cache` is updated for the current files first.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        changes (Iterable[FileChange]): Changed files relative to root_dir
+        python_files (Iterable[str]): Relative paths of all Python files
+        tests_dirname (str): Name of the tests directory in the project root
+    Returns:
+        List[str]: Sorted relative paths of the affected test files
+    """
+    changes = list(changes)
+    changed = [change.path for change in changes if change.status != "D"]
+    removed = [change.path for change in changes if change.status == "D"]
+    removed.extend(change.old_path for change in changes if change.old_path)
+
+    graph = ImportGraph.load(root_dir)
+    graph.update(python_files)
+    graph.save()
+
+    selected = set(select_changed_tests(root_dir, changes, tests_dirname))
+    selected.update(impacted_test_files(graph, changed, removed, tests_dirname))
+    return sorted(selected)
+
+
+def run_pytest(root_dir: str, test_files: Sequence[str], args: Sequence[str]) -> int:
+    """
+    Runs pytest on a set of test files in a separate interpreter.
+
+    Parameters:
+        root_dir (str): Directory pytest runs in
+        test_files (Sequence[str]): Test files to run, or all tests if empty
+        args (Sequence[str]): Extra arguments passed through to pytest
+    Returns:
+        int: Exit code of pytest
+    """
+    command = [sys.executable, "-m", "pytest", *args, *test_files]
+    return subprocess.call(command, cwd=root_dir)
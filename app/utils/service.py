@@ -0,0 +1,519 @@
+"""
+Long-lived workspace service for `ptm serve`.
+
+Editor plugins and hooks keep asking the same questions: where is the test
+file of this module, which module does this test cover, which sources have no
+test file yet. Answering each one from scratch means detecting the project,
+compiling its ignore rules and walking the whole tree again.
+
+A `Workspace` does that work once. It keeps the layered ignore rules and the
+sets of source and test files in memory, and updates them incrementally from
+the same watcher `ptm test --watch` uses, so every query is a few set and
+dictionary lookups. `serve` answers queries as JSON-RPC 2.0 over a Unix
+socket, one JSON message per line, on a single thread. With inotify, pending
+file events are applied before the requests that arrive with them, so a
+client never gets an answer older than its own last write.
+
+The socket lives in `.ptm`, or for deep projects in a directory only the
+current user can access, and clients only connect to a socket of their own
+user, so another user can neither hijack nor impersonate the service.
+"""
+
+import inspect
+import json
+import os
+import selectors
+import socket
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .index import make_state_dir
+from .watch import POLL_INTERVAL, Watcher, open_watcher
+from .worker import check_socket_owner, socket_path
+from .workspace import get_test_file_path, in_tests_directory
+
+SOCKET_NAME: str = os.path.join(".ptm", "serve.sock")
+SEND_TIMEOUT: float = 5.0
+MAX_REQUEST_BYTES: int = 1 << 20
+
+PARSE_ERROR: int = -32700
+INVALID_REQUEST: int = -32600
+METHOD_NOT_FOUND: int = -32601
+INVALID_PARAMS: int = -32602
+
+
+class Workspace:
+    """
+    In-memory view of a project's Python files and the mapping between its
+    sources and their test files, kept current by a watcher.
+
+    Paths returned by a workspace are relative to root_dir. Paths given to it
+    may also be absolute.
+    """
+
+    def __init__(
+        self, root_dir: str, use_inotify: bool = True, tests_dirname: str = "tests"
+    ) -> None:
+        self.root_dir: str = os.path.abspath(root_dir)
+        self.tests_dirname: str = tests_dirname
+        self.watcher: Watcher = open_watcher(self.root_dir, use_inotify)
+        self._sources: Set[str] = set()
+        self._tests: Set[str] = set()
+        self._source_by_test: Dict[str, str] = {}
+        self._untested: Set[str] = set()
+        for path in self.watcher.files():
+            self._add(path)
+
+    def refresh(self, timeout: float = 0.0) -> Set[str]:
+        """
+        Applies the changes the watcher has seen since the last refresh.
+
+        Parameters:
+            timeout (float): Seconds to wait for changes
+        Returns:
+            Set[str]: Relative paths of the files that changed
+        """
+        changed = self.watcher.read(timeout)
+        self.update(changed)
+        return changed
+
+    def update(self, paths: Iterable[str]) -> None:
+        """
+        Adds or removes files depending on whether they exist now and aren't
+        ignored, since editing a `.gitignore` can hide existing files.
+
+        Parameters:
+            paths (Iterable[str]): Relative paths of Python files
+        Returns:
+            None
+        """
+        rules = self.watcher.rules
+        for path in paths:
+            exists = os.path.isfile(os.path.join(self.root_dir, path))
+            if exists and not rules.is_ignored(path):
+                self._add(path)
+            else:
+                self._remove(path)
+
+    def sources(self) -> List[str]:
+        """Returns the source files, outside the tests directory."""
+        return sorted(self._sources)
+
+    def tests(self) -> List[str]:
+        """Returns the Python files in the tests directory."""
+        return sorted(self._tests)
+
+    def untested(self) -> List[str]:
+        """Returns the source files whose test file doesn't exist."""
+        return sorted(self._untested)
+
+    def has_file(self, path: str) -> bool:
+        """
+        Returns true if a path is a known, non-ignored Python file.
+
+        Parameters:
+            path (str): Path of the file
+        Returns:
+            bool: True if the file is known, else false
+        Raises:
+            ValueError: If the path is outside the project
+        """
+        rel_path = self.relative(path)
+        return rel_path in self._sources or rel_path in self._tests
+
+    def test_for(self, path: str) -> Optional[str]:
+        """
+        Returns the test file a source file maps to, whether it exists or not.
+
+        Parameters:
+            path (str): Path of the source file
+        Returns:
+            Optional[str]: Relative path of the test file, or None if the
+            file doesn't get a test file of its own
+        Raises:
+            ValueError: If the path is outside the project
+        """
+        rel_path = self.relative(path)
+        if not rel_path.endswith(".py") or in_tests_directory(
+            rel_path, self.tests_dirname
+        ):
+            return None
+        return self._test_path(rel_path)
+
+    def source_for(self, path: str) -> Optional[str]:
+        """
+        Returns the known source file a test file covers.
+
+        Parameters:
+            path (str): Path of the test file
+        Returns:
+            Optional[str]: Relative path of the source file, or None if no
+            known source maps to the test file
+        Raises:
+            ValueError: If the path is outside the project
+        """
+        return self._source_by_test.get(self.relative(path))
+
+    def is_ignored(self, path: str) -> bool:
+        """
+        Returns true if a path is ignored by the project's ignore rules.
+
+        Parameters:
+            path (str): Path of a file, or of a directory with a trailing `/`
+        Returns:
+            bool: True if the path is ignored, else false
+        Raises:
+            ValueError: If the path is outside the project
+        """
+        rel_path = self.relative(path)
+        is_dir = path.endswith(("/", os.sep))
+        return self.watcher.rules.is_ignored(rel_path, is_dir=is_dir)
+
+    def relative(self, path: str) -> str:
+        """
+        Returns a path relative to the project root.
+
+        Parameters:
+            path (str): Absolute path, or path relative to the project root
+        Returns:
+            str: Normalized path relative to the project root
+        Raises:
+            ValueError: If the path isn't a string or is outside the project
+        """
+        if not isinstance(path, str) or not path:
+            raise ValueError("A path must be a non-empty string")
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root_dir)
+        rel_path = os.path.normpath(path)
+        if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+            raise ValueError(f"{path} is outside the project")
+        return rel_path
+
+    def close(self) -> None:
+        """Stops watching the project."""
+        self.watcher.close()
+
+    def _add(self, path: str) -> None:
+        if in_tests_directory(path, self.tests_dirname):
+            if path not in self._tests:
+                self._tests.add(path)
+                source = self._source_by_test.get(path)
+                if source is not None:
+                    self._untested.discard(source)
+        elif path not in self._sources:
+            self._sources.add(path)
+            test_path = self._test_path(path)
+            if test_path is not None:
+                self._source_by_test[test_path] = path
+                if test_path not in self._tests:
+                    self._untested.add(path)
+
+    def _remove(self, path: str) -> None:
+        if path in self._tests:
+            self._tests.discard(path)
+            source = self._source_by_test.get(path)
+            if source is not None:
+                self._untested.add(source)
+        elif path in self._sources:
+            self._sources.discard(path)
+            self._untested.discard(path)
+            test_path = self._test_path(path)
+            if test_path is not None:
+                self._source_by_test.pop(test_path, None)
+
+    def _test_path(self, source: str) -> Optional[str]:
+        test_file = get_test_file_path(source)
+        if test_file is None:
+            return None
+        return os.path.join(self.tests_dirname, test_file)
+
+
+def _test_for(workspace: Workspace, path: str) -> Dict[str, Any]:
+    test_path = workspace.test_for(path)
+    return {
+        "test": test_path,
+        "exists": test_path is not None and workspace.has_file(test_path),
+    }
+
+
+def _ping(workspace: Workspace) -> str:
+    return "pong"
+
+
+def _shutdown(workspace: Workspace) -> bool:
+    return True
+
+
+METHODS: Dict[str, Callable[..., Any]] = {
+    "ping": _ping,
+    "sources": Workspace.sources,
+    "tests": Workspace.tests,
+    "untested": Workspace.untested,
+    "test_for": _test_for,
+    "source_for": Workspace.source_for,
+    "is_ignored": Workspace.is_ignored,
+    "shutdown": _shutdown,
+}
+
+
+def handle(workspace: Workspace, message: Any) -> Optional[Dict[str, Any]]:
+    """
+    Answers one decoded JSON-RPC 2.0 request.
+
+    Parameters:
+        workspace (Workspace): Workspace to query
+        message (Any): Decoded request
+    Returns:
+        Optional[Dict[str, Any]]: Response, or None for a notification
+    """
+    if (
+        not isinstance(message, dict)
+        or message.get("jsonrpc") != "2.0"
+        or not isinstance(message.get("method"), str)
+    ):
+        request_id = message.get("id") if isinstance(message, dict) else None
+        return _error(request_id, INVALID_REQUEST, "Invalid request")
+
+    request_id = message.get("id")
+    method = METHODS.get(message["method"])
+    params = message.get("params", [])
+    if method is None:
+        response = _error(request_id, METHOD_NOT_FOUND, "Method not found")
+    elif not isinstance(params, (list, dict)):
+        response = _error(
+            request_id, INVALID_PARAMS, "Params must be an array or object"
+        )
+    else:
+        args, kwargs = (params, {}) if isinstance(params, list) else ([], params)
+        try:
+            bound = inspect.signature(method).bind(workspace, *args, **kwargs)
+            result = method(*bound.args, **bound.kwargs)
+        except (TypeError, ValueError) as error:
+            response = _error(request_id, INVALID_PARAMS, str(error))
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    return response if "id" in message else None
+
+
+def serve(workspace: Workspace, poll_interval: float = POLL_INTERVAL) -> None:
+    """
+    Answers JSON-RPC requests about a workspace on its Unix socket until a
+    client calls `shutdown`.
+
+    Parameters:
+        workspace (Workspace): Workspace to serve
+        poll_interval (float): Seconds between polls without inotify
+    Returns:
+        None
+    Raises:
+        RuntimeError: If the platform lacks Unix sockets, another service
+            already serves the project, or the socket path belongs to
+            another user
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("The workspace service needs Unix sockets")
+
+    path = socket_path(workspace.root_dir, SOCKET_NAME)
+    make_state_dir(os.path.dirname(path))
+    check_socket_owner(path)
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with probe:
+            try:
+                probe.connect(path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                os.remove(path)
+            else:
+                raise RuntimeError(f"A workspace service is already running on {path}")
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    inode = os.stat(path).st_ino
+    server.listen()
+    server.setblocking(False)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    event_fd = workspace.watcher.event_fd()
+    if event_fd is not None:
+        selector.register(event_fd, selectors.EVENT_READ)
+    buffers: Dict[socket.socket, bytes] = {}
+    next_poll = time.monotonic() + poll_interval
+
+    try:
+        while True:
+            timeout = None
+            if event_fd is None:
+                timeout = max(0.0, next_poll - time.monotonic())
+            events = selector.select(timeout)
+
+            if event_fd is not None:
+                workspace.refresh()
+            elif time.monotonic() >= next_poll:
+                workspace.refresh()
+                next_poll = time.monotonic() + poll_interval
+
+            for key, _ in events:
+                if key.fileobj is server:
+                    _accept(server, selector, buffers)
+                elif key.fileobj != event_fd:
+                    connection: socket.socket = key.fileobj  # type: ignore[assignment]
+                    lines = _receive(connection, buffers)
+                    if lines is None:
+                        _close(connection, selector, buffers)
+                        continue
+                    for line in lines:
+                        response, stop = _answer(workspace, line)
+                        if response is not None and not _send(connection, response):
+                            _close(connection, selector, buffers)
+                            break
+                        if stop:
+                            return
+    finally:
+        for connection in list(buffers):
+            _close(connection, selector, buffers)
+        selector.close()
+        server.close()
+        # A newer service may already own the path.
+        try:
+            if os.stat(path).st_ino == inode:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def call_service(root_dir: str, method: str, params: Any = None) -> Any:
+    """
+    Calls a method of the workspace service running for a project.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        method (str): Name of the method
+        params (Any): Positional (list) or named (dict) parameters
+    Returns:
+        Any: Result of the method
+    Raises:
+        ConnectionError: If no service is running for the project
+        RuntimeError: If the service answers with an error, or its socket
+            doesn't belong to the current user
+    """
+    request: Dict[str, Any] = {"jsonrpc": "2.0", "id": 1, "method": method}
+    if params is not None:
+        request["params"] = params
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with connection:
+        connection.settimeout(SEND_TIMEOUT)
+        path = socket_path(root_dir, SOCKET_NAME)
+        check_socket_owner(path)
+        try:
+            connection.connect(path)
+        except FileNotFoundError:
+            raise ConnectionRefusedError("No workspace service is running") from None
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = connection.recv(1 << 16)
+            if not chunk:
+                raise ConnectionResetError(
+                    "The workspace service closed the connection"
+                )
+            data += chunk
+
+    response = json.loads(data)
+    if "error" in response:
+        raise RuntimeError(response["error"]["message"])
+    return response["result"]
+
+
+def _answer(workspace: Workspace, line: bytes) -> Tuple[Optional[bytes], bool]:
+    """
+    Answers one request line, which may hold a batch, and returns the encoded
+    response and whether the service should stop.
+    """
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return _encode(_error(None, PARSE_ERROR, "Parse error")), False
+
+    batch = message if isinstance(message, list) else [message]
+    if not batch:
+        return _encode(_error(None, INVALID_REQUEST, "Invalid request")), False
+
+    responses = [
+        response
+        for response in (handle(workspace, item) for item in batch)
+        if response is not None
+    ]
+    stop = any(
+        isinstance(item, dict) and item.get("method") == "shutdown" for item in batch
+    )
+    if not responses:
+        return None, stop
+    return _encode(responses if isinstance(message, list) else responses[0]), stop
+
+
+def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": code, "message": message},
+    }
+
+
+def _encode(response: Any) -> bytes:
+    return json.dumps(response, separators=(",", ":")).encode() + b"\n"
+
+
+def _accept(
+    server: socket.socket,
+    selector: selectors.BaseSelector,
+    buffers: Dict[socket.socket, bytes],
+) -> None:
+    try:
+        connection, _ = server.accept()
+    except BlockingIOError:
+        return
+    connection.settimeout(SEND_TIMEOUT)
+    selector.register(connection, selectors.EVENT_READ)
+    buffers[connection] = b""
+
+
+def _receive(
+    connection: socket.socket, buffers: Dict[socket.socket, bytes]
+) -> Optional[List[bytes]]:
+    """
+    Reads what a client sent and returns its complete lines, or None once the
+    client has disconnected or sent an oversized request.
+    """
+    try:
+        chunk = connection.recv(1 << 16)
+    except OSError:
+        return None
+    if not chunk:
+        return None
+
+    *lines, rest = (buffers[connection] + chunk).split(b"\n")
+    if len(rest) > MAX_REQUEST_BYTES:
+        return None
+    buffers[connection] = rest
+    return [line for line in lines if line.strip()]
+
+
+def _send(connection: socket.socket, data: bytes) -> bool:
+    try:
+        connection.sendall(data)
+    except OSError:
+        return False
+    return True
+
+
+def _close(
+    connection: socket.socket,
+    selector: selectors.BaseSelector,
+    buffers: Dict[socket.socket, bytes],
+) -> None:
+    selector.unregister(connection)
+    del buffers[connection]
+    connection.close()
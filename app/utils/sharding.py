@@ -0,0 +1,208 @@
+"""
+Duration-aware sharding of test files for `ptm test`.
+
+Test files are the unit of distribution. Each file's wall-clock time from
+previous runs is kept in a small SQLite database under `.ptm`, and shards are
+balanced on those durations with the longest-processing-time-first heuristic,
+so the slowest shard finishes close to the average. Files without history are
+assumed to take as long as an average known file.
+
+After every run the per-file durations are read back from the JUnit XML that
+each pytest worker writes, and folded into the database.
+
+A split is only consistent across machines if all of them weigh the files the
+same way, so `ptm test --shard` never reads or updates the local database: it
+balances on a shared timings file given with `--timings`, or on file count.
+"""
+
+import heapq
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from xml.etree.ElementTree import iterparse
+
+from .index import make_state_dir
+
+TIMINGS_FILE: str = os.path.join(".ptm", "timings.sqlite")
+DEFAULT_DURATION: float = 1.0
+SMOOTHING: float = 0.5
+NO_TESTS_COLLECTED: int = 5
+
+
+class TimingStore:
+    """
+    Historical per-file test durations stored in SQLite.
+
+    Durations are smoothed with an exponential moving average so a single
+    slow or fast run doesn't swing the balance too much.
+    """
+
+    def __init__(self, root_dir: str, path: Optional[str] = None) -> None:
+        self.path: str = path or os.path.join(root_dir, TIMINGS_FILE)
+        make_state_dir(os.path.dirname(self.path))
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS durations ("
+            "test_file TEXT PRIMARY KEY, duration REAL NOT NULL, "
+            "runs INTEGER NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def __enter__(self) -> "TimingStore":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def durations(self) -> Dict[str, float]:
+        """
+        Returns the recorded duration of every known test file.
+
+        Returns:
+            Dict[str, float]: Seconds per test file path
+        """
+        rows = self._connection.execute("SELECT test_file, duration FROM durations")
+        return dict(rows.fetchall())
+
+    def record(self, durations: Dict[str, float]) -> None:
+        """
+        Folds the durations of a run into the stored history.
+
+        Parameters:
+            durations (Dict[str, float]): Seconds per test file path
+        Returns:
+            None
+        """
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO durations (test_file, duration, runs, updated) "
+                "VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(test_file) DO UPDATE SET "
+                "duration = duration * ? + excluded.duration * ?, "
+                "runs = runs + 1, updated = excluded.updated",
+                [
+                    (test_file, duration, now, 1 - SMOOTHING, SMOOTHING)
+                    for test_file, duration in durations.items()
+                ],
+            )
+
+
+def split_shards(
+    test_files: Iterable[str], durations: Dict[str, float], shards: int
+) -> List[List[str]]:
+    """
+    Splits test files into shards of roughly equal total duration.
+
+    Parameters:
+        test_files (Iterable[str]): Test files to distribute
+        durations (Dict[str, float]): Known seconds per test file
+        shards (int): Number of shards
+    Returns:
+        List[List[str]]: The test files of each shard, each sorted by path
+    """
+    if shards < 1:
+        raise ValueError("The number of shards must be at least 1")
+
+    files = sorted(set(test_files))
+    known = [durations[file] for file in files if file in durations]
+    default = sum(known) / len(known) if known else DEFAULT_DURATION
+    weighted = sorted(
+        ((durations.get(file, default), file) for file in files),
+        key=lambda item: (-item[0], item[1]),
+    )
+
+    heap: List[Tuple[float, int]] = [(0.0, index) for index in range(shards)]
+    result: List[List[str]] = [[] for _ in range(shards)]
+    for duration, file in weighted:
+        load, index = heapq.heappop(heap)
+        result[index].append(file)
+        heapq.heappush(heap, (load + duration, index))
+
+    return [sorted(shard) for shard in result]
+
+
+def parse_junit_durations(path: str) -> Dict[str, float]:
+    """
+    Sums the test case times of an xunit1 JUnit XML report per test file.
+
+    Parameters:
+        path (str): Path of the JUnit XML file
+    Returns:
+        Dict[str, float]: Seconds per test file path
+    """
+    durations: Dict[str, float] = {}
+    for _, element in iterparse(path):
+        if element.tag == "testcase":
+            test_file = element.get("file")
+            if test_file:
+                durations[test_file] = durations.get(test_file, 0.0) + float(
+                    element.get("time", 0.0)
+                )
+            element.clear()
+    return durations
+
+
+def run_shards(
+    root_dir: str, shards: Sequence[Sequence[str]], args: Sequence[str]
+) -> Tuple[int, Dict[str, float]]:
+    """
+    Runs every non-empty shard in its own pytest process, all concurrently.
+    Each worker's output is printed once it finishes, so it isn't interleaved.
+
+    Parameters:
+        root_dir (str): Directory pytest runs in
+        shards (Sequence[Sequence[str]]): Test files of each shard
+        args (Sequence[str]): Extra arguments passed through to pytest
+    Returns:
+        Tuple[int, Dict[str, float]]: The highest worker exit code and the
+        measured seconds per test file
+    """
+    durations: Dict[str, float] = {}
+    exit_codes: List[int] = []
+
+    with tempfile.TemporaryDirectory(prefix="ptm-shards-") as temp_dir:
+        workers: List[Tuple[subprocess.Popen, str, str]] = []
+        for index, shard in enumerate(shards):
+            if not shard:
+                continue
+            report = os.path.join(temp_dir, f"shard-{index}.xml")
+            output_path = os.path.join(temp_dir, f"shard-{index}.log")
+            with open(output_path, "wb") as output:
+                process = subprocess.Popen(
+                    [
+                        sys.executable,
+                        "-m",
+                        "pytest",
+                        f"--junitxml={report}",
+                        "-o",
+                        "junit_family=xunit1",
+                        *args,
+                        *shard,
+                    ],
+                    cwd=root_dir,
+                    stdout=output,
+                    stderr=subprocess.STDOUT,
+                )
+            workers.append((process, report, output_path))
+
+        for process, report, output_path in workers:
+            exit_codes.append(process.wait())
+            with open(output_path, "r", errors="replace") as output:
+                sys.stdout.write(output.read())
+            sys.stdout.flush()
+            if os.path.exists(report):
+                durations.update(parse_junit_durations(report))
+
+    # A shard whose files hold no tests exits with 5 ("no tests collected"),
+    # which only matters when no shard ran any test at all.
+    ran = [code for code in exit_codes if code != NO_TESTS_COLLECTED]
+    if exit_codes and not ran:
+        return NO_TESTS_COLLECTED, durations
+    return max(ran, default=0), durations
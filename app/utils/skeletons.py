@@ -0,0 +1,403 @@
+"""
+Test skeleton generation for `ptm generate`.
+
+Every source module is parsed with `ast` to find its public functions, classes
+and methods, and each of them gets a test function skeleton in the module's
+test file. Skeletons are only ever appended: symbols that already have a test
+function of the expected name are left alone, and so is every line of
+existing test code apart from the imports the new skeletons need.
+
+Parsing runs across a process pool and its results are cached in
+`.ptm/cache/symbols.json` by the content hash of each module, so a rerun only
+parses the modules that changed since the last one.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import secrets
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .index import CACHE_DIR, make_state_dir
+from .workspace import TEST_STUB, get_test_file_path
+
+SYMBOLS_FILE: str = "symbols.json"
+SYMBOLS_VERSION: int = 1
+PARALLEL_THRESHOLD: int = 32
+SKELETON_BODY: str = '    pytest.skip("not implemented")\n'
+
+
+@dataclass(frozen=True)
+class GenerateResult:
+    """Counts of what a `generate_skeletons` run wrote."""
+
+    created: int
+    updated: int
+    skeletons: int
+
+
+def module_name(python_file: str) -> str:
+    """
+    Returns the dotted module name of a Python file.
+
+    Parameters:
+        python_file (str): Relative path of a Python file from project root
+    Returns:
+        str: Dotted name, with `pkg/__init__.py` naming the package `pkg`
+    """
+    parts = python_file.replace(os.sep, "/")[: -len(".py")].split("/")
+    if parts[-1] == "__init__" and len(parts) > 1:
+        parts.pop()
+    return ".".join(parts)
+
+
+def extract_symbols(source: bytes, filename: str = "<unknown>") -> List[str]:
+    """
+    Returns the public functions, classes and methods defined in a module.
+
+    Parameters:
+        source (bytes): Source code of the module
+        filename (str): Name used in syntax errors
+    Returns:
+        List[str]: Qualified names such as `func`, `Class` and `Class.method`,
+        in definition order; empty if the module doesn't parse
+    """
+    try:
+        tree = ast.parse(source, filename)
+    except (SyntaxError, ValueError):
+        return []
+
+    symbols: List[str] = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if not node.name.startswith("_"):
+                symbols.append(node.name)
+        elif isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            symbols.append(node.name)
+            symbols.extend(
+                f"{node.name}.{child.name}"
+                for child in node.body
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and not child.name.startswith("_")
+            )
+    return symbols
+
+
+def skeleton_name(symbol: str) -> str:
+    """
+    Returns the name of the test function for a symbol.
+
+    Parameters:
+        symbol (str): Qualified symbol name such as `Class.method`
+    Returns:
+        str: Test function name such as `test_Class_method`
+    """
+    return "test_" + symbol.replace(".", "_")
+
+
+def render_skeletons(
+    test_source: str, module: str, symbols: List[str]
+) -> Tuple[str, int]:
+    """
+    Adds skeletons for the symbols that don't have a test function yet to
+    the source of a test file.
+
+    Missing imports are inserted after the file's last top-level import and
+    the skeletons are appended at the end; nothing else is modified.
+
+    Parameters:
+        test_source (str): Current content of the test file
+        module (str): Dotted name of the module under test
+        symbols (List[str]): Qualified names of the module's public symbols
+    Returns:
+        Tuple[str, int]: The new content and the number of skeletons added
+    """
+    try:
+        tree: Optional[ast.Module] = ast.parse(test_source)
+    except SyntaxError:
+        tree = None
+
+    existing: Set[str] = set()
+    imported: Set[str] = set()
+    has_pytest = False
+    last_import = 0
+    if tree is not None:
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                existing.add(node.name)
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                has_pytest = has_pytest or any(
+                    alias.name == "pytest" for alias in node.names
+                )
+            elif isinstance(node, ast.ImportFrom):
+                if node.module == module:
+                    imported.update(alias.asname or alias.name for alias in node.names)
+            else:
+                continue
+            last_import = node.end_lineno or node.lineno
+        if not last_import and tree.body and _is_docstring(tree.body[0]):
+            last_import = tree.body[0].end_lineno or tree.body[0].lineno
+
+    missing = [symbol for symbol in symbols if skeleton_name(symbol) not in existing]
+    if not missing or tree is None:
+        return test_source, 0
+
+    imports: List[str] = []
+    if not has_pytest:
+        imports.append("import pytest\n")
+    names = sorted(
+        {
+            name
+            for name in (symbol.split(".", 1)[0] for symbol in missing)
+            if _import_alias(name) not in imported
+        },
+        key=symbols.index,
+    )
+    if names:
+        imports.append(
+            f"from {module} import {', '.join(_import_clause(n) for n in names)}\n"
+        )
+
+    lines = test_source.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    lines[last_import:last_import] = imports
+
+    body = "".join(lines).rstrip("\n")
+    skeletons = "\n\n".join(
+        f"def {skeleton_name(symbol)}():\n{SKELETON_BODY}" for symbol in missing
+    )
+    content = f"{body}\n\n\n{skeletons}" if body else skeletons
+    return content, len(missing)
+
+
+def _is_docstring(node: ast.stmt) -> bool:
+    """Returns true if a statement is a bare string literal."""
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Constant)
+        and isinstance(node.value.value, str)
+    )
+
+
+def _import_alias(name: str) -> str:
+    """
+    Returns the name a symbol is imported under in its test file. Symbols
+    named like tests (`test_*` functions, `Test*` classes) get a leading
+    underscore so pytest doesn't collect them from the test module.
+    """
+    return f"_{name}" if name.startswith(("test", "Test")) else name
+
+
+def _import_clause(name: str) -> str:
+    alias = _import_alias(name)
+    return name if alias == name else f"{name} as {alias}"
+
+
+class SymbolCache:
+    """
+    Public symbols of each module from previous runs, keyed by the relative
+    path of the module and valid while its content hash is unchanged.
+    """
+
+    def __init__(self, root_dir: str) -> None:
+        self.root_dir: str = root_dir
+        self._entries: Dict[str, List] = {}
+        self._current: Dict[str, List] = {}
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.root_dir, CACHE_DIR, SYMBOLS_FILE)
+
+    @classmethod
+    def load(cls, root_dir: str) -> "SymbolCache":
+        """
+        Loads the symbol cache of a project, or returns an empty one.
+
+        Parameters:
+            root_dir (str): Root directory of the project
+        Returns:
+            SymbolCache: The loaded or empty cache
+        """
+        cache = cls(root_dir)
+        try:
+            with open(cache.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cache
+        if isinstance(data, dict) and data.get("version") == SYMBOLS_VERSION:
+            cache._entries = data.get("files", {})
+        return cache
+
+    def lookup(self, python_file: str, digest: str) -> Optional[List[str]]:
+        """Returns the cached symbols of a module if its content is unchanged."""
+        entry = self._entries.get(python_file)
+        if entry is None or entry[0] != digest:
+            return None
+        self._current[python_file] = entry
+        return entry[1]
+
+    def record(self, python_file: str, digest: str, symbols: List[str]) -> None:
+        """Stores the symbols of a freshly parsed module."""
+        self._current[python_file] = [digest, symbols]
+
+    def save(self) -> None:
+        """
+        Atomically writes the modules seen during this run to disk. Failures
+        are ignored since the cache is only an optimization.
+
+        Returns:
+            None
+        """
+        data = {"version": SYMBOLS_VERSION, "files": self._current}
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            make_state_dir(os.path.dirname(self.path))
+            with open(temp_path, "w") as file:
+                json.dump(data, file, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+def collect_symbols(
+    root_dir: str,
+    python_files: Iterable[str],
+    use_cache: bool = True,
+    max_workers: Optional[int] = None,
+) -> Dict[str, List[str]]:
+    """
+    Returns the public symbols of a set of modules, parsing only the modules
+    whose content changed since the last run.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        python_files (Iterable[str]): Relative paths of the modules
+        use_cache (bool): Whether to reuse and update `.ptm/cache/symbols.json`
+        max_workers (Optional[int]): Size of the parsing process pool
+    Returns:
+        Dict[str, List[str]]: Qualified public symbol names per module
+    """
+    cache = SymbolCache.load(root_dir) if use_cache else SymbolCache(root_dir)
+    symbols: Dict[str, List[str]] = {}
+    stale: List[Tuple[str, str]] = []
+
+    for python_file in python_files:
+        with open(os.path.join(root_dir, python_file), "rb") as file:
+            digest = hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+        cached = cache.lookup(python_file, digest)
+        if cached is None:
+            stale.append((python_file, digest))
+        else:
+            symbols[python_file] = cached
+
+    paths = [os.path.join(root_dir, python_file) for python_file, _ in stale]
+    if len(stale) < PARALLEL_THRESHOLD:
+        parsed = [_parse_file(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            chunksize = max(1, len(paths) // (4 * (max_workers or os.cpu_count() or 1)))
+            parsed = list(pool.map(_parse_file, paths, chunksize=chunksize))
+
+    for (python_file, digest), file_symbols in zip(stale, parsed):
+        cache.record(python_file, digest, file_symbols)
+        symbols[python_file] = file_symbols
+
+    if use_cache:
+        cache.save()
+    return symbols
+
+
+def generate_skeletons(
+    root_dir: str,
+    python_files: Iterable[str],
+    tests_dirname: str = "tests",
+    use_cache: bool = True,
+) -> GenerateResult:
+    """
+    Appends test skeletons for every public symbol without a test function
+    to the test files of a set of modules, creating missing test files.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        python_files (Iterable[str]): Relative paths of the modules
+        tests_dirname (str): Name of the tests directory in the project root
+        use_cache (bool): Whether to reuse and update the symbol cache
+    Returns:
+        GenerateResult: Number of test files created and updated, and the
+        number of skeletons written
+    """
+    symbols = collect_symbols(root_dir, python_files, use_cache)
+    created = updated = skeletons = 0
+
+    for python_file, file_symbols in sorted(symbols.items()):
+        test_file = get_test_file_path(python_file)
+        if test_file is None or not file_symbols:
+            continue
+
+        test_path = os.path.join(root_dir, tests_dirname, test_file)
+        try:
+            with open(test_path, "r") as file:
+                current: Optional[str] = file.read()
+        except FileNotFoundError:
+            current = None
+
+        content, added = render_skeletons(
+            TEST_STUB if current is None else current,
+            module_name(python_file),
+            file_symbols,
+        )
+        if not added:
+            continue
+
+        _write_text(test_path, content)
+        skeletons += added
+        if current is None:
+            created += 1
+        else:
+            updated += 1
+
+    return GenerateResult(created, updated, skeletons)
+
+
+def _parse_file(path: str) -> List[str]:
+    """Reads and parses one module; runs in the worker processes."""
+    with open(path, "rb") as file:
+        return extract_symbols(file.read(), path)
+
+
+def _write_text(path: str, content: str) -> None:
+    """
+    Atomically writes a text file by renaming a temporary file into place.
+    The temporary file is created with the umask-based mode of a new file,
+    or given the mode of the file it replaces.
+    """
+    directory, name = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
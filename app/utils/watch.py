@@ -0,0 +1,477 @@
+"""
+Filesystem watching for `ptm test --watch` and `ptm serve`.
+
+On Linux the watcher subscribes to inotify events through `ctypes`, with one
+watch per non-ignored directory, so it sleeps until something is written.
+Elsewhere it falls back to polling: directory mtimes reveal created, deleted
+and renamed entries, and only the Python files already known are stat'ed for
+in-place writes. Either way, ignored directories are never watched or listed,
+using the same layered ignore rules as file discovery. When a `.gitignore`
+is created, edited or deleted, the rules of its directory are compiled again
+and the directory is rescanned, so files it now ignores or re-includes are
+reported as changed.
+
+If the kernel's event queue overflows, events were lost, so the inotify
+watcher rescans the whole tree, watches it anew and reports every file. If
+the per-user watch limit (`fs.inotify.max_user_watches`) is reached while
+starting, the project is polled instead; if it is reached later, a warning
+names the directory whose changes go unseen.
+
+Events are debounced: a batch is only reported once no further event has
+arrived for a short quiet period, so an editor writing a file in several
+steps or a branch checkout touching hundreds of files triggers a single run.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from .ignore import GITIGNORE, IgnoreRules
+from .workspace import list_directory, get_ignore_spec
+
+DEBOUNCE_SECONDS: float = 0.2
+POLL_INTERVAL: float = 0.5
+
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_DELETE_SELF: int = 0x00000400
+IN_Q_OVERFLOW: int = 0x00004000
+IN_IGNORED: int = 0x00008000
+IN_ISDIR: int = 0x40000000
+IN_NONBLOCK: int = os.O_NONBLOCK
+IN_CLOEXEC: int = 0o2000000
+WATCH_MASK: int = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """
+    Detects changes to the Python files of a project by polling stats.
+    """
+
+    def __init__(self, root_dir: str, rules: IgnoreRules) -> None:
+        self.root_dir: str = root_dir
+        self.rules: IgnoreRules = rules
+        self._dirs: Dict[str, int] = {}
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._ignore_files: Dict[str, Tuple[int, int]] = {}
+        self._add_tree("")
+
+    def files(self) -> List[str]:
+        """Returns the Python files currently known to the watcher."""
+        return list(self._files)
+
+    def read(self, timeout: float) -> Set[str]:
+        """
+        Waits up to timeout seconds and returns the files that changed.
+
+        Parameters:
+            timeout (float): Seconds to wait for changes
+        Returns:
+            Set[str]: Relative paths of changed, created or deleted files
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = self._poll()
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def event_fd(self) -> Optional[int]:
+        """Returns None, since changes are only found by polling."""
+        return None
+
+    def close(self) -> None:
+        pass
+
+    def _poll(self) -> Set[str]:
+        changed: Set[str] = set()
+        for rel_dir in self._stale_ignore_files():
+            changed.update(self._reload(rel_dir))
+        for rel_dir, mtime in list(self._dirs.items()):
+            if rel_dir not in self._dirs:
+                continue
+            current = self._mtime(rel_dir)
+            if current is None:
+                changed.update(self._remove_tree(rel_dir))
+            elif current != mtime:
+                changed.update(self._relist(rel_dir))
+
+        for rel_path, signature in list(self._files.items()):
+            current_signature = self._signature(rel_path)
+            if current_signature != signature:
+                changed.add(rel_path)
+                if current_signature is None:
+                    del self._files[rel_path]
+                else:
+                    self._files[rel_path] = current_signature
+        return changed
+
+    def _add_tree(self, rel_dir: str) -> Set[str]:
+        """Starts tracking a directory and everything below it."""
+        added: Set[str] = set()
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            mtime = self._mtime(current)
+            listing = list_directory(self.root_dir, current, self.rules)
+            if mtime is None or listing is None:
+                continue
+            self._dirs[current] = mtime
+            ignore_signature = self._signature(os.path.join(current, GITIGNORE))
+            if ignore_signature is not None:
+                self._ignore_files[current] = ignore_signature
+            files, subdirs = listing
+            for name in files:
+                rel_path = os.path.join(current, name)
+                signature = self._signature(rel_path)
+                if signature is not None:
+                    self._files[rel_path] = signature
+                    added.add(rel_path)
+            stack.extend(os.path.join(current, name) for name in subdirs)
+        return added
+
+    def _remove_tree(self, rel_dir: str) -> Set[str]:
+        """Stops tracking a directory and everything below it."""
+        for directory in [d for d in self._dirs if _within(d, rel_dir)]:
+            del self._dirs[directory]
+            self._ignore_files.pop(directory, None)
+        removed = {path for path in self._files if _within(path, rel_dir)}
+        for rel_path in removed:
+            del self._files[rel_path]
+        return removed
+
+    def _stale_ignore_files(self) -> List[str]:
+        """
+        Returns the top-most tracked directories whose `.gitignore` was
+        created, edited or deleted since they were listed.
+        """
+        stale: List[str] = []
+        for rel_dir in sorted(self._dirs):
+            if any(_within(rel_dir, parent) for parent in stale):
+                continue
+            known = self._ignore_files.get(rel_dir)
+            # Creating a file changes its directory's mtime.
+            if known is None and self._mtime(rel_dir) == self._dirs[rel_dir]:
+                continue
+            if self._signature(os.path.join(rel_dir, GITIGNORE)) != known:
+                stale.append(rel_dir)
+        return stale
+
+    def _reload(self, rel_dir: str) -> Set[str]:
+        """
+        Compiles the ignore rules of a directory again and rescans it, and
+        returns the files that are now tracked or no longer tracked.
+        """
+        _reload_rules(self.rules, rel_dir)
+        before = set(self._files)
+        self._remove_tree(rel_dir)
+        self._add_tree(rel_dir)
+        return before.symmetric_difference(self._files)
+
+    def _relist(self, rel_dir: str) -> Set[str]:
+        """Lists a directory again and returns the files added or removed."""
+        listing = list_directory(self.root_dir, rel_dir, self.rules)
+        if listing is None:
+            return self._remove_tree(rel_dir)
+        self._dirs[rel_dir] = self._mtime(rel_dir) or 0
+
+        files, subdirs = listing
+        changed: Set[str] = set()
+        current = {os.path.join(rel_dir, name) for name in files}
+        for rel_path in [
+            path for path in self._files if os.path.dirname(path) == rel_dir
+        ]:
+            if rel_path not in current:
+                del self._files[rel_path]
+                changed.add(rel_path)
+        for rel_path in current - set(self._files):
+            signature = self._signature(rel_path)
+            if signature is not None:
+                self._files[rel_path] = signature
+                changed.add(rel_path)
+
+        current_dirs = {os.path.join(rel_dir, name) for name in subdirs}
+        known_dirs = {
+            path for path in self._dirs if path and os.path.dirname(path) == rel_dir
+        }
+        for removed in known_dirs - current_dirs:
+            changed.update(self._remove_tree(removed))
+        for added in current_dirs - known_dirs:
+            changed.update(self._add_tree(added))
+        return changed
+
+    def _mtime(self, rel_dir: str) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.root_dir, rel_dir)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _signature(self, rel_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.root_dir, rel_path))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+class InotifyWatcher:
+    """
+    Detects changes to the Python files of a project with Linux inotify.
+    """
+
+    def __init__(self, root_dir: str, rules: IgnoreRules, libc: ctypes.CDLL) -> None:
+        self.root_dir: str = root_dir
+        self.rules: IgnoreRules = rules
+        self._libc = libc
+        self._fd: int = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: Dict[int, str] = {}
+        self._files: Set[str] = set()
+        self._warned: bool = False
+        self._unwatched: List[str] = []
+        self._add_tree("")
+        if self._unwatched:
+            os.close(self._fd)
+            raise OSError(errno.ENOSPC, "inotify watch limit reached")
+
+    @classmethod
+    def available(cls) -> Optional[ctypes.CDLL]:
+        """Returns the C library if it provides inotify, else None."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+        except OSError:
+            return None
+        if not hasattr(libc, "inotify_init1"):
+            return None
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        return libc
+
+    def files(self) -> List[str]:
+        """Returns the Python files currently known to the watcher."""
+        return list(self._files)
+
+    def read(self, timeout: float) -> Set[str]:
+        """
+        Waits up to timeout seconds and returns the files that changed.
+
+        Parameters:
+            timeout (float): Seconds to wait for changes
+        Returns:
+            Set[str]: Relative paths of changed, created or deleted files
+        """
+        ready, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not ready:
+            return set()
+
+        changed: Set[str] = set()
+        stale: Set[str] = set()
+        overflowed = False
+        try:
+            buffer = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            raw_name = buffer[
+                offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length
+            ]
+            offset += EVENT_HEADER.size + length
+            name = os.fsdecode(raw_name.rstrip(b"\0"))
+
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            rel_dir = self._watches.get(wd)
+            if rel_dir is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+                continue
+            if not name:
+                continue
+
+            rel_path = os.path.join(rel_dir, name)
+            if name == GITIGNORE and not mask & IN_ISDIR:
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM):
+                    stale.add(rel_dir)
+            elif mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    if not self.rules.is_ignored(rel_path, is_dir=True):
+                        changed.update(self._add_tree(rel_path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changed.update(self._forget_tree(rel_path))
+            elif name.endswith(".py") and not self.rules.is_ignored(rel_path):
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._files.discard(rel_path)
+                    changed.add(rel_path)
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self._files.add(rel_path)
+                    changed.add(rel_path)
+
+        if overflowed:
+            # Lost events may have created directories or edited ignore files.
+            before = set(self._files)
+            self._reload("")
+            changed = before | self._files
+        else:
+            for rel_dir in sorted(stale):
+                if not any(_within(rel_dir, parent) for parent in stale - {rel_dir}):
+                    changed.update(self._reload(rel_dir))
+        self._warn_unwatched()
+        return changed
+
+    def event_fd(self) -> Optional[int]:
+        """Returns the inotify descriptor, readable whenever events are pending."""
+        return self._fd
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def _add_tree(self, rel_dir: str) -> Set[str]:
+        """Watches a directory and every non-ignored directory below it."""
+        added: Set[str] = set()
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            path = os.fsencode(os.path.join(self.root_dir, current))
+            wd = self._libc.inotify_add_watch(self._fd, path, WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = current
+            elif ctypes.get_errno() in (errno.ENOSPC, errno.ENOMEM):
+                # Still list the directory, so its files are known.
+                self._unwatched.append(current)
+            else:
+                continue
+            # List after adding the watch so files created in between are
+            # seen either here or as an event.
+            listing = list_directory(self.root_dir, current, self.rules)
+            if listing is None:
+                continue
+            files, subdirs = listing
+            for name in files:
+                rel_path = os.path.join(current, name)
+                self._files.add(rel_path)
+                added.add(rel_path)
+            stack.extend(os.path.join(current, name) for name in subdirs)
+        return added
+
+    def _warn_unwatched(self) -> None:
+        """Warns once that directories couldn't be watched."""
+        if self._unwatched and not self._warned:
+            self._warned = True
+            sys.stderr.write(
+                f"Warning: inotify watch limit reached, changes below "
+                f"{self._unwatched[0] or '.'} are not seen; raise "
+                f"fs.inotify.max_user_watches\n"
+            )
+        self._unwatched.clear()
+
+    def _forget_tree(self, rel_dir: str) -> Set[str]:
+        """Forgets the files below a directory that was removed or moved away."""
+        removed = {path for path in self._files if _within(path, rel_dir)}
+        self._files -= removed
+        for wd, directory in list(self._watches.items()):
+            if _within(directory, rel_dir):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+        return removed
+
+    def _reload(self, rel_dir: str) -> Set[str]:
+        """
+        Compiles the ignore rules of a directory again and watches it anew,
+        and returns the files that are now watched or no longer watched.
+        """
+        _reload_rules(self.rules, rel_dir)
+        before = set(self._files)
+        self._forget_tree(rel_dir)
+        self._add_tree(rel_dir)
+        return before.symmetric_difference(self._files)
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+
+
+def _within(path: str, rel_dir: str) -> bool:
+    """Returns true if a root-relative path is rel_dir or lies below it."""
+    return not rel_dir or path == rel_dir or path.startswith(rel_dir + os.sep)
+
+
+def _reload_rules(rules: IgnoreRules, rel_dir: str) -> None:
+    """Drops the ignore rules of a directory whose `.gitignore` changed."""
+    root_spec = get_ignore_spec(rules.root_dir) if not rel_dir else None
+    rules.invalidate(rel_dir, root_spec)
+
+
+def open_watcher(root_dir: str, use_inotify: bool = True) -> Watcher:
+    """
+    Returns an inotify watcher for a project when the platform supports it,
+    otherwise a polling watcher.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        use_inotify (bool): Whether inotify may be used
+    Returns:
+        Watcher: Watcher over the project's Python files
+    """
+    rules = IgnoreRules(root_dir, get_ignore_spec(root_dir))
+    libc = InotifyWatcher.available() if use_inotify else None
+    if libc is not None:
+        try:
+            return InotifyWatcher(root_dir, rules, libc)
+        except OSError as error:
+            sys.stderr.write(f"Warning: {error}, polling for changes instead\n")
+    return PollingWatcher(root_dir, rules)
+
+
+def watch_changes(
+    watcher: Watcher, debounce: float = DEBOUNCE_SECONDS
+) -> Iterator[Set[str]]:
+    """
+    Yields batches of changed files, each once no further change has arrived
+    for debounce seconds. Runs until the consumer stops iterating.
+
+    Parameters:
+        watcher (Watcher): Watcher to read events from
+        debounce (float): Quiet period that ends a batch, in seconds
+    Returns:
+        Iterator[Set[str]]: Relative paths of the changed files of each batch
+    """
+    while True:
+        batch = watcher.read(3600.0)
+        if not batch:
+            continue
+        while True:
+            more = watcher.read(debounce)
+            if not more:
+                break
+            batch |= more
+        yield batch
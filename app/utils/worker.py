@@ -0,0 +1,497 @@
+"""
+Resident pytest worker for `ptm test --warm`.
+
+Most of the time before the first test runs goes to interpreter startup and
+to importing third-party dependencies. The worker pays for both once: it
+imports the dependencies declared by the project, then waits on a Unix socket
+and forks a fresh child for every run. Each child starts from the same clean,
+already-warm state, runs pytest with the client's terminal as its stdout and
+stderr, and exits; nothing a run imports or patches survives into the next.
+
+Project modules are never pre-imported, so edits to them are always picked
+up. When a lockfile or the project metadata changes the worker tells the
+client to start a new one and exits. An idle worker exits on its own.
+
+This module only depends on the standard library so it can be run as a
+script without importing the project's own packages:
+
+    python worker.py ROOT_DIR
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import re
+import select
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from typing import Any, Dict, List, Sequence, Set
+
+LOCKFILES: Sequence[str] = (
+    "pyproject.toml",
+    "uv.lock",
+    "poetry.lock",
+    "pdm.lock",
+    "Pipfile.lock",
+    "requirements.txt",
+    "requirements-dev.txt",
+    "setup.cfg",
+    "setup.py",
+)
+SOCKET_NAME: str = os.path.join(".ptm", "worker.sock")
+LOG_NAME: str = os.path.join(".ptm", "worker.log")
+MAX_SOCKET_PATH: int = 100
+STARTUP_TIMEOUT: float = 120.0
+IDLE_TIMEOUT: float = 1800.0
+REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def socket_path(root_dir: str, name: str = SOCKET_NAME) -> str:
+    """
+    Returns the path of a Unix socket of a project, by default the worker's.
+    Socket paths are limited to about a hundred bytes, so deep projects use
+    a directory private to the current user instead, see `private_dir`.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        name (str): Path of the socket relative to the project root
+    Returns:
+        str: Path of the Unix socket
+    Raises:
+        RuntimeError: If the private directory is accessible to other users
+    """
+    path = os.path.join(os.path.abspath(root_dir), name)
+    if len(os.fsencode(path)) <= MAX_SOCKET_PATH:
+        return path
+    digest = hashlib.sha256(os.fsencode(os.path.abspath(root_dir))).hexdigest()[:16]
+    if name == SOCKET_NAME:
+        return os.path.join(private_dir(), f"ptm-{digest}.sock")
+    return os.path.join(private_dir(), f"ptm-{digest}-{os.path.basename(name)}")
+
+
+def private_dir() -> str:
+    """
+    Returns a directory only the current user can access: `$XDG_RUNTIME_DIR`
+    when it is set up that way, else a `ptm-<uid>` directory in the temp
+    directory, created with mode 0700. A socket in a shared directory could
+    be bound by another user first and receive the client's terminal.
+
+    Returns:
+        str: Path of the directory
+    Raises:
+        RuntimeError: If the directory is owned by another user or open to
+            other users
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and _is_private(runtime_dir):
+        return runtime_dir
+
+    directory = os.path.join(tempfile.gettempdir(), f"ptm-{os.getuid()}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    if not _is_private(directory):
+        raise RuntimeError(f"{directory} is not private to the current user")
+    return directory
+
+
+def check_socket_owner(path: str) -> None:
+    """
+    Checks that a socket about to be connected to belongs to the current
+    user. A missing socket passes, since connecting reports that.
+
+    Parameters:
+        path (str): Path of the Unix socket
+    Returns:
+        None
+    Raises:
+        RuntimeError: If the path isn't a socket of the current user
+    """
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise RuntimeError(f"{path} is not a socket of the current user")
+
+
+def lockfile_fingerprint(root_dir: str) -> str:
+    """
+    Returns a hash over the lockfiles and dependency declarations of a project.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+    Returns:
+        str: Hex digest that changes whenever one of the files changes
+    """
+    digest = hashlib.sha256()
+    for name in LOCKFILES:
+        try:
+            with open(os.path.join(root_dir, name), "rb") as file:
+                digest.update(name.encode() + b"\0" + file.read() + b"\0")
+        except OSError:
+            digest.update(name.encode() + b"\0missing\0")
+    return digest.hexdigest()
+
+
+def declared_dependencies(root_dir: str) -> List[str]:
+    """
+    Returns the distribution names a project depends on, read from
+    `pyproject.toml` and `requirements*.txt`.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+    Returns:
+        List[str]: Distribution names, without versions or extras
+    """
+    requirements: List[str] = []
+    try:
+        import tomllib
+
+        with open(os.path.join(root_dir, "pyproject.toml"), "rb") as file:
+            pyproject = tomllib.load(file)
+    except (ImportError, OSError, ValueError):
+        pyproject = {}
+
+    project = pyproject.get("project", {})
+    requirements.extend(project.get("dependencies", []))
+    for extra in project.get("optional-dependencies", {}).values():
+        requirements.extend(extra)
+    for group in pyproject.get("dependency-groups", {}).values():
+        requirements.extend(item for item in group if isinstance(item, str))
+    poetry = pyproject.get("tool", {}).get("poetry", {})
+    requirements.extend(poetry.get("dependencies", {}))
+    for group in poetry.get("group", {}).values():
+        requirements.extend(group.get("dependencies", {}))
+
+    for name in ("requirements.txt", "requirements-dev.txt"):
+        try:
+            with open(os.path.join(root_dir, name), "r") as file:
+                requirements.extend(
+                    line for line in file if not line.lstrip().startswith(("#", "-"))
+                )
+        except OSError:
+            continue
+
+    names: List[str] = []
+    for requirement in requirements:
+        match = REQUIREMENT_NAME.match(requirement)
+        if match and match.group(1).lower() != "python" and match.group(1) not in names:
+            names.append(match.group(1))
+    return names
+
+
+def preload_modules(root_dir: str) -> List[str]:
+    """
+    Imports the top-level modules of a project's declared dependencies,
+    skipping anything that lives in the project itself or isn't installed.
+    Modules that raise anything but ImportError are skipped too, with their
+    traceback printed to the worker log.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+    Returns:
+        List[str]: Names of the modules that were imported
+    """
+    from importlib.metadata import packages_distributions
+
+    modules_by_dist: Dict[str, Set[str]] = {}
+    for module, dists in packages_distributions().items():
+        for dist in dists:
+            modules_by_dist.setdefault(_normalize(dist), set()).add(module)
+
+    imported: List[str] = ["pytest"]
+    importlib.import_module("pytest")
+    for dist in declared_dependencies(root_dir):
+        modules = modules_by_dist.get(_normalize(dist), {dist.replace("-", "_")})
+        for module in sorted(modules):
+            if module.startswith("_") or os.path.exists(os.path.join(root_dir, module)):
+                continue
+            if os.path.exists(os.path.join(root_dir, f"{module}.py")):
+                continue
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                continue
+            except Exception:
+                # stdout is the worker log; a broken dependency shouldn't
+                # keep the worker from starting.
+                print(f"Failed to preload {module}:", flush=True)
+                traceback.print_exc(file=sys.stdout)
+                sys.stdout.flush()
+                continue
+            imported.append(module)
+    return imported
+
+
+def serve(root_dir: str) -> None:
+    """
+    Runs the worker of a project until it goes idle or its lockfiles change.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+    Returns:
+        None
+    """
+    os.chdir(root_dir)
+    modules = preload_modules(root_dir)
+    print(f"Preloaded {len(modules)} modules: {', '.join(modules)}", flush=True)
+    fingerprint = lockfile_fingerprint(root_dir)
+
+    path = socket_path(root_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    inode = os.stat(path).st_ino
+    server.listen()
+    server.settimeout(IDLE_TIMEOUT)
+
+    try:
+        while True:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                print("Idle, exiting", flush=True)
+                return
+            with connection:
+                connection.settimeout(None)
+                request, fds = _receive(connection)
+                try:
+                    if request.get("stop"):
+                        os.remove(path)
+                        _send(connection, {"stopped": True})
+                        print("Stopped", flush=True)
+                        return
+                    if "args" not in request:
+                        continue
+                    if request.get("fingerprint") != fingerprint:
+                        # Unlink first so the client can't reach this worker again.
+                        os.remove(path)
+                        _send(connection, {"restart": True})
+                        print("Lockfiles changed, exiting", flush=True)
+                        return
+                    exit_code = _run_forked(root_dir, request["args"], fds, connection)
+                    _send(connection, {"exit_code": exit_code})
+                except OSError:
+                    continue
+                finally:
+                    for fd in fds:
+                        os.close(fd)
+    finally:
+        server.close()
+        # A newer worker may already own the path.
+        try:
+            if os.stat(path).st_ino == inode:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def run_in_worker(root_dir: str, test_files: Sequence[str], args: Sequence[str]) -> int:
+    """
+    Runs pytest in the project's resident worker, starting one if needed. The
+    run's output goes straight to this process's stdout and stderr.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+        test_files (Sequence[str]): Test files to run, or all tests if empty
+        args (Sequence[str]): Extra arguments passed through to pytest
+    Returns:
+        int: Exit code of pytest
+    Raises:
+        RuntimeError: If the platform lacks Unix sockets or fork, or the
+            worker can't be started
+    """
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        raise RuntimeError("The warm worker needs Unix sockets and fork")
+
+    request = {
+        "args": [*args, *test_files],
+        "fingerprint": lockfile_fingerprint(root_dir),
+    }
+    for _ in range(3):
+        connection = _connect(root_dir)
+        with connection:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            socket.send_fds(
+                connection,
+                [json.dumps(request).encode() + b"\n"],
+                [sys.stdout.fileno(), sys.stderr.fileno()],
+            )
+            response = _read_line(connection)
+        if response.get("restart"):
+            continue
+        if "exit_code" not in response:
+            raise RuntimeError("The warm worker closed the connection")
+        return int(response["exit_code"])
+    raise RuntimeError("The warm worker keeps restarting")
+
+
+def stop_worker(root_dir: str) -> bool:
+    """
+    Asks the project's worker to exit.
+
+    Parameters:
+        root_dir (str): Root directory of the project
+    Returns:
+        bool: True if a worker was running, else false
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with connection:
+        path = socket_path(root_dir)
+        check_socket_owner(path)
+        try:
+            connection.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+        socket.send_fds(connection, [b'{"stop": true}\n'], [])
+        return bool(_read_line(connection).get("stopped"))
+
+
+def _connect(root_dir: str) -> socket.socket:
+    """Connects to the project's worker, starting it first if it isn't running."""
+    path = socket_path(root_dir)
+    check_socket_owner(path)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+        return connection
+    except (FileNotFoundError, ConnectionRefusedError):
+        connection.close()
+
+    # Only clients connect, and they run inside the package.
+    from .index import make_state_dir
+
+    log_path = os.path.join(root_dir, LOG_NAME)
+    make_state_dir(os.path.dirname(log_path))
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), os.path.abspath(root_dir)],
+            cwd=root_dir,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The warm worker failed to start, see {log_path}")
+        check_socket_owner(path)
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(path)
+            return connection
+        except (FileNotFoundError, ConnectionRefusedError):
+            connection.close()
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"The warm worker did not start in time, see {log_path}")
+
+
+def _run_forked(
+    root_dir: str, args: List[str], fds: List[int], connection: socket.socket
+) -> int:
+    """
+    Runs pytest in a forked child writing to the client's file descriptors.
+    The child is interrupted if the client disconnects before it finishes.
+    """
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            connection.close()
+            os.dup2(fds[0], 1)
+            os.dup2(fds[1], 2)
+            sys.stdout = open(1, "w", buffering=1, closefd=False)
+            sys.stderr = open(2, "w", buffering=1, closefd=False)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            sys.argv = ["pytest", *args]
+
+            import pytest
+
+            exit_code = int(pytest.main(args))
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+
+    while True:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            return os.waitstatus_to_exitcode(status)
+        readable, _, _ = select.select([connection], [], [], 0.1)
+        if readable and not connection.recv(1, socket.MSG_PEEK):
+            os.kill(pid, signal.SIGINT)
+            _, status = os.waitpid(pid, 0)
+            raise ConnectionResetError("Client disconnected")
+
+
+def _receive(connection: socket.socket) -> Any:
+    """Reads a JSON request line and the file descriptors sent along with it."""
+    data, fds, _, _ = socket.recv_fds(connection, 1 << 16, 2)
+    while not data.endswith(b"\n"):
+        chunk = connection.recv(1 << 16)
+        if not chunk:
+            break
+        data += chunk
+    try:
+        return json.loads(data), list(fds)
+    except ValueError:
+        return {}, list(fds)
+
+
+def _send(connection: socket.socket, response: Dict[str, Any]) -> None:
+    connection.sendall(json.dumps(response).encode() + b"\n")
+
+
+def _read_line(connection: socket.socket) -> Dict[str, Any]:
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = connection.recv(1 << 16)
+        if not chunk:
+            break
+        data += chunk
+    try:
+        return json.loads(data)
+    except ValueError:
+        return {}
+
+
+def _is_private(directory: str) -> bool:
+    """Returns true if a directory is owned by and only open to this user."""
+    try:
+        info = os.lstat(directory)
+    except OSError:
+        return False
+    return (
+        stat.S_ISDIR(info.st_mode)
+        and info.st_uid == os.getuid()
+        and not info.st_mode & 0o077
+    )
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+if __name__ == "__main__":
+    # Only the project, not this script's directory, belongs on the path.
+    sys.path[0] = os.path.abspath(sys.argv[1])
+    serve(sys.argv[1])
@@ -14,24 +14,38 @@ while respecting project structure and git configurations.
 """
 
 import os
-import shutil
-import subprocess
-from pathspec import PathSpec
-from importlib.resources import files as package_files
-from typing import Final, List, Set
-
-
-def in_python_project(root_dir: str) -> bool:
-    """
-    Returns true if the root directory belongs to a Python
-    project, else false.
-
-    Parameters:
-        root_dir (str): Root directory of the project
-    Returns:
-        bool: True if python project, else false
-    """
-    key_files: Final[Set[str]] = {
+from collections import deque
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Deque,
+    Dict,
+    Final,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+from .ignore import ALWAYS_IGNORED, GITIGNORE, IgnoreRules
+from .instrument import count, phase, timed
+from .matcher import IgnoreMatcher
+
+# pathspec, git, the file index and the thread pool are imported where they
+# are used, so the CLI only pays for them in commands that need them.
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from pathspec import PathSpec
+    from .index import FileIndex
+
+TEST_STUB: Final[str] = "import pytest\n\n"
+MAX_WRITE_WORKERS: Final[int] = 16
+DETECTION_MAX_DEPTH: Final[int] = 3
+DETECTION_MAX_DIRS: Final[int] = 2000
+PROJECT_MARKER_FILES: Final[FrozenSet[str]] = frozenset(
+    {
         "pyproject.toml",
         "setup.py",
         "requirements.txt",
@@ -41,22 +55,116 @@ def in_python_project(root_dir: str) -> bool:
         "uv.lock",
         ".python-version",
     }
-    key_dirs: Final[Set[str]] = {"venv", ".venv", "env"}
+)
+PROJECT_MARKER_DIRS: Final[FrozenSet[str]] = frozenset({"venv", ".venv", "env"})
+SKIPPED_DIRS: Final[FrozenSet[str]] = frozenset(
+    {"node_modules", "site-packages", "__pycache__", "venv", "env"}
+)
+
+
+def in_python_project(
+    root_dir: str,
+    max_depth: int = DETECTION_MAX_DEPTH,
+    max_dirs: int = DETECTION_MAX_DIRS,
+) -> bool:
+    """
+    Returns true if the root directory belongs to a Python
+    project, else false.
 
-    if any(os.path.isfile(os.path.join(root_dir, file)) for file in key_files):
-        return True
+    A directory is a Python project if it holds one of the project marker
+    files or a virtual environment directory. Otherwise the tree is searched
+    breadth-first for a `.py` file, stopping at the first one found. The
+    search skips hidden, vendored and ignored directories and is bounded by
+    both depth and the number of directories listed, so running from a home
+    directory or a large data directory answers quickly.
 
-    if any(os.path.isdir(os.path.join(root_dir, directory)) for directory in key_dirs):
+    Parameters:
+        root_dir (str): Root directory of the project
+        max_depth (int): Deepest directory level searched for `.py` files,
+            where root_dir is level 0
+        max_dirs (int): Maximum number of directories listed by the search
+    Returns:
+        bool: True if python project, else false
+    """
+    if has_project_marker(root_dir):
         return True
 
-    for _, _, files in os.walk(root_dir):
-        if any(file.endswith(".py") for file in files):
-            return True
+    rules = IgnoreRules(root_dir, get_ignore_spec(root_dir))
+    queue: Deque[Tuple[str, int]] = deque([("", 0)])
+    listed = 0
+
+    while queue and listed < max_dirs:
+        rel_dir, depth = queue.popleft()
+        listed += 1
+        count("directories visited")
+        try:
+            with os.scandir(os.path.join(root_dir, rel_dir)) as iterator:
+                entries: List[os.DirEntry] = list(iterator)
+        except OSError:
+            continue
+
+        for entry in entries:
+            if entry.name.endswith(".py") and entry.is_file():
+                return True
+
+        if depth >= max_depth:
+            continue
+        has_gitignore = any(entry.name == GITIGNORE for entry in entries)
+        spec: IgnoreMatcher = rules.spec_for(rel_dir, has_gitignore)
+        for entry in entries:
+            name = entry.name
+            if name.startswith(".") or name in SKIPPED_DIRS:
+                continue
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            rel_path = os.path.join(rel_dir, name)
+            if not spec.match_file(rel_path + "/"):
+                queue.append((rel_path, depth + 1))
 
     return False
 
 
-def get_ignore_spec(root_dir: str) -> PathSpec:
+def find_project_root(start_dir: str) -> Optional[str]:
+    """
+    Searches start_dir and its ancestors for the root of a Python project,
+    the way git searches upwards for a repository.
+
+    The nearest directory holding a project marker wins. The search stops at
+    the top of the enclosing git repository; that directory is returned when
+    it contains Python files even without a marker.
+
+    Parameters:
+        start_dir (str): Directory to start searching from
+    Returns:
+        Optional[str]: Absolute path of the project root, or None if there
+        is no enclosing Python project
+    """
+    current = os.path.abspath(start_dir)
+
+    while True:
+        if has_project_marker(current):
+            return current
+        if os.path.exists(os.path.join(current, ".git")):
+            return current if in_python_project(current) else None
+
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def has_project_marker(directory: str) -> bool:
+    """Returns true if a directory holds a project marker file or a virtualenv."""
+    if any(
+        os.path.isfile(os.path.join(directory, file)) for file in PROJECT_MARKER_FILES
+    ):
+        return True
+    return any(
+        os.path.isdir(os.path.join(directory, name)) for name in PROJECT_MARKER_DIRS
+    )
+
+
+def get_ignore_spec(root_dir: str) -> "PathSpec":
     """
     Returns a PathSpec object for filtering files based on ignore patterns.
 
@@ -72,18 +180,24 @@ def get_ignore_spec(root_dir: str) -> PathSpec:
         PathSpec: A PathSpec object constructed using `gitwildmatch` rules,
         which can be used to match files against ignore patterns.
     """
+    from importlib.resources import files as package_files
+    from pathspec import PathSpec
+
     gitignore_path: str = os.path.join(root_dir, ".gitignore")
 
-    if os.path.exists(gitignore_path):
-        with open(gitignore_path, "r") as file:
-            return PathSpec.from_lines(pattern_factory="gitwildmatch", lines=file)
-    else:
-        template_path = package_files("app.templates").joinpath("python.gitignore")
-        with template_path.open("r") as file:
-            return PathSpec.from_lines(pattern_factory="gitwildmatch", lines=file)
+    with phase("ignore spec"):
+        if os.path.exists(gitignore_path):
+            with open(gitignore_path, "r") as file:
+                return PathSpec.from_lines(pattern_factory="gitwildmatch", lines=file)
+        else:
+            template_path = package_files("app.templates").joinpath("python.gitignore")
+            with template_path.open("r") as file:
+                return PathSpec.from_lines(pattern_factory="gitwildmatch", lines=file)
 
 
-def get_python_files(root_dir: str, use_git: bool) -> List[str]:
+def get_python_files(
+    root_dir: str, use_git: bool, use_cache: bool = False
+) -> List[str]:
     """
     Returns the relative path of all Python files in a project
     relative to the root directory.
@@ -91,46 +205,165 @@ def get_python_files(root_dir: str, use_git: bool) -> List[str]:
     Parameters:
         root_dir (str): Root directory of the Python project
         use_git (bool): Flag indicating whether or not use git for filtering files
+        use_cache (bool): Reuse and update the file index under `.ptm/cache`
     Returns:
         list[str] | None: Relative paths of all python files, except tests
     Raises:
         NotFoundError: If a file is not found or a path is broken
         RuntimeError: If a shell/subprocess command fails to execute
     """
+    return list(iter_python_files(root_dir, use_git, use_cache))
+
+
+def iter_python_files(
+    root_dir: str, use_git: bool, use_cache: bool = False
+) -> Iterator[str]:
+    """
+    Yields the relative path of all Python files in a project as they are
+    discovered, so callers can start working before the walk has finished.
+
+    The arguments are validated immediately; discovery itself runs lazily
+    while the iterator is consumed. The file index is only written back
+    once the iterator is exhausted.
+
+    Parameters:
+        root_dir (str): Root directory of the Python project
+        use_git (bool): Flag indicating whether or not use git for filtering files
+        use_cache (bool): Reuse and update the file index under `.ptm/cache`
+    Returns:
+        Iterator[str]: Relative paths of all python files, except tests
+    Raises:
+        NotFoundError: If a file is not found or a path is broken
+        RuntimeError: If a shell/subprocess command fails to execute
+    """
     if not os.path.isdir(root_dir):
         raise FileNotFoundError(f"Directory {root_dir} not found")
 
     if use_git:
-        if not shutil.which("git"):
-            raise RuntimeError("Git is not installed on the system.")
-        if not os.path.exists(os.path.join(root_dir, ".git")):
-            raise ModuleNotFoundError(f"{root_dir} is not a git repo.")
-        if not os.path.exists(os.path.join(root_dir, ".gitignore")):
-            raise FileNotFoundError(
-                f"Directory {root_dir} is a git repo but does not have a gitignore config."
-            )
+        from .git import ensure_git_repo, iter_git_python_files
 
-        try:
-            git_py_files: str = subprocess.check_output(
-                ["git", "-C", root_dir, "ls-files", "*.py"],
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-            )
+        ensure_git_repo(root_dir)
+        return timed("walk", iter_git_python_files(root_dir))
 
-            return git_py_files.strip().splitlines()
-        except subprocess.CalledProcessError as error:
-            raise RuntimeError("Could not filter files using git") from error
+    rules = IgnoreRules(root_dir, get_ignore_spec(root_dir))
+    if not use_cache:
+        return timed("walk", _scan_python_files(root_dir, rules))
 
-    spec: PathSpec = get_ignore_spec(root_dir)
-    python_files: List[str] = []
+    from .index import FileIndex
 
-    for root, _, files in os.walk(root_dir):
-        for file in files:
-            rel_path = os.path.relpath(os.path.join(root, file), root_dir)
-            if file.endswith(".py") and not spec.match_file(rel_path):
-                python_files.append(rel_path)
+    with phase("index"):
+        index = FileIndex.load(root_dir)
+    return timed("walk", _scan_with_index(root_dir, rules, index))
 
-    return python_files
+
+def _scan_with_index(
+    root_dir: str, rules: IgnoreRules, index: "FileIndex"
+) -> Iterator[str]:
+    """Scans with a file index and saves it once the walk is complete."""
+    yield from _scan_python_files(root_dir, rules, index)
+    index.save()
+
+
+def _scan_python_files(
+    root_dir: str, rules: IgnoreRules, index: Optional["FileIndex"] = None
+) -> Iterator[str]:
+    """
+    Yields the relative path of every non-ignored Python file below root_dir.
+
+    The tree is traversed in the same top-down order as `os.walk`. Ignored
+    directories are pruned before they are entered, so subtrees such as
+    virtual environments are never listed. As in git, nothing below an
+    ignored directory can be re-included by a negated pattern.
+
+    When an index is given, directories it still holds a valid listing for
+    are not listed again, and every fresh listing is recorded in it.
+
+    Parameters:
+        root_dir (str): Root directory of the Python project
+        rules (IgnoreRules): Layered ignore rules for root_dir
+        index (Optional[FileIndex]): Index of the previous walk
+    Returns:
+        Iterator[str]: Relative paths of the Python files
+    """
+    stack: List[Tuple[str, bool]] = [("", False)]
+
+    while stack:
+        rel_dir, stale = stack.pop()
+        listing = None if index is None or stale else index.lookup(rel_dir)
+
+        if listing is None:
+            listing = list_directory(root_dir, rel_dir, rules)
+            if listing is None:
+                continue
+            if index is not None:
+                stale = stale or index.ignore_changed(rel_dir)
+                index.record(rel_dir, *listing)
+        else:
+            count("directories cached")
+            count("files matched", len(listing[0]))
+
+        files, subdirs = listing
+        for name in files:
+            yield os.path.join(rel_dir, name)
+
+        stack.extend((os.path.join(rel_dir, name), stale) for name in reversed(subdirs))
+
+
+def list_directory(
+    root_dir: str, rel_dir: str, rules: IgnoreRules
+) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Lists one directory with `os.scandir` and matches its entries against the
+    ignore rules compiled for that directory.
+
+    Parameters:
+        root_dir (str): Root directory of the Python project
+        rel_dir (str): Directory to list, relative to root_dir
+        rules (IgnoreRules): Layered ignore rules for root_dir
+    Returns:
+        Optional[Tuple[List[str], List[str]]]: Names of the non-ignored Python
+        files and subdirectories, or None if the directory can't be listed
+    """
+    try:
+        with os.scandir(os.path.join(root_dir, rel_dir)) as iterator:
+            entries: List[os.DirEntry] = list(iterator)
+    except OSError:
+        return None
+
+    return match_entries(rel_dir, entries, rules)
+
+
+def match_entries(
+    rel_dir: str, entries: List[os.DirEntry], rules: IgnoreRules
+) -> Tuple[List[str], List[str]]:
+    """
+    Matches the entries of a listed directory against its ignore rules and
+    returns the names of the non-ignored Python files and subdirectories.
+    """
+    files: List[str] = []
+    subdirs: List[str] = []
+    with phase("match"):
+        has_gitignore = any(entry.name == GITIGNORE for entry in entries)
+        spec: IgnoreMatcher = rules.spec_for(rel_dir, has_gitignore)
+
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name)
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if entry.is_symlink() or entry.name in ALWAYS_IGNORED:
+                    continue
+                if not spec.match_file(rel_path + "/"):
+                    subdirs.append(entry.name)
+            elif entry.name.endswith(".py") and not spec.match_file(rel_path):
+                files.append(entry.name)
+
+    count("directories visited")
+    count("files matched", len(files))
+    return files, subdirs
 
 
 def create_tests_directory(root_dir: str) -> None:
@@ -157,17 +390,40 @@ def create_tests_directory(root_dir: str) -> None:
     os.makedirs(test_dir, exist_ok=True)
 
 
-def create_test_files(tests_dir: str, python_files: List[str]) -> None:
+@dataclass(frozen=True)
+class MaterializeResult:
+    """
+    Outcome of materializing test files.
+
+    created is the number of new test files written, skipped the number of
+    test files that already existed.
+    """
+
+    created: int
+    skipped: int
+
+
+def create_test_files(
+    tests_dir: str, python_files: Iterable[str], max_workers: int = MAX_WRITE_WORKERS
+) -> MaterializeResult:
     """
     Creates test files in the tests directory mirroring the structure
     of the provided Python files. Each Python file will have a corresponding
     test file in the tests directory with the same relative path structure.
 
+    The Python files are consumed as a stream. Each target directory is
+    created and listed once, the first time a file maps into it, to find the
+    test files that already exist, and new test files are written through a
+    bounded thread pool while the stream is still being read. Test files are
+    created exclusively, so one that appears while the stream is read is
+    skipped rather than overwritten.
+
     Parameters:
         tests_dir (str): Path to the tests directory
-        python_files (List[str]): List of relative paths to Python files from project root
+        python_files (Iterable[str]): Relative paths to Python files from project root
+        max_workers (int): Maximum number of concurrent writes
     Returns:
-        None
+        MaterializeResult: Number of test files created and skipped
     Raises:
         FileNotFoundError: If the tests directory is not found
         PermissionError: If the tests directory is not writable
@@ -177,22 +433,154 @@ def create_test_files(tests_dir: str, python_files: List[str]) -> None:
     if not os.access(tests_dir, os.W_OK):
         raise PermissionError(f"Directory {tests_dir} is not writable")
 
-    for python_file in python_files:
-        test_file = python_file
-        if test_file == "__init__.py":
-            continue
-        if test_file.startswith("test_"):
-            continue
+    listed: Dict[str, Set[str]] = {}
+    written: Dict[str, Set[str]] = {}
+    in_flight: Deque["Future"] = deque()
+    submitted = 0
+    created = 0
+    skipped = 0
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with phase("write"), ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for python_file in python_files:
+            test_file = get_test_file_path(python_file)
+            if test_file is None:
+                continue
+
+            test_dir, name = os.path.split(os.path.join(tests_dir, test_file))
+            existing = listed.get(test_dir)
+            if existing is None:
+                existing = listed[test_dir] = _ensure_directory(test_dir)
+                written[test_dir] = set()
+            if name in written[test_dir]:
+                continue
+            if name in existing:
+                skipped += 1
+                continue
+
+            written[test_dir].add(name)
+            in_flight.append(pool.submit(write_stub, os.path.join(test_dir, name)))
+            submitted += 1
+            if len(in_flight) >= max_workers * 4:
+                created += in_flight.popleft().result()
+
+        for future in in_flight:
+            created += future.result()
+
+    # Test files that appeared after their directory was listed were kept.
+    skipped += submitted - created
+
+    count("files created", created)
+    count("files skipped", skipped)
+    return MaterializeResult(created=created, skipped=skipped)
+
+
+def _ensure_directory(directory: str) -> Set[str]:
+    """Returns the entry names of a directory, creating it if it is missing."""
+    try:
+        return set(os.listdir(directory))
+    except FileNotFoundError:
+        os.makedirs(directory, exist_ok=True)
+        return set()
+
+
+def write_stub(test_file_path: str) -> bool:
+    """
+    Creates a test stub, unless a file already exists at its path.
+
+    The file is opened with `O_EXCL`, so a test file created by someone else
+    between listing the directory and writing is never overwritten. A stub
+    whose write fails is removed again.
+
+    Parameters:
+        test_file_path (str): Path of the test file to create
+    Returns:
+        bool: True if the stub was created, False if the file already existed
+    """
+    try:
+        fd = os.open(test_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    except FileExistsError:
+        return False
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(TEST_STUB)
+    except BaseException:
+        try:
+            os.remove(test_file_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def is_stub(test_file_path: str) -> bool:
+    """
+    Returns true if a test file is empty or still holds only the stub that
+    `write_stub` writes, so removing it loses nothing written by hand.
+
+    Parameters:
+        test_file_path (str): Path of the test file
+    Returns:
+        bool: True if the file is an untouched stub, else false
+    """
+    stub = TEST_STUB.encode()
+    try:
+        with open(test_file_path, "rb") as file:
+            content = file.read(len(stub) + 1)
+    except OSError:
+        return False
+    return content in (b"", stub)
 
-        if not test_file.startswith("test_"):
-            dirname = os.path.dirname(test_file)
-            basename = os.path.basename(test_file)
-            test_file = os.path.join(dirname, f"test_{basename}")
 
-        test_dir = os.path.dirname(os.path.join(tests_dir, test_file))
-        os.makedirs(test_dir, exist_ok=True)
+def in_tests_directory(python_file: str, tests_dirname: str = "tests") -> bool:
+    """
+    Returns true if a Python file lies inside the project's tests directory.
 
-        test_file_path = os.path.join(tests_dir, test_file)
-        if not os.path.exists(test_file_path):
-            with open(test_file_path, "w") as f:
-                f.write("import pytest\n\n")
+    Parameters:
+        python_file (str): Relative path of a Python file from project root
+        tests_dirname (str): Name of the tests directory in the project root
+    Returns:
+        bool: True if the file is inside the tests directory, else false
+    """
+    return python_file.replace(os.sep, "/").split("/", 1)[0] == tests_dirname
+
+
+def get_test_file_path(python_file: str) -> Optional[str]:
+    """
+    Returns the path of the test file for a Python file, relative to the
+    tests directory. `pkg/mod.py` maps to `pkg/test_mod.py`.
+
+    Parameters:
+        python_file (str): Relative path of a Python file from project root
+    Returns:
+        Optional[str]: Relative path of the test file, or None if the file
+        doesn't get a test file of its own
+    """
+    if python_file == "__init__.py":
+        return None
+    if python_file.startswith("test_"):
+        return None
+
+    dirname = os.path.dirname(python_file)
+    basename = os.path.basename(python_file)
+    return os.path.join(dirname, f"test_{basename}")
+
+
+def get_source_file_path(test_file: str) -> Optional[str]:
+    """
+    Returns the path of the source file a test file is mapped to, relative to
+    the project root. The inverse of `get_test_file_path`: `pkg/test_mod.py`
+    maps to `pkg/mod.py`.
+
+    Parameters:
+        test_file (str): Relative path of a test file from the tests directory
+    Returns:
+        Optional[str]: Relative path of the source file, or None if the file
+        isn't named like a test file
+    """
+    dirname = os.path.dirname(test_file)
+    basename = os.path.basename(test_file)
+    if not basename.startswith("test_") or not basename.endswith(".py"):
+        return None
+    return os.path.join(dirname, basename[len("test_") :])
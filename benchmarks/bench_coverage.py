@@ -0,0 +1,90 @@
+"""
+Benchmark for merging coverage data files of many shards.
+
+Writes synthetic data files, as the shards of a large CI run produce them,
+and compares merging them one by one through `CoverageData` with `combine`,
+serially and with a process pool, then times the per-file gap report.
+
+Usage:
+    python benchmarks/bench_coverage.py [--shards N] [--files N] [--workers N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.coverage import (  # noqa: E402
+    CoverageData,
+    FileCoverage,
+    combine,
+    format_ranges,
+    to_bitset,
+)
+
+
+def write_shard(path: str, files: int, lines: int, arcs: int, seed: int) -> None:
+    """Writes one data file covering a random part of every source file."""
+    rng = random.Random(seed)
+    data = CoverageData()
+    for index in range(files):
+        covered = to_bitset(rng.sample(range(1, lines), lines // 3))
+        branches = {(line, line + rng.randint(1, 9)) for line in range(1, arcs + 1)}
+        data.files[f"pkg{index % 100}/mod{index}.py"] = FileCoverage(covered, branches)
+    data.write(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--arcs", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths: List[str] = []
+        for shard in range(args.shards):
+            path = os.path.join(temp_dir, f"shard{shard}.ptmcov")
+            write_shard(path, args.files, args.lines, args.arcs, shard)
+            paths.append(path)
+
+        start = time.perf_counter()
+        naive = CoverageData()
+        for path in paths:
+            naive.merge(CoverageData.read(path))
+        naive_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        combine(paths, max_workers=1)
+        serial_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        merged = combine(paths, max_workers=args.workers)
+        parallel_seconds = time.perf_counter() - start
+
+    assert merged.files == naive.files
+    statements = to_bitset(range(1, args.lines))
+    start = time.perf_counter()
+    gaps: Dict[str, str] = {}
+    for source, coverage in merged.files.items():
+        gaps[source] = format_ranges(statements & ~coverage.lines)
+    report_seconds = time.perf_counter() - start
+    arcs: Set[int] = {len(coverage.arcs) for coverage in merged.files.values()}
+
+    print(f"shards:             {args.shards} x {args.files} files")
+    print(f"arcs per file:      {min(arcs)}-{max(arcs)}")
+    print(f"CoverageData.merge: {naive_seconds:8.2f} s")
+    print(f"combine, serial:    {serial_seconds:8.2f} s")
+    print(f"combine, {args.workers} worker(s): {parallel_seconds:8.2f} s")
+    print(f"gap report:         {report_seconds:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark for non-git Python file discovery.
+
+Builds a synthetic project containing a large virtual environment and compares
+the pruning scandir walk in `get_python_files` against the previous approach of
+walking the whole tree with `os.walk` and matching every file afterwards.
+
+Usage:
+    python benchmarks/bench_discovery.py [--packages N] [--venv-packages N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.workspace import get_ignore_spec, get_python_files  # noqa: E402
+
+
+def write_file(path: str, content: str = "") -> None:
+    """Creates a file and any missing parent directories."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def build_tree(root_dir: str, packages: int, venv_packages: int) -> None:
+    """
+    Builds a synthetic project with source packages, build output and a
+    virtual environment containing many third-party packages.
+    """
+    write_file(os.path.join(root_dir, "pyproject.toml"), '[project]\nname = "bench"\n')
+    write_file(os.path.join(root_dir, ".gitignore"), ".venv/\nbuild/\n__pycache__/\n")
+
+    for package in range(packages):
+        for module in range(10):
+            write_file(
+                os.path.join(root_dir, "src", f"pkg{package}", f"mod{module}.py")
+            )
+        write_file(os.path.join(root_dir, "build", "lib", f"pkg{package}", "mod.py"))
+
+    site_packages = os.path.join(
+        root_dir, ".venv", "lib", "python3.13", "site-packages"
+    )
+    for package in range(venv_packages):
+        for module in range(20):
+            write_file(
+                os.path.join(site_packages, f"dep{package}", "sub", f"m{module}.py")
+            )
+
+
+def legacy_discovery(root_dir: str) -> List[str]:
+    """The walk-everything-then-filter implementation kept for comparison."""
+    spec = get_ignore_spec(root_dir)
+    python_files: List[str] = []
+    for root, _, files in os.walk(root_dir):
+        for file in files:
+            rel_path = os.path.relpath(os.path.join(root, file), root_dir)
+            if file.endswith(".py") and not spec.match_file(rel_path):
+                python_files.append(rel_path)
+    return python_files
+
+
+def best_of(repeat: int, func: Callable[[], List[str]]) -> float:
+    """Returns the fastest wall-clock time of func over repeat runs."""
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--packages", type=int, default=50)
+    parser.add_argument("--venv-packages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root_dir:
+        build_tree(root_dir, args.packages, args.venv_packages)
+
+        expected = legacy_discovery(root_dir)
+        actual = get_python_files(root_dir, use_git=False)
+        if actual != expected:
+            raise SystemExit("get_python_files disagrees with the legacy walk")
+
+        legacy = best_of(args.repeat, lambda: legacy_discovery(root_dir))
+        pruned = best_of(args.repeat, lambda: get_python_files(root_dir, False))
+
+        print(f"source files:    {len(actual)}")
+        print(f"legacy walk:     {legacy * 1000:8.1f} ms")
+        print(f"pruned scandir:  {pruned * 1000:8.1f} ms")
+        print(f"speedup:         {legacy / pruned:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark for ignore matching.
+
+Matches the paths of a synthetic tree against a long `.gitignore`, once with
+`PathSpec.match_file` and once with the compiled `IgnoreMatcher` used by the
+project walk, and checks that both agree on every path.
+
+Usage:
+    python benchmarks/bench_ignore.py [--patterns N] [--files N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pathspec import PathSpec  # noqa: E402
+
+from app.utils.matcher import IgnoreMatcher  # noqa: E402
+
+
+def gitignore_lines(patterns: int) -> List[str]:
+    """
+    Returns a `.gitignore` of about patterns lines, mixing the literal,
+    extension, anchored and glob forms found in real projects.
+    """
+    lines = [".venv/", "build/", "dist/", "__pycache__/", "*.py[cod]", "*.egg-info/"]
+    forms = (
+        "generated{0}/",
+        "*.gen{0}",
+        "/out{0}",
+        "docs/_build{0}/",
+        "tmp{0}_*",
+        "**/cache{0}/**",
+        "!keep{0}.gen{0}",
+    )
+    index = 0
+    while len(lines) < patterns:
+        lines.append(forms[index % len(forms)].format(index))
+        index += 1
+    return lines
+
+
+def tree_paths(files: int) -> List[str]:
+    """Returns the relative paths of files modules spread over nested packages."""
+    paths: List[str] = []
+    for index in range(files):
+        package, module = divmod(index, 20)
+        paths.append(f"src/pkg{package // 50}/sub{package % 50}/mod{module}.py")
+    return paths
+
+
+def best_of(repeat: int, func: Callable[[], List[bool]]) -> float:
+    """Returns the fastest wall-clock time of func over repeat runs."""
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--patterns", type=int, default=600)
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        spec = PathSpec.from_lines("gitwildmatch", gitignore_lines(args.patterns))
+    paths = tree_paths(args.files)
+
+    def compiled() -> List[bool]:
+        # Compiled per run, so the directory memo starts out empty.
+        matcher = IgnoreMatcher(spec.patterns)
+        return [matcher.match_file(path) for path in paths]
+
+    def reference() -> List[bool]:
+        return [spec.match_file(path) for path in paths]
+
+    if compiled() != reference():
+        raise SystemExit("IgnoreMatcher disagrees with PathSpec")
+
+    pathspec_time = best_of(args.repeat, reference)
+    matcher_time = best_of(args.repeat, compiled)
+
+    print(f"patterns:        {len(spec.patterns)}")
+    print(f"paths:           {len(paths)}")
+    print(f"PathSpec:        {pathspec_time * 1000:8.1f} ms")
+    print(f"IgnoreMatcher:   {matcher_time * 1000:8.1f} ms")
+    print(f"speedup:         {pathspec_time / matcher_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
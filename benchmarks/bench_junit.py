@@ -0,0 +1,88 @@
+"""
+Benchmark for JUnit XML aggregation.
+
+Writes synthetic JUnit XML files with captured output, as sharded pytest runs
+produce them, and compares the time and peak traced memory of streaming them
+with `aggregate_junit` against building their DOM with `ElementTree.parse`.
+
+Usage:
+    python benchmarks/bench_junit.py [--cases N] [--output-bytes N] [--shards N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.junit import aggregate_junit  # noqa: E402
+
+
+def write_shard(path: str, cases: int, output_bytes: int, shard: int) -> None:
+    """Writes one JUnit XML file of cases test cases spread over test files."""
+    output = "x" * output_bytes
+    with open(path, "w") as file:
+        file.write('<?xml version="1.0" encoding="utf-8"?>\n<testsuites><testsuite>')
+        for index in range(cases):
+            module = f"tests.pkg{index % 50}.test_mod{(index + shard) % 20}"
+            outcome = '<failure message="boom"/>' if index % 997 == 0 else ""
+            file.write(
+                f'<testcase classname="{module}" name="test_{index}" time="0.01">'
+                f"{outcome}<system-out>{output}</system-out></testcase>"
+            )
+        file.write("</testsuite></testsuites>\n")
+
+
+def measure(func: Callable[[], Any]) -> Tuple[float, int]:
+    """Returns the wall-clock time and the peak traced memory of func."""
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=50_000)
+    parser.add_argument("--output-bytes", type=int, default=2048)
+    parser.add_argument("--shards", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths: List[str] = []
+        for shard in range(args.shards):
+            path = os.path.join(temp_dir, f"junit-{shard}.xml")
+            write_shard(path, args.cases, args.output_bytes, shard)
+            paths.append(path)
+        size = sum(os.path.getsize(path) for path in paths)
+
+        from xml.etree import ElementTree
+
+        dom_seconds, dom_peak = measure(lambda: ElementTree.parse(paths[0]))
+        stream_seconds, stream_peak = measure(
+            lambda: aggregate_junit(paths[:1], max_workers=1)
+        )
+        start = time.perf_counter()
+        report = aggregate_junit(paths)
+        parallel_seconds = time.perf_counter() - start
+
+    print(f"shards:            {args.shards} x {size / args.shards / 1e6:.1f} MB")
+    print(f"DOM, one shard:    {dom_seconds:8.2f} s  {dom_peak / 1e6:8.1f} MB peak")
+    print(
+        f"stream, one shard: {stream_seconds:8.2f} s  {stream_peak / 1e6:8.1f} MB peak"
+    )
+    print(f"stream, all shards in parallel: {parallel_seconds:8.2f} s")
+    print(f"test files:        {len(report.files)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark for the workspace service of `ptm serve`.
+
+Builds a synthetic project, then compares answering "where is the test file
+of this module?" from scratch, the way a hook shelling out to ptm does, with
+asking a running service over its Unix socket.
+
+Usage:
+    python benchmarks/bench_service.py [--files N] [--requests N]
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_workspace import build_tree  # noqa: E402
+
+from app.utils.service import SOCKET_NAME, Workspace, call_service, serve  # noqa: E402
+from app.utils.worker import socket_path  # noqa: E402
+from app.utils.workspace import (  # noqa: E402
+    get_python_files,
+    get_test_file_path,
+    in_python_project,
+)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Returns the sample below which the given fraction of samples fall."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root_dir:
+        build_tree(root_dir, args.files, args.depth, 1000, 200)
+
+        start = time.perf_counter()
+        in_python_project(root_dir)
+        python_files = get_python_files(root_dir, False)
+        get_test_file_path(python_files[0])
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        workspace = Workspace(root_dir)
+        startup = time.perf_counter() - start
+        thread = threading.Thread(target=serve, args=(workspace,))
+        thread.start()
+        while True:
+            try:
+                call_service(root_dir, "ping")
+                break
+            except ConnectionError:
+                time.sleep(0.01)
+
+        latencies: List[float] = []
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(socket_path(root_dir, SOCKET_NAME))
+            reader = connection.makefile("rb")
+            for index in range(args.requests):
+                request = {
+                    "jsonrpc": "2.0",
+                    "id": index,
+                    "method": "test_for",
+                    "params": [python_files[index % len(python_files)]],
+                }
+                start = time.perf_counter()
+                connection.sendall(json.dumps(request).encode() + b"\n")
+                reader.readline()
+                latencies.append(time.perf_counter() - start)
+
+        call_service(root_dir, "shutdown")
+        thread.join()
+        workspace.close()
+
+    print(f"files:           {len(python_files)}")
+    print(f"from scratch:    {cold * 1000:8.1f} ms")
+    print(f"service startup: {startup * 1000:8.1f} ms")
+    print(f"query p50:       {percentile(latencies, 0.5) * 1000:8.3f} ms")
+    print(f"query p99:       {percentile(latencies, 0.99) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Benchmark suite for workspace operations on synthetic monorepos.
+
+Generates project trees in a temporary directory and measures the wall-clock
+time and peak traced memory of `in_python_project`, `get_ignore_spec`,
+`get_python_files` (plain, with the file index and in git mode) and
+`create_test_files`. Each scenario is described by its file count, directory
+depth, the number of files in a virtual environment inside the tree and the
+number of `.gitignore` patterns.
+
+Results can be saved as a JSON baseline. When compared against a baseline,
+the run fails if any operation got slower, or used more memory, than the
+baseline by more than the threshold. Everything runs offline; git is only
+used locally to build the repository for `--git` mode.
+
+Usage:
+    python benchmarks/bench_workspace.py [--files N ...] [--depth N]
+        [--venv-files N] [--gitignore-patterns N] [--no-git]
+        [--save-baseline PATH | --baseline PATH [--threshold F]]
+        [--min-delta SECONDS]
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.workspace import (  # noqa: E402
+    create_test_files,
+    get_ignore_spec,
+    get_python_files,
+    in_python_project,
+)
+
+BASELINE_VERSION: int = 1
+MODULES_PER_PACKAGE: int = 20
+# Trees are backdated so the file index trusts their listings right away.
+BACKDATE_SECONDS: int = 3600
+GIT_ENV: Dict[str, str] = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@localhost",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@localhost",
+    "GIT_CONFIG_NOSYSTEM": "1",
+    "HOME": tempfile.gettempdir(),
+}
+
+Measurement = Dict[str, float]
+
+
+def write_file(path: str, content: str = "") -> None:
+    """Creates a file and any missing parent directories."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def package_dirs(count: int, depth: int) -> List[str]:
+    """
+    Returns count relative package directories, nested depth levels deep
+    with an even fan-out at every level.
+    """
+    fanout = max(2, math.ceil(count ** (1 / depth)))
+    dirs: List[str] = []
+    for index in range(count):
+        parts: List[str] = []
+        for _ in range(depth):
+            index, digit = divmod(index, fanout)
+            parts.append(f"pkg{digit}")
+        dirs.append(os.path.join("src", *reversed(parts)))
+    return dirs
+
+
+def gitignore_lines(patterns: int) -> List[str]:
+    """
+    Returns a `.gitignore` with the usual Python entries followed by patterns
+    synthetic rules mixing directory, wildcard, anchored and negated forms.
+    """
+    lines = [".venv/", "build/", "__pycache__/", "*.py[cod]", "*.egg-info/"]
+    forms = ("generated{0}/", "*.gen{0}", "/out{0}/**/*.py", "!keep{0}.gen")
+    for index in range(max(0, patterns - len(lines))):
+        lines.append(forms[index % len(forms)].format(index))
+    return lines
+
+
+def build_tree(
+    root_dir: str, files: int, depth: int, venv_files: int, patterns: int
+) -> None:
+    """
+    Builds a synthetic monorepo with files source modules spread over nested
+    packages, ignored build output and a virtual environment.
+    """
+    write_file(os.path.join(root_dir, "pyproject.toml"), '[project]\nname = "bench"\n')
+    write_file(
+        os.path.join(root_dir, ".gitignore"), "\n".join(gitignore_lines(patterns))
+    )
+
+    packages = math.ceil(files / MODULES_PER_PACKAGE)
+    for index, package in enumerate(package_dirs(packages, depth)):
+        modules = min(MODULES_PER_PACKAGE, files - index * MODULES_PER_PACKAGE)
+        for module in range(modules):
+            write_file(
+                os.path.join(root_dir, package, f"mod{module}.py"), "VALUE = 1\n"
+            )
+        write_file(os.path.join(root_dir, package, "__init__.py"))
+        write_file(os.path.join(root_dir, "build", "lib", package, "mod0.py"))
+
+    site_packages = os.path.join(
+        root_dir, ".venv", "lib", "python3.13", "site-packages"
+    )
+    for module in range(venv_files):
+        package, name = divmod(module, MODULES_PER_PACKAGE)
+        write_file(os.path.join(site_packages, f"dep{package}", f"m{name}.py"))
+
+    past = time.time() - BACKDATE_SECONDS
+    for root, dirs, names in os.walk(root_dir, topdown=False):
+        for name in names + dirs:
+            os.utime(os.path.join(root, name), (past, past))
+    os.utime(root_dir, (past, past))
+
+
+def init_git_repo(root_dir: str) -> None:
+    """Commits the tree to a new local git repository."""
+    env = {**os.environ, **GIT_ENV}
+    for args in (
+        ["init", "-q"],
+        ["add", "-A"],
+        ["commit", "-q", "--no-gpg-sign", "-m", "bench"],
+    ):
+        subprocess.run(["git", "-C", root_dir, *args], check=True, env=env)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Measurement:
+    """
+    Returns the fastest wall-clock time of func over repeat runs, and its
+    peak traced memory in a separate run so tracing doesn't skew the timings.
+    """
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": float(peak)}
+
+
+def run_scenario(
+    files: int,
+    depth: int,
+    venv_files: int,
+    patterns: int,
+    use_git: bool,
+    repeat: int,
+) -> Dict[str, Measurement]:
+    """
+    Builds one synthetic tree and measures every workspace operation on it.
+
+    Returns:
+        Dict[str, Measurement]: Time and peak memory per operation
+    """
+    results: Dict[str, Measurement] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root_dir = os.path.join(temp_dir, "project")
+        build_tree(root_dir, files, depth, venv_files, patterns)
+        python_files = get_python_files(root_dir, use_git=False)
+        if len(python_files) < files:
+            raise SystemExit(
+                f"expected {files} source files, found {len(python_files)}"
+            )
+
+        results["in_python_project"] = measure(
+            lambda: in_python_project(os.path.join(root_dir, "src")), repeat
+        )
+        results["get_ignore_spec"] = measure(lambda: get_ignore_spec(root_dir), repeat)
+        results["get_python_files"] = measure(
+            lambda: get_python_files(root_dir, use_git=False), repeat
+        )
+        get_python_files(root_dir, use_git=False, use_cache=True)
+        results["get_python_files[cache]"] = measure(
+            lambda: get_python_files(root_dir, use_git=False, use_cache=True), repeat
+        )
+
+        if use_git:
+            init_git_repo(root_dir)
+            results["get_python_files[git]"] = measure(
+                lambda: get_python_files(root_dir, use_git=True), repeat
+            )
+
+        runs = iter(range(repeat + 1))
+
+        def materialize() -> None:
+            tests_dir = os.path.join(temp_dir, f"tests{next(runs)}")
+            os.makedirs(tests_dir)
+            create_test_files(tests_dir, python_files)
+
+        results["create_test_files"] = measure(materialize, repeat)
+    return results
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float,
+    min_delta: float,
+) -> List[str]:
+    """
+    Returns a message for every operation that is slower, or needs more peak
+    memory, than in the baseline by more than the threshold fraction. Time
+    differences below min_delta seconds are treated as noise.
+    """
+    regressions: List[str] = []
+    for scenario, operations in current["scenarios"].items():
+        previous = baseline["scenarios"].get(scenario, {})
+        for operation, result in operations.items():
+            if operation not in previous:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                before, after = previous[operation][metric], result[metric]
+                noise = min_delta if metric == "seconds" else 0
+                if before > 0 and after > before * (1 + threshold) + noise:
+                    regressions.append(
+                        f"{scenario} {operation} {metric}: "
+                        f"{before:.6g} -> {after:.6g} ({after / before:.2f}x)"
+                    )
+    return regressions
+
+
+def print_results(scenario: str, results: Dict[str, Measurement]) -> None:
+    """Prints the measurements of a scenario as a table."""
+    print(scenario)
+    for operation, result in results.items():
+        print(
+            f"  {operation:<26}{result['seconds'] * 1000:10.1f} ms"
+            f"{result['peak_bytes'] / 2**20:10.1f} MiB"
+        )
+
+
+def scenario_name(files: int, args: argparse.Namespace) -> str:
+    """Returns the key of a scenario in the results and baselines."""
+    return (
+        f"files={files},depth={args.depth},venv={args.venv_files},"
+        f"patterns={args.gitignore_patterns}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, action="append")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--venv-files", type=int, default=10_000)
+    parser.add_argument("--gitignore-patterns", type=int, default=200)
+    parser.add_argument("--no-git", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta", type=float, default=0.005)
+    args = parser.parse_args()
+
+    if args.depth < 1:
+        parser.error("--depth must be at least 1")
+    if args.no_git is False and shutil.which("git") is None:
+        parser.error("git is not installed, use --no-git")
+
+    current: Dict[str, Any] = {"version": BASELINE_VERSION, "scenarios": {}}
+    for files in args.files or [1000]:
+        scenario = scenario_name(files, args)
+        results = run_scenario(
+            files,
+            args.depth,
+            args.venv_files,
+            args.gitignore_patterns,
+            not args.no_git,
+            args.repeat,
+        )
+        current["scenarios"][scenario] = results
+        print_results(scenario, results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(current, file, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        if baseline.get("version") != BASELINE_VERSION:
+            raise SystemExit(f"{args.baseline} has an unsupported version")
+        regressions = compare(baseline, current, args.threshold, args.min_delta)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regression beyond {args.threshold:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+import pytest
+from click.testing import CliRunner
+from app.ptm import ptm
+
+# Hard budget for importing the CLI, in microseconds of `-X importtime`.
+IMPORT_BUDGET_US = 100_000
+HEAVY_MODULES = (
+    "pathspec",
+    "subprocess",
+    "sqlite3",
+    "concurrent.futures",
+    "xml.etree.ElementTree",
+    "tempfile",
+    "app.utils.workspace",
+)
+
+
+def measure_import() -> Dict[str, int]:
+    """Helper function to import the CLI in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.ptm"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            cumulative[parts[2].strip()] = int(parts[1])
+    return cumulative
+
+
+def test_cli_import_skips_heavy_modules() -> None:
+    """Test that importing the CLI doesn't import what only commands need."""
+    imported = measure_import()
+
+    assert "app.ptm" in imported
+    assert [module for module in HEAVY_MODULES if module in imported] == []
+
+
+def test_cli_import_time_budget() -> None:
+    """Test that importing the CLI stays within its time budget."""
+    best = min(measure_import()["app.ptm"] for _ in range(3))
+
+    assert best < IMPORT_BUDGET_US
+
+
+def test_help_lists_commands() -> None:
+    """Test that the lazily imported commands are all registered."""
+    result = CliRunner().invoke(ptm, ["--help"])
+
+    assert result.exit_code == 0
+    for command in ("init", "update", "test", "report", "generate", "serve"):
+        assert command in result.output
+
+
+def test_timings_json_reports_phases(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that --timings-json records the phases and counts of a command."""
+    (tmp_path / "pyproject.toml").write_text("[project]\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_text("")
+    monkeypatch.chdir(tmp_path)
+
+    result = CliRunner().invoke(
+        ptm, ["--timings-json", "timings.json", "init", "--yes", "--no-cache"]
+    )
+
+    assert result.exit_code == 0
+    report = json.loads((tmp_path / "timings.json").read_text())
+    assert {"detect", "ignore spec", "match", "walk", "write"} <= set(report["phases"])
+    assert report["counters"]["files created"] == 1
+
+
+def test_init_yes_streams_without_planning(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that init --yes writes test files without building a plan."""
+    from app.utils import scaffold
+
+    (tmp_path / "pyproject.toml").write_text("[project]\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_text("")
+    (tmp_path / "tests" / "pkg").mkdir(parents=True)
+    (tmp_path / "tests" / "pkg" / "test_mod.py").write_text("# mine\n")
+    (tmp_path / "main.py").write_text("")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scaffold, "plan_scaffold", None)
+
+    result = CliRunner().invoke(ptm, ["init", "--yes", "--no-cache"])
+
+    assert result.exit_code == 0, result.output
+    assert "(1 created, 1 already present)" in result.output
+    assert (tmp_path / "tests" / "pkg" / "test_mod.py").read_text() == "# mine\n"
+    assert (tmp_path / "tests" / "test_main.py").is_file()
+
+
+def test_update_yes_applies_without_prompt(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that update --yes applies the changes without asking."""
+    (tmp_path / "pyproject.toml").write_text("[project]\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_text("")
+    (tmp_path / "tests").mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    result = CliRunner().invoke(ptm, ["update", "--yes", "--no-cache"])
+
+    assert result.exit_code == 0, result.output
+    assert "Apply these changes?" not in result.output
+    assert "Test structure updated successfully" in result.output
+    assert (tmp_path / "tests" / "pkg" / "test_mod.py").is_file()
+
+
+def test_live_count_writes_to_terminal_stderr(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    """Test that the running count goes to stderr only when it is a terminal."""
+    from app.ptm import LiveCount
+
+    items = [str(index) for index in range(300)]
+    assert list(LiveCount("Found").track(items)) == items
+    assert capsys.readouterr() == ("", "")
+
+    monkeypatch.setattr(sys.stderr, "isatty", lambda: True)
+    counter = LiveCount("Found")
+    assert list(counter.track(items)) == items
+    assert counter.count == 300
+    assert capsys.readouterr() == ("", "\rFound 256\r\033[K")
+
+
+def test_test_stop_worker(tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that --stop-worker stops the warm worker without running tests."""
+    from app.utils import worker
+
+    (tmp_path / "pyproject.toml").write_text("[project]\n")
+    monkeypatch.chdir(tmp_path)
+    stopped: List[str] = []
+    monkeypatch.setattr(
+        worker, "stop_worker", lambda root_dir: bool(stopped.append(root_dir))
+    )
+
+    result = CliRunner().invoke(ptm, ["test", "--stop-worker"])
+    assert result.exit_code == 0, result.output
+    assert "No warm worker is running" in result.output
+
+    monkeypatch.setattr(worker, "stop_worker", lambda root_dir: True)
+    result = CliRunner().invoke(ptm, ["test", "--stop-worker"])
+    assert "Stopped the warm worker" in result.output
+    assert stopped == [os.getcwd()]
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_shards_agree_across_machines(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch, shared: bool
+) -> None:
+    """Test that machines whose local timing stores recorded different shards
+    still split the test files the same way."""
+    from app.utils import sharding
+    from app.utils.sharding import TimingStore
+
+    names = [os.path.join("tests", f"test_{index}.py") for index in range(6)]
+    shared_path = tmp_path / "timings.sqlite"
+    with TimingStore(str(tmp_path), str(shared_path)) as store:
+        store.record({name: float(index + 1) for index, name in enumerate(names)})
+    machines = [tmp_path / "a", tmp_path / "b"]
+    local = (
+        {names[0]: 30.0, names[1]: 30.0},
+        {names[4]: 1.0, names[5]: 50.0},
+    )
+    for machine, recorded in zip(machines, local):
+        (machine / "tests").mkdir(parents=True)
+        (machine / "pyproject.toml").write_text("[project]\n")
+        for name in names:
+            (machine / name).write_text("def test_x():\n    pass\n")
+        with TimingStore(str(machine)) as store:
+            store.record(recorded)
+
+    ran: List[List[str]] = []
+
+    def fake_run_shards(root_dir: str, shards: Any, args: Any) -> Any:
+        ran.extend(list(shard) for shard in shards)
+        return 0, {name: 99.0 for shard in shards for name in shard}
+
+    monkeypatch.setattr(sharding, "run_shards", fake_run_shards)
+    options = ["--timings", str(shared_path)] if shared else []
+    for index, machine in enumerate(machines, start=1):
+        monkeypatch.chdir(machine)
+        result = CliRunner().invoke(ptm, ["test", "--shard", f"{index}/2", *options])
+        assert result.exit_code == 0, result.output
+
+    assert sorted(ran[0] + ran[1]) == sorted(names)
+    with TimingStore(str(machines[0])) as store:
+        assert store.durations() == local[0]
+
+
+def test_report_summarizes_junit_files(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that --junit summarizes results without running pytest."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "junit.xml").write_text(
+        "<testsuites><testsuite>"
+        '<testcase classname="tests.test_mod" name="test_a" time="0.5"/>'
+        '<testcase classname="tests.test_mod" name="test_b" time="0.5">'
+        '<failure message="boom"/></testcase>'
+        "</testsuite></testsuites>"
+    )
+
+    result = CliRunner().invoke(
+        ptm, ["report", "--junit", "junit.xml", "--json", "summary.json"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "tests/test_mod.py::test_b" in result.output
+    assert "Total: 2 tests in 1 files, 1 passed, 1 failed" in result.output
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    assert summary["files"][0]["source"] == "mod.py"
+
+
+def test_report_combines_coverage_shards(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that --combine merges shards and lists gaps with their test files."""
+    from app.utils.coverage import CoverageData, FileCoverage
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "setup.py").write_text("")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_text("a = 1\nb = 2\nc = 3\nd = 4\n")
+    (tmp_path / "test_helpers.py").write_text("a = 1\nb = 2\n")
+    for index, lines in enumerate([0b0010, 0b0100]):
+        shard = CoverageData()
+        shard.files["pkg/mod.py"] = FileCoverage(lines, set())
+        shard.files["test_helpers.py"] = FileCoverage(0b0010, set())
+        shard.write(str(tmp_path / f"shard{index}.ptmcov"))
+
+    result = CliRunner().invoke(
+        ptm,
+        [
+            "report",
+            "--combine",
+            "shard0.ptmcov",
+            "--combine",
+            "shard1.ptmcov",
+            "--json",
+            "gaps.json",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Total line coverage: 50.0%" in result.output
+    test_file = os.path.join("tests", "pkg", "test_mod.py")
+    assert f"pkg/mod.py ({test_file}): 3-4" in result.output
+    assert "  test_helpers.py: 2\n" in result.output
+    assert (tmp_path / ".ptm" / "coverage.ptmcov").exists()
+    gaps = json.loads((tmp_path / "gaps.json").read_text())
+    assert gaps["files"] == [
+        {
+            "source": "pkg/mod.py",
+            "test": test_file,
+            "statements": 4,
+            "missed": 2,
+            "missing": "3-4",
+        },
+        {
+            "source": "test_helpers.py",
+            "test": None,
+            "statements": 2,
+            "missed": 1,
+            "missing": "2",
+        },
+    ]
+
+
+def test_report_combine_outside_git_repo(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that --combine --git outside a git repository fails cleanly."""
+    from app.utils.coverage import CoverageData
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GIT_CEILING_DIRECTORIES", str(tmp_path.parent))
+    (tmp_path / "setup.py").write_text("")
+    CoverageData().write(str(tmp_path / "shard.ptmcov"))
+
+    result = CliRunner().invoke(ptm, ["report", "--combine", "shard.ptmcov", "--git"])
+
+    assert result.exit_code == 1
+    assert "is not a git repo" in result.output
+    assert isinstance(result.exception, SystemExit)
+
+
+def test_test_cache_skips_unchanged_passing_files(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that --cache reports unchanged passing test files as cached."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "setup.py").write_text("")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_mod.py").write_text("def test_a():\n    pass\n")
+    args = ["test", "--cache", "-q", "-p", "no:cacheprovider"]
+
+    first = CliRunner().invoke(ptm, args)
+    second = CliRunner().invoke(ptm, args)
+    (tmp_path / "tests" / "test_mod.py").write_text("def test_a():\n    assert 0\n")
+    third = CliRunner().invoke(ptm, args)
+
+    assert first.exit_code == 0, first.output
+    assert "Running 1 test files, 0 cached" in first.output
+    test_file = os.path.join("tests", "test_mod.py")
+    assert f"✅ {test_file} (cached)" in second.output
+    assert "All 1 test files are cached" in second.output
+    assert third.exit_code == 1
+    assert "(cached)" not in third.output
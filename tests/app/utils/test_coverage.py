@@ -0,0 +1,136 @@
+import os
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils.coverage import (
+    MAGIC,
+    CoverageData,
+    FileCoverage,
+    analyze_source,
+    combine,
+    format_ranges,
+    run_coverage,
+    summarize,
+    to_bitset,
+)
+
+SAMPLE = """\
+def sign(x, items):
+    if x > 0:
+        result = 1
+    else:
+        result = -1
+    for item in items:
+        result += item
+    return result
+"""
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def test_analyze_source(temp_dir: str) -> None:
+    """Test that statements and both sides of each branch are found."""
+    create_file(os.path.join(temp_dir, "sample.py"), SAMPLE)
+
+    lines, arcs = analyze_source(os.path.join(temp_dir, "sample.py"))
+
+    assert lines == {1, 2, 3, 5, 6, 7, 8}
+    assert arcs == {(2, 3), (2, 5), (6, 7), (6, 8)}
+
+
+def test_coverage_data_round_trip_and_merge(temp_dir: str) -> None:
+    """Test that data files round-trip and merge by union."""
+    first = CoverageData()
+    first.files["a.py"] = FileCoverage(0b0110, {(1, 2)})
+    second = CoverageData()
+    second.files["a.py"] = FileCoverage(0b1000, {(1, 3)})
+    second.files["b.py"] = FileCoverage(1 << 300, set())
+
+    path = os.path.join(temp_dir, ".ptm", "coverage.ptmcov")
+    first.write(path)
+    merged = CoverageData.read(path)
+    merged.merge(second)
+
+    assert merged.files["a.py"].line_numbers() == {1, 2, 3}
+    assert merged.files["a.py"].arcs == {(1, 2), (1, 3)}
+    assert merged.files["b.py"].line_numbers() == {300}
+    with open(path, "rb") as file:
+        assert file.read().startswith(MAGIC)
+
+    create_file(os.path.join(temp_dir, "other.ptmcov"), "not coverage")
+    with pytest.raises(ValueError):
+        CoverageData.read(os.path.join(temp_dir, "other.ptmcov"))
+
+
+def test_run_coverage(temp_dir: str) -> None:
+    """Test that a pytest run under coverage records lines and branches."""
+    create_file(os.path.join(temp_dir, "pkg", "__init__.py"))
+    create_file(os.path.join(temp_dir, "pkg", "sample.py"), SAMPLE)
+    create_file(
+        os.path.join(temp_dir, "tests", "pkg", "test_sample.py"),
+        "from pkg.sample import sign\n\n"
+        "def test_sign():\n"
+        "    assert sign(1, [1]) == 2\n"
+        "    assert sign(1, []) == 1\n",
+    )
+    data_file = os.path.join(temp_dir, ".ptm", "coverage.ptmcov")
+
+    exit_code = run_coverage(
+        temp_dir,
+        ["pkg/__init__.py", "pkg/sample.py"],
+        data_file,
+        ["-q", "-p", "no:cacheprovider"],
+    )
+    reports = summarize(
+        temp_dir, CoverageData.read(data_file), ["pkg/__init__.py", "pkg/sample.py"]
+    )
+
+    assert exit_code == 0
+    assert [report.path for report in reports] == ["pkg/__init__.py", "pkg/sample.py"]
+    sample = reports[1]
+    assert (sample.statements, sample.missed) == (7, 1)
+    assert (sample.branches, sample.missed_branches) == (4, 1)
+    assert sample.branch_percent == 75.0
+    assert sample.missing_ranges() == "5"
+
+
+def test_combine_merges_shards_in_parallel(temp_dir: str) -> None:
+    """Test that combining shards in a process pool unites lines and arcs."""
+    paths = []
+    for index in range(5):
+        data = CoverageData()
+        data.files["a.py"] = FileCoverage(1 << index + 1, {(index, index + 1)})
+        data.files[f"only{index}.py"] = FileCoverage(1 << 100 + index, set())
+        paths.append(os.path.join(temp_dir, f"shard{index}.ptmcov"))
+        data.write(paths[-1])
+
+    serial = combine(paths, max_workers=1)
+    merged = combine(paths, max_workers=3)
+
+    assert merged.files == serial.files
+    assert merged.files["a.py"].line_numbers() == {1, 2, 3, 4, 5}
+    assert merged.files["a.py"].arcs == {(i, i + 1) for i in range(5)}
+    assert merged.files["only4.py"].line_numbers() == {104}
+    create_file(os.path.join(temp_dir, "broken.ptmcov"), "PTMCOV1\nnot zlib")
+    with pytest.raises(ValueError, match="broken.ptmcov"):
+        combine([os.path.join(temp_dir, "broken.ptmcov")])
+
+
+def test_bitset_ranges() -> None:
+    """Test that bitsets are built from numbers and printed as ranges."""
+    assert to_bitset([]) == 0
+    assert to_bitset([0, 3, 9]) == 0b1000001001
+    assert format_ranges(to_bitset([3, 4, 5, 9, 11, 12])) == "3-5, 9, 11-12"
+    assert format_ranges(0) == ""
@@ -0,0 +1,176 @@
+import os
+import tempfile
+from typing import Any, Generator, List
+import pytest
+from app.utils import depgraph
+from app.utils.depgraph import (
+    ImportGraph,
+    impacted_test_files,
+    import_names,
+    parse_imports,
+)
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+@pytest.fixture
+def no_racy_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Trusts file stats immediately so tests don't have to wait."""
+    monkeypatch.setattr(depgraph, "RACY_WINDOW_NS", -(10**18))
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def create_project(root_dir: str) -> List[str]:
+    """Helper function to create a small project and return its files."""
+    files = {
+        os.path.join("app", "__init__.py"): "",
+        os.path.join("app", "ptm.py"): "from app.utils import workspace\n",
+        os.path.join("app", "utils", "__init__.py"): "",
+        os.path.join("app", "utils", "workspace.py"): "import os\n",
+        os.path.join("app", "utils", "other.py"): "",
+        os.path.join("tests", "test_ptm.py"): "from app import ptm\n",
+        os.path.join("tests", "test_other.py"): "import app.utils.other\n",
+        os.path.join("tests", "unit", "conftest.py"): "",
+        os.path.join("tests", "unit", "test_unit.py"): "",
+    }
+    for path, content in files.items():
+        create_file(os.path.join(root_dir, path), content)
+    return list(files)
+
+
+def test_parse_imports() -> None:
+    """Test that absolute and relative imports resolve to module names."""
+    source = (
+        b"import a.b\nfrom . import sibling\nfrom ..up import name\nfrom x import *\n"
+    )
+
+    assert parse_imports(source, "pkg.sub.mod") == [
+        "a",
+        "a.b",
+        "pkg",
+        "pkg.sub",
+        "pkg.sub.sibling",
+        "pkg.up",
+        "pkg.up.name",
+        "x",
+    ]
+    assert parse_imports(b"from . import mod\n", "pkg", is_package=True) == [
+        "pkg",
+        "pkg.mod",
+    ]
+    assert parse_imports(b"import (\n", "pkg") == []
+
+
+def test_import_names() -> None:
+    """Test that files are named from the root and from their package root."""
+    packages = {os.path.join("src", "pkg")}
+
+    assert import_names(os.path.join("src", "pkg", "mod.py"), packages) == [
+        "src.pkg.mod",
+        "pkg.mod",
+    ]
+    assert import_names(os.path.join("src", "pkg", "__init__.py"), packages) == [
+        "src.pkg",
+        "pkg",
+    ]
+
+
+def test_impacted_test_files_are_transitive(temp_dir: str) -> None:
+    """Test that tests importing a changed module through others are found."""
+    python_files = create_project(temp_dir)
+    graph = ImportGraph(temp_dir)
+    graph.update(python_files)
+
+    workspace = os.path.join("app", "utils", "workspace.py")
+    assert impacted_test_files(graph, [workspace]) == [
+        os.path.join("tests", "test_ptm.py")
+    ]
+    assert impacted_test_files(graph, [], [workspace]) == [
+        os.path.join("tests", "test_ptm.py")
+    ]
+    assert impacted_test_files(
+        graph, [os.path.join("tests", "unit", "conftest.py")]
+    ) == [os.path.join("tests", "unit", "test_unit.py")]
+
+
+def test_root_conftest_impacts_every_test(temp_dir: str) -> None:
+    """Test that a changed conftest.py in the project root selects all tests."""
+    python_files = create_project(temp_dir) + ["conftest.py"]
+    create_file(os.path.join(temp_dir, "conftest.py"))
+    graph = ImportGraph(temp_dir)
+    graph.update(python_files)
+
+    assert impacted_test_files(graph, ["conftest.py"]) == [
+        os.path.join("tests", "test_other.py"),
+        os.path.join("tests", "test_ptm.py"),
+        os.path.join("tests", "unit", "test_unit.py"),
+    ]
+
+
+def test_update_patches_importers_in_place(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that repeated updates keep the reverse edges current without I/O."""
+    python_files = create_project(temp_dir)
+    graph = ImportGraph(temp_dir)
+    graph.update(python_files)
+    workspace = os.path.join("app", "utils", "workspace.py")
+
+    create_file(os.path.join(temp_dir, "tests", "test_ptm.py"), "")
+    create_file(
+        os.path.join(temp_dir, "tests", "test_other.py"),
+        "from app.utils import workspace\n",
+    )
+    graph.update(python_files)
+    checked: List[str] = []
+    monkeypatch.setattr(os.path, "exists", checked.append)
+    selected = impacted_test_files(graph, [workspace])
+    monkeypatch.undo()
+
+    assert selected == [os.path.join("tests", "test_other.py")]
+    assert checked == []
+    graph.update([f for f in python_files if not f.endswith("test_other.py")])
+    assert graph.dependents([workspace]) == {workspace, os.path.join("app", "ptm.py")}
+
+
+def test_graph_reparses_changed_files_only(
+    temp_dir: str, no_racy_window: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a saved graph is reused for files whose content is unchanged."""
+    python_files = create_project(temp_dir)
+    graph = ImportGraph(temp_dir)
+    graph.update(python_files)
+    graph.save()
+
+    parsed = []
+    original = depgraph._parse_file
+    monkeypatch.setattr(
+        depgraph,
+        "_parse_file",
+        lambda path, *args: parsed.append(path) or original(path, *args),
+    )
+    create_file(
+        os.path.join(temp_dir, "app", "utils", "other.py"), "from . import workspace\n"
+    )
+
+    graph = ImportGraph.load(temp_dir)
+    graph.update(python_files)
+
+    assert parsed == [os.path.join(temp_dir, "app", "utils", "other.py")]
+    assert impacted_test_files(
+        graph, [os.path.join("app", "utils", "workspace.py")]
+    ) == [
+        os.path.join("tests", "test_other.py"),
+        os.path.join("tests", "test_ptm.py"),
+    ]
@@ -0,0 +1,94 @@
+import os
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils.ignore import IgnoreRules
+from app.utils.matcher import IgnoreMatcher
+from app.utils.workspace import get_ignore_spec
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def make_rules(root_dir: str) -> IgnoreRules:
+    """Helper function to build the rules for a project."""
+    return IgnoreRules(root_dir, get_ignore_spec(root_dir))
+
+
+def test_nested_patterns_are_relative(temp_dir: str) -> None:
+    """Test that nested patterns only apply below their directory."""
+    create_file(os.path.join(temp_dir, ".gitignore"), "")
+    create_file(os.path.join(temp_dir, "a", ".gitignore"), "/local.py\nany.py\n")
+    rules = make_rules(temp_dir)
+
+    assert rules.is_ignored(os.path.join("a", "local.py"))
+    assert not rules.is_ignored(os.path.join("a", "b", "local.py"))
+    assert rules.is_ignored(os.path.join("a", "b", "any.py"))
+    assert not rules.is_ignored("local.py")
+    assert not rules.is_ignored("any.py")
+
+
+def test_deeper_negation_wins(temp_dir: str) -> None:
+    """Test that a nested negation re-includes a file ignored at the root."""
+    create_file(os.path.join(temp_dir, ".gitignore"), "*_pb2.py\n")
+    create_file(os.path.join(temp_dir, "proto", ".gitignore"), "!keep_pb2.py\n")
+    rules = make_rules(temp_dir)
+
+    assert rules.is_ignored(os.path.join("proto", "drop_pb2.py"))
+    assert not rules.is_ignored(os.path.join("proto", "keep_pb2.py"))
+    assert rules.is_ignored("keep_pb2.py")
+
+
+def test_ignored_parent_cannot_be_reincluded(temp_dir: str) -> None:
+    """Test that negation below an ignored directory has no effect."""
+    create_file(os.path.join(temp_dir, ".gitignore"), "out/\n!out/keep.py\n")
+    rules = make_rules(temp_dir)
+
+    assert rules.is_ignored(os.path.join("out", "keep.py"))
+    assert rules.is_ignored(os.path.join(".git", "hooks.py"))
+
+
+def test_spec_is_shared_without_gitignore(temp_dir: str) -> None:
+    """Test that directories without a .gitignore reuse their parent's spec."""
+    create_file(os.path.join(temp_dir, ".gitignore"), "*.log\n")
+    create_file(os.path.join(temp_dir, "a", ".gitignore"), "*.tmp\n")
+    rules = make_rules(temp_dir)
+
+    root = rules.spec_for("")
+    nested = rules.spec_for(os.path.join("a", "b"))
+    assert isinstance(nested, IgnoreMatcher)
+    assert rules.spec_for("c") is root
+    assert nested is rules.spec_for("a")
+    assert nested is not root
+
+
+def test_invalidate_drops_nested_specs(temp_dir: str) -> None:
+    """Test that invalidating a directory recompiles it and the directories
+    below it, and that the root can be given a new root spec."""
+    create_file(os.path.join(temp_dir, ".gitignore"), "*.log\n")
+    create_file(os.path.join(temp_dir, "a", ".gitignore"), "gen.py\n")
+    rules = make_rules(temp_dir)
+    assert rules.is_ignored(os.path.join("a", "b", "gen.py"))
+    sibling = rules.spec_for("c")
+
+    create_file(os.path.join(temp_dir, "a", ".gitignore"), "")
+    assert rules.is_ignored(os.path.join("a", "b", "gen.py"))
+    rules.invalidate("a")
+    assert not rules.is_ignored(os.path.join("a", "b", "gen.py"))
+    assert rules.spec_for("c") is sibling
+
+    create_file(os.path.join(temp_dir, ".gitignore"), "gen.py\n")
+    rules.invalidate("", get_ignore_spec(temp_dir))
+    assert rules.is_ignored(os.path.join("a", "b", "gen.py"))
+    assert rules.spec_for("c") is not sibling
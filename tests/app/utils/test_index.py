@@ -0,0 +1,136 @@
+import os
+import tempfile
+from typing import Any, Generator, List
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from app.utils import index as file_index
+from app.utils.index import FileIndex, make_state_dir
+from app.utils.workspace import get_python_files
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+@pytest.fixture
+def no_racy_window(monkeypatch: MonkeyPatch) -> None:
+    """Trusts freshly modified directories so tests don't have to wait."""
+    monkeypatch.setattr(file_index, "RACY_WINDOW_NS", -(10**18))
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def record_listings(monkeypatch: MonkeyPatch, root_dir: str) -> List[str]:
+    """Helper function to record every directory listed by scandir."""
+    listed: List[str] = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path: str):
+        listed.append(os.path.relpath(path, root_dir))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+    return listed
+
+
+def make_project(root_dir: str) -> None:
+    """Helper function to create a small project."""
+    create_file(os.path.join(root_dir, ".gitignore"), "build/\n")
+    create_file(os.path.join(root_dir, "main.py"))
+    create_file(os.path.join(root_dir, "pkg", "mod.py"))
+    create_file(os.path.join(root_dir, "pkg", "sub", "deep.py"))
+    create_file(os.path.join(root_dir, "build", "out.py"))
+
+
+def test_warm_run_lists_nothing(
+    temp_dir: str, no_racy_window: None, monkeypatch: MonkeyPatch
+) -> None:
+    """Test that an unchanged tree is served from the index."""
+    make_project(temp_dir)
+    os.makedirs(os.path.join(temp_dir, ".ptm"))
+    cold = get_python_files(temp_dir, use_git=False, use_cache=True)
+    assert os.path.isfile(FileIndex.load(temp_dir).path)
+
+    listed = record_listings(monkeypatch, temp_dir)
+    warm = get_python_files(temp_dir, use_git=False, use_cache=True)
+
+    assert warm == cold
+    assert listed == []
+
+
+def test_changed_directory_is_relisted(
+    temp_dir: str, no_racy_window: None, monkeypatch: MonkeyPatch
+) -> None:
+    """Test that only the modified directory is listed again."""
+    make_project(temp_dir)
+    os.makedirs(os.path.join(temp_dir, ".ptm"))
+    get_python_files(temp_dir, use_git=False, use_cache=True)
+
+    create_file(os.path.join(temp_dir, "pkg", "new.py"))
+    os.utime(os.path.join(temp_dir, "pkg"), ns=(1, 1))
+    listed = record_listings(monkeypatch, temp_dir)
+    files = get_python_files(temp_dir, use_git=False, use_cache=True)
+
+    assert os.path.join("pkg", "new.py") in files
+    assert listed == ["pkg"]
+
+
+def test_root_gitignore_change_invalidates(temp_dir: str, no_racy_window: None) -> None:
+    """Test that editing the root .gitignore discards the index."""
+    make_project(temp_dir)
+    get_python_files(temp_dir, use_git=False, use_cache=True)
+
+    create_file(os.path.join(temp_dir, ".gitignore"), "pkg/\n")
+    files = get_python_files(temp_dir, use_git=False, use_cache=True)
+
+    assert sorted(files) == [os.path.join("build", "out.py"), "main.py"]
+
+
+def test_nested_gitignore_change_relists_subtree(
+    temp_dir: str, no_racy_window: None
+) -> None:
+    """Test that editing a nested .gitignore invalidates its descendants."""
+    make_project(temp_dir)
+    create_file(os.path.join(temp_dir, "pkg", ".gitignore"), "")
+    get_python_files(temp_dir, use_git=False, use_cache=True)
+
+    create_file(os.path.join(temp_dir, "pkg", ".gitignore"), "deep.py\n")
+    os.utime(os.path.join(temp_dir, "pkg", ".gitignore"), ns=(1, 1))
+    files = get_python_files(temp_dir, use_git=False, use_cache=True)
+
+    assert sorted(files) == ["main.py", os.path.join("pkg", "mod.py")]
+
+
+def test_racy_directories_are_not_trusted(temp_dir: str) -> None:
+    """Test that directories modified during the scan are listed again."""
+    make_project(temp_dir)
+    get_python_files(temp_dir, use_git=False, use_cache=True)
+
+    index = FileIndex.load(temp_dir)
+    assert index.lookup("pkg") is None
+
+
+def test_state_dir_ignores_itself(temp_dir: str) -> None:
+    """Test that .ptm gets a .gitignore of its own, kept once edited, and that
+    directories outside .ptm are created without one."""
+    get_python_files(temp_dir, False, use_cache=True)
+    gitignore = os.path.join(temp_dir, ".ptm", ".gitignore")
+    with open(gitignore) as file:
+        assert file.read().splitlines()[-1] == "*"
+    assert not os.path.exists(os.path.join(temp_dir, ".gitignore"))
+
+    create_file(gitignore, "# mine\n")
+    make_state_dir(os.path.join(temp_dir, ".ptm", "cache", "results"))
+    with open(gitignore) as file:
+        assert file.read() == "# mine\n"
+
+    make_state_dir(os.path.join(temp_dir, "out"))
+    assert os.listdir(os.path.join(temp_dir, "out")) == []
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Generator, Iterator
+import pytest
+from app.utils import instrument
+from app.utils.workspace import (
+    create_test_files,
+    get_python_files,
+    in_tests_directory,
+)
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+@pytest.fixture
+def recorder() -> Generator[instrument.Recorder, Any, None]:
+    """Enables recording for the duration of a test."""
+    yield instrument.enable()
+    instrument.disable()
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def test_disabled_instrumentation_is_a_no_op() -> None:
+    """Test that nothing is recorded and iterables pass through when disabled."""
+    items = [1, 2, 3]
+
+    assert instrument.phase("walk") is instrument.phase("match")
+    assert instrument.timed("walk", items) is items
+    instrument.count("files matched")
+
+
+def test_nested_phase_time_is_excluded(recorder: instrument.Recorder) -> None:
+    """Test that a phase's time excludes the phases nested in it."""
+    with instrument.phase("outer"):
+        time.sleep(0.02)
+        with instrument.phase("inner"):
+            time.sleep(0.05)
+
+    assert recorder.calls == {"inner": 1, "outer": 1}
+    assert recorder.seconds["inner"] >= 0.05
+    assert 0.02 <= recorder.seconds["outer"] < 0.05
+
+
+def test_timed_only_counts_time_producing_items(
+    recorder: instrument.Recorder,
+) -> None:
+    """Test that a timed generator is only timed while it runs."""
+
+    def slow_items() -> Iterator[int]:
+        for item in range(2):
+            time.sleep(0.01)
+            yield item
+
+    with instrument.phase("consume"):
+        for _ in instrument.timed("produce", slow_items()):
+            time.sleep(0.03)
+
+    assert recorder.calls["produce"] == 3
+    assert 0.02 <= recorder.seconds["produce"] < 0.05
+    assert recorder.seconds["consume"] >= 0.06
+
+
+def test_phases_on_other_threads_are_ignored(recorder: instrument.Recorder) -> None:
+    """Test that only the recording thread opens phases."""
+    thread = threading.Thread(target=lambda: instrument.phase("write").__enter__())
+    thread.start()
+    thread.join()
+
+    assert recorder.seconds == {}
+
+
+def test_workspace_operations_are_counted(
+    temp_dir: str, recorder: instrument.Recorder
+) -> None:
+    """Test that discovery and test file creation report their work."""
+    create_file(os.path.join(temp_dir, ".gitignore"), "build/\n")
+    create_file(os.path.join(temp_dir, "pkg", "a.py"))
+    create_file(os.path.join(temp_dir, "pkg", "b.py"))
+    create_file(os.path.join(temp_dir, "build", "c.py"))
+    create_file(os.path.join(temp_dir, "tests", "pkg", "test_a.py"))
+
+    python_files = [
+        python_file
+        for python_file in get_python_files(temp_dir, use_git=False)
+        if not in_tests_directory(python_file)
+    ]
+    create_test_files(os.path.join(temp_dir, "tests"), python_files)
+
+    assert recorder.counts == {
+        "directories visited": 4,
+        "files matched": 3,
+        "files created": 1,
+        "files skipped": 1,
+    }
+    assert {"ignore spec", "match", "walk", "write"} <= set(recorder.seconds)
+
+
+def test_report_formats(recorder: instrument.Recorder) -> None:
+    """Test the table and JSON forms of a report."""
+    with instrument.phase("walk"):
+        instrument.count("files matched", 2)
+
+    data = recorder.to_dict()
+    table = recorder.format_table()
+
+    assert data["phases"]["walk"]["calls"] == 1
+    assert data["counters"] == {"files matched": 2}
+    assert data["total_seconds"] >= data["phases"]["walk"]["seconds"]
+    assert table.splitlines()[0].split() == ["phase", "calls", "time", "(ms)", "share"]
+    assert "files matched" in table
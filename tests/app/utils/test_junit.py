@@ -0,0 +1,126 @@
+import os
+import tempfile
+import tracemalloc
+from typing import Any, Generator
+import pytest
+from app.utils.junit import aggregate_junit, parse_junit, source_for
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+SHARD = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" tests="5">
+<testcase classname="tests.pkg.test_mod" name="test_a" time="1.5"/>
+<testcase classname="tests.pkg.test_mod.TestB" name="test_b" time="0.5">
+<failure message="assert 0">trace</failure><system-out>noise</system-out>
+</testcase>
+<testcase classname="tests.test_top" name="test_c" time="0.25">
+<skipped message="later"/>
+</testcase>
+<testcase classname="tests.test_top" name="test_d" time="0.25">
+<error message="fixture"/>
+</testcase>
+<testcase file="tests/test_other.py" classname="whatever" name="test_e" time="3"/>
+</testsuite></testsuites>
+"""
+
+
+def test_parse_junit_groups_cases_by_test_file(temp_dir: str) -> None:
+    """Test that test cases are counted per test file, with failing node ids."""
+    path = os.path.join(temp_dir, "junit.xml")
+    create_file(path, SHARD)
+
+    results = {result.path: result for result in parse_junit(path)}
+
+    assert sorted(results) == [
+        "tests/pkg/test_mod.py",
+        "tests/test_other.py",
+        "tests/test_top.py",
+    ]
+    mod = results["tests/pkg/test_mod.py"]
+    assert (mod.tests, mod.passed, mod.failures, mod.seconds) == (2, 1, 1, 2.0)
+    assert mod.failed == ["tests/pkg/test_mod.py::TestB::test_b"]
+    top = results["tests/test_top.py"]
+    assert (top.tests, top.passed, top.skipped, top.errors) == (2, 0, 1, 1)
+    assert top.failed == ["tests/test_top.py::test_d"]
+    assert results["tests/test_other.py"].seconds == 3.0
+
+
+def test_aggregate_junit_merges_shards(temp_dir: str) -> None:
+    """Test that shards parsed in parallel are merged per test file."""
+    paths = [os.path.join(temp_dir, f"shard{index}.xml") for index in range(2)]
+    for path in paths:
+        create_file(path, SHARD)
+
+    report = aggregate_junit(paths, max_workers=2)
+    data = report.to_dict()
+
+    assert data["totals"] == {
+        "files": 3,
+        "tests": 10,
+        "passed": 4,
+        "failures": 2,
+        "errors": 2,
+        "skipped": 2,
+        "seconds": 11.0,
+    }
+    assert data["files"][0]["test"] == "tests/pkg/test_mod.py"
+    assert data["files"][0]["source"] == "pkg/mod.py"
+    assert [result.path for result in report.slowest(1)] == ["tests/test_other.py"]
+    assert [result.path for result in report.failing()] == [
+        "tests/pkg/test_mod.py",
+        "tests/test_top.py",
+    ]
+
+
+def test_source_for_follows_the_test_layout() -> None:
+    """Test that test files map back to the sources create_test_files mirrors."""
+    assert source_for("tests/pkg/test_mod.py") == "pkg/mod.py"
+    assert source_for("tests/test_mod.py") == "mod.py"
+    assert source_for("tests/pkg/conftest.py") is None
+    assert source_for("other/test_mod.py") is None
+
+
+def test_parse_junit_memory_stays_flat(temp_dir: str) -> None:
+    """Test that parsing holds one test case at a time, not the whole file."""
+    path = os.path.join(temp_dir, "big.xml")
+    output = "x" * 2048
+    with open(path, "w") as file:
+        file.write("<testsuites><testsuite>")
+        for index in range(5000):
+            file.write(
+                f'<testcase classname="tests.test_big" name="test_{index}" '
+                f'time="0.001"><system-out>{output}</system-out></testcase>'
+            )
+        file.write("</testsuite></testsuites>")
+
+    tracemalloc.start()
+    try:
+        results = parse_junit(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert results[0].tests == 5000
+    assert peak < os.path.getsize(path) / 10
+
+
+def test_parse_junit_rejects_malformed_xml(temp_dir: str) -> None:
+    """Test that malformed files raise a ValueError naming the file."""
+    path = os.path.join(temp_dir, "broken.xml")
+    create_file(path, "<testsuites><testcase>")
+
+    with pytest.raises(ValueError, match="broken.xml"):
+        parse_junit(path)
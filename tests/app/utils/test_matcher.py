@@ -0,0 +1,97 @@
+import os
+from typing import List
+import pytest
+from pathspec import PathSpec
+from app.utils.matcher import IgnoreMatcher
+
+hypothesis = pytest.importorskip("hypothesis")
+strategies = pytest.importorskip("hypothesis.strategies")
+
+NAMES = ["a", "b", "build", "mod.py", "x.tar.gz", ".venv", "a b", "c-d", "é"]
+GLOBS = ["*", "**", "?", "*.py", "*.gz", "[ab]", "[!a]", "a*", "*.py[cod]", ".*"]
+
+
+def compile_lines(lines: List[str]) -> PathSpec:
+    """Helper function to compile gitignore lines with pathspec."""
+    return PathSpec.from_lines("gitwildmatch", lines)
+
+
+def test_partitions_literal_patterns() -> None:
+    """Test that literal names, extensions and anchored paths skip the regex."""
+    spec = compile_lines(
+        ["build/", "*.pyc", "/dist", "docs/site/", "a*b", "!keep", "src/**/gen"]
+    )
+    matcher = IgnoreMatcher(spec.patterns)
+
+    assert matcher._names == {"build": [-1, 0], "keep": [5, -1]}
+    assert matcher._extensions == {"pyc": [1, -1]}
+    assert matcher._anchored == {"dist": [2, -1], "docs/site": [-1, 3]}
+    assert matcher._dir_globs is not None and matcher._dir_globs.groupindex == {"p4": 1}
+    assert matcher._paths is not None and matcher._paths.groupindex == {"p6": 1}
+
+
+def test_last_matching_pattern_decides() -> None:
+    """Test that negations re-include in pattern order, across partitions."""
+    spec = compile_lines(["*.log", "!important.log", "logs/", "/tmp*", "!tmpkeep"])
+    matcher = IgnoreMatcher(spec.patterns)
+
+    for path in [
+        "a.log",
+        "important.log",
+        "logs/important.log",
+        "logs/",
+        "tmpx",
+        "tmpkeep",
+        "sub/tmpx",
+        os.path.join("src", "mod.py"),
+    ]:
+        assert matcher.match_file(path) == spec.match_file(path), path
+
+
+def test_directory_decisions_are_memoized() -> None:
+    """Test that directories are only ranked once per matcher."""
+    matcher = IgnoreMatcher(compile_lines(["build/"]).patterns)
+
+    assert matcher.match_file("pkg/build/a.py")
+    assert matcher.match_file("pkg/build/b.py")
+    assert not matcher.match_file("pkg/src/b.py")
+    assert set(matcher._directories) == {"", "pkg", "pkg/build", "pkg/src"}
+
+
+components = strategies.sampled_from(NAMES + ["dir", "sub"])
+pattern_parts = strategies.sampled_from(NAMES + GLOBS)
+
+
+@strategies.composite
+def gitignore_lines(draw: strategies.DrawFn) -> str:
+    """Generates gitignore lines mixing literal and glob parts."""
+    parts = draw(strategies.lists(pattern_parts, min_size=1, max_size=3))
+    line = "/".join(parts)
+    if draw(strategies.booleans()):
+        line = "/" + line
+    if draw(strategies.booleans()):
+        line += "/"
+    if draw(strategies.booleans()):
+        line = "!" + line
+    return line
+
+
+@hypothesis.settings(max_examples=400, deadline=None)
+@hypothesis.given(
+    lines=strategies.lists(gitignore_lines(), max_size=12),
+    paths=strategies.lists(
+        strategies.lists(components, min_size=1, max_size=4), min_size=1, max_size=8
+    ),
+    directory=strategies.booleans(),
+)
+def test_matches_pathspec(
+    lines: List[str], paths: List[List[str]], directory: bool
+) -> None:
+    """Test that the matcher agrees with pathspec's gitwildmatch on any input."""
+    spec = compile_lines(lines)
+    patterns = [pattern for pattern in spec.patterns if pattern.include is not None]
+    matcher = IgnoreMatcher(patterns)
+
+    for parts in paths:
+        path = "/".join(parts) + ("/" if directory else "")
+        assert matcher.match_file(path) == spec.match_file(path), (lines, path)
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils.projects import apply_plans, find_projects, plan_projects
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def create_workspace(root_dir: str) -> None:
+    """Helper function to create a workspace with nested projects."""
+    create_file(os.path.join(root_dir, ".gitignore"), "build/\n")
+    create_file(os.path.join(root_dir, "loose.py"))
+    create_file(os.path.join(root_dir, "api", "pyproject.toml"))
+    create_file(os.path.join(root_dir, "api", "app", "main.py"))
+    create_file(os.path.join(root_dir, "api", "tests", "conftest.py"))
+    create_file(os.path.join(root_dir, "api", "build", "gen.py"))
+    create_file(os.path.join(root_dir, "api", "plugins", "uv.lock"))
+    create_file(os.path.join(root_dir, "api", "plugins", "hook.py"))
+    create_file(os.path.join(root_dir, "libs", "core", "setup.py"))
+    create_file(os.path.join(root_dir, "libs", "core", "core.py"))
+
+
+def test_find_projects(temp_dir: str) -> None:
+    """Test that files are assigned to the nearest enclosing project."""
+    create_workspace(temp_dir)
+
+    assert find_projects(temp_dir) == {
+        "api": [os.path.join("app", "main.py")],
+        os.path.join("api", "plugins"): ["hook.py"],
+        os.path.join("libs", "core"): ["core.py", "setup.py"],
+    }
+
+
+def test_find_projects_with_git(temp_dir: str) -> None:
+    """Test that git mode assigns the files git lists the same way."""
+    create_workspace(temp_dir)
+    subprocess.run(["git", "init", "-q", temp_dir], check=True)
+
+    assert find_projects(temp_dir, use_git=True) == find_projects(temp_dir)
+
+
+def test_workspace_root_is_a_project(temp_dir: str) -> None:
+    """Test that a marked workspace root owns the files outside nested projects."""
+    create_workspace(temp_dir)
+    create_file(os.path.join(temp_dir, "requirements.txt"))
+
+    projects = find_projects(temp_dir)
+
+    assert projects[""] == ["loose.py"]
+    assert "api" in projects
+
+
+def test_find_projects_missing_directory() -> None:
+    """Test that a missing workspace raises FileNotFoundError."""
+    with pytest.raises(FileNotFoundError):
+        find_projects("does/not/exist")
+
+
+def test_plan_and_apply_projects(temp_dir: str) -> None:
+    """Test that each project is scaffolded into its own tests directory."""
+    create_workspace(temp_dir)
+    projects = find_projects(temp_dir)
+
+    plans = plan_projects(temp_dir, projects, max_workers=2)
+    results = apply_plans(plans, max_workers=2)
+
+    assert list(plans) == list(projects)
+    assert {project: result.created for project, result in results.items()} == {
+        "api": 1,
+        os.path.join("api", "plugins"): 1,
+        os.path.join("libs", "core"): 2,
+    }
+    assert os.path.isfile(os.path.join(temp_dir, "api", "tests", "app", "test_main.py"))
+    assert os.path.isfile(
+        os.path.join(temp_dir, "api", "plugins", "tests", "test_hook.py")
+    )
+    assert all(plan.complete for plan in plan_projects(temp_dir, projects).values())
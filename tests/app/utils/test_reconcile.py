@@ -0,0 +1,130 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils.git import FileChange, get_changed_files
+from app.utils.workspace import TEST_STUB
+from app.utils.reconcile import (
+    apply_reconciliation,
+    list_test_files,
+    reconcile,
+    reconcile_changes,
+)
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def test_reconcile_finds_missing_moved_and_orphaned(temp_dir: str) -> None:
+    """Test the three kinds of differences in one pass."""
+    tests_dir = os.path.join(temp_dir, "tests")
+    create_file(os.path.join(tests_dir, "test_main.py"))
+    create_file(os.path.join(tests_dir, "old", "test_moved.py"), "# kept\n")
+    create_file(os.path.join(tests_dir, "test_gone.py"))
+
+    result = reconcile(
+        tests_dir,
+        [
+            "main.py",
+            "helper.py",
+            os.path.join("new", "moved.py"),
+            os.path.join("tests", "conftest.py"),
+        ],
+    )
+
+    assert result.missing == {"test_helper.py": "helper.py"}
+    assert result.moved == [
+        (os.path.join("old", "test_moved.py"), os.path.join("new", "test_moved.py"))
+    ]
+    assert result.orphaned == ["test_gone.py"]
+
+
+def test_apply_reconciliation(temp_dir: str) -> None:
+    """Test that moves keep content and that only unedited orphans are pruned,
+    and only on request."""
+    tests_dir = os.path.join(temp_dir, "tests")
+    create_file(os.path.join(tests_dir, "old", "test_moved.py"), "# kept\n")
+    create_file(os.path.join(tests_dir, "test_gone.py"))
+
+    result = reconcile(tests_dir, ["helper.py", os.path.join("new", "moved.py")])
+    apply_reconciliation(tests_dir, result)
+
+    assert list_test_files(tests_dir) == {
+        "test_helper.py",
+        "test_gone.py",
+        os.path.join("new", "test_moved.py"),
+    }
+    with open(os.path.join(tests_dir, "new", "test_moved.py")) as file:
+        assert file.read() == "# kept\n"
+
+    create_file(os.path.join(tests_dir, "test_stub.py"), TEST_STUB)
+    create_file(
+        os.path.join(tests_dir, "test_edited.py"), TEST_STUB + "def test_x(): ...\n"
+    )
+    kept = apply_reconciliation(
+        tests_dir, reconcile(tests_dir, ["helper.py"]), prune=True
+    )
+    moved = os.path.join("new", "test_moved.py")
+    assert kept == [moved, "test_edited.py"]
+    assert list_test_files(tests_dir) == {"test_helper.py", "test_edited.py", moved}
+
+
+def test_reconcile_changes(temp_dir: str) -> None:
+    """Test reconciling only a set of changed files."""
+    tests_dir = os.path.join(temp_dir, "tests")
+    create_file(os.path.join(tests_dir, "test_a.py"))
+    create_file(os.path.join(tests_dir, "test_deleted.py"))
+
+    result = reconcile_changes(
+        tests_dir,
+        [
+            FileChange("R", os.path.join("pkg", "a.py"), "a.py"),
+            FileChange("D", "deleted.py"),
+            FileChange("A", "added.py"),
+            FileChange("M", "README.md"),
+        ],
+    )
+
+    assert result.moved == [("test_a.py", os.path.join("pkg", "test_a.py"))]
+    assert result.orphaned == ["test_deleted.py"]
+    assert result.missing == {"test_added.py": "added.py"}
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="Git is not installed")
+def test_get_changed_files(temp_dir: str) -> None:
+    """Test that renames, deletions and untracked files are reported."""
+
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=temp_dir, check=True, capture_output=True)
+
+    git("init")
+    git("config", "user.email", "test@example.com")
+    git("config", "user.name", "Test User")
+    create_file(os.path.join(temp_dir, "a.py"), "value = 1\n" * 20)
+    create_file(os.path.join(temp_dir, "b.py"))
+    git("add", ".")
+    git("commit", "-m", "init")
+
+    git("mv", "a.py", "renamed.py")
+    os.remove(os.path.join(temp_dir, "b.py"))
+    create_file(os.path.join(temp_dir, "new file.py"))
+
+    changes = get_changed_files(temp_dir, "HEAD")
+    assert sorted(changes) == [
+        FileChange("A", "new file.py"),
+        FileChange("D", "b.py"),
+        FileChange("R", "renamed.py", "a.py"),
+    ]
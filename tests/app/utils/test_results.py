@@ -0,0 +1,130 @@
+import os
+import tempfile
+import time
+from typing import Any, Generator
+import pytest
+from app.utils.depgraph import ImportGraph
+from app.utils.results import ResultCache, run_uncached
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def create_project(root_dir: str) -> None:
+    """Helper function to create a project with a passing and a failing test file."""
+    create_file(os.path.join(root_dir, "pyproject.toml"), "[project]\nname = 'x'\n")
+    create_file(os.path.join(root_dir, "pkg", "mod.py"), "VALUE = 1\n")
+    create_file(
+        os.path.join(root_dir, "tests", "pkg", "test_mod.py"),
+        "from pkg.mod import VALUE\n\ndef test_value():\n    assert VALUE == 1\n",
+    )
+    create_file(
+        os.path.join(root_dir, "tests", "test_other.py"),
+        "def test_other():\n    assert 0\n",
+    )
+
+
+TEST_MOD = os.path.join("tests", "pkg", "test_mod.py")
+TEST_OTHER = os.path.join("tests", "test_other.py")
+ARGS = ["-q", "-p", "no:cacheprovider"]
+
+
+def test_run_uncached_caches_passing_files(temp_dir: str) -> None:
+    """Test that only passing test files are cached and reused."""
+    create_project(temp_dir)
+    cache = ResultCache(temp_dir, ARGS)
+
+    exit_code, passed = run_uncached(temp_dir, [TEST_MOD, TEST_OTHER], ARGS, cache)
+
+    assert exit_code == 1
+    assert list(passed) == [TEST_MOD]
+    assert ResultCache(temp_dir, ARGS).partition([TEST_MOD, TEST_OTHER]) == (
+        [TEST_MOD],
+        [TEST_OTHER],
+    )
+    assert ResultCache(temp_dir, ["-x"]).partition([TEST_MOD]) == ([], [TEST_MOD])
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        os.path.join("pkg", "mod.py"),
+        TEST_MOD,
+        os.path.join("tests", "pkg", "conftest.py"),
+        "pyproject.toml",
+    ],
+)
+def test_inputs_invalidate_the_key(temp_dir: str, changed: str) -> None:
+    """Test that editing any input of a test file changes its key."""
+    create_project(temp_dir)
+    before = ResultCache(temp_dir).key(TEST_MOD)
+    unrelated = ResultCache(temp_dir).key(TEST_OTHER)
+
+    with open(os.path.join(temp_dir, changed), "a") as file:
+        file.write("# edited\n")
+
+    assert ResultCache(temp_dir).key(TEST_MOD) != before
+    if changed != "pyproject.toml":
+        assert ResultCache(temp_dir).key(TEST_OTHER) == unrelated
+
+
+def test_evict_drops_least_recently_used(temp_dir: str) -> None:
+    """Test that eviction keeps the cache under its cap, oldest use first."""
+    create_project(temp_dir)
+    cache = ResultCache(temp_dir)
+    names = [os.path.join("tests", f"test_{index}.py") for index in range(8)]
+    cache.store({name: 0.1 for name in names})
+    entries = [os.path.join(cache.directory, cache.key(name)) for name in names]
+    size = os.stat(entries[0]).st_blocks * 512 or os.path.getsize(entries[0])
+    now = time.time()
+    for age, entry in enumerate(entries):
+        os.utime(entry, (now - 100 + age, now - 100 + age))
+    cache.partition(names[:1])
+
+    cache.max_bytes = 4 * size
+    removed = cache.evict()
+
+    assert removed == 5
+    assert cache.partition(names) == ([names[0], names[6], names[7]], names[1:6])
+
+
+def test_import_closure_is_part_of_the_key(temp_dir: str) -> None:
+    """Test that modules imported through others invalidate the key, while
+    modules loaded dynamically are not tracked."""
+    create_project(temp_dir)
+    create_file(os.path.join(temp_dir, "pkg", "__init__.py"))
+    create_file(os.path.join(temp_dir, "pkg", "helper.py"), "HELP = 1\n")
+    create_file(os.path.join(temp_dir, "pkg", "dynamic.py"), "DYN = 1\n")
+    create_file(
+        os.path.join(temp_dir, "pkg", "mod.py"),
+        "import importlib\nfrom pkg.helper import HELP\n"
+        "DYN = importlib.import_module('pkg.dynamic').DYN\n",
+    )
+    python_files = [
+        os.path.join("pkg", name) for name in ("__init__.py", "helper.py", "dynamic.py")
+    ] + [os.path.join("pkg", "mod.py"), TEST_MOD, TEST_OTHER]
+
+    def key() -> str:
+        graph = ImportGraph(temp_dir)
+        graph.update(python_files)
+        return ResultCache(temp_dir, graph=graph).key(TEST_MOD)
+
+    before = key()
+    with open(os.path.join(temp_dir, "pkg", "dynamic.py"), "a") as file:
+        file.write("# edited\n")
+    assert key() == before
+
+    with open(os.path.join(temp_dir, "pkg", "helper.py"), "a") as file:
+        file.write("# edited\n")
+    assert key() != before
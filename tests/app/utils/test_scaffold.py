@@ -0,0 +1,118 @@
+import os
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils.scaffold import ScaffoldPlan, apply_plan, plan_scaffold
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def test_plan_without_tests_directory(temp_dir: str) -> None:
+    """Test that a plan creates the tests directory and every parent."""
+    plan = plan_scaffold(
+        temp_dir, ["main.py", "__init__.py", os.path.join("pkg", "sub", "mod.py")]
+    )
+
+    assert plan.directories == ["tests", "tests/pkg", "tests/pkg/sub"]
+    assert plan.create == {
+        "tests/pkg/sub/test_mod.py": "pkg/sub/mod.py",
+        "tests/test_main.py": "main.py",
+    }
+    assert plan.present == []
+    assert not plan.complete
+
+
+def test_plan_skips_present_files(temp_dir: str) -> None:
+    """Test that existing test files and directories are left out of a plan."""
+    create_file(os.path.join(temp_dir, "tests", "pkg", "test_a.py"), "keep")
+    create_file(os.path.join(temp_dir, "tests", "test_helpers.py"))
+
+    plan = plan_scaffold(
+        temp_dir,
+        [
+            os.path.join("pkg", "a.py"),
+            os.path.join("pkg", "b.py"),
+            os.path.join("tests", "test_helpers.py"),
+        ],
+    )
+
+    assert plan.directories == []
+    assert plan.create == {"tests/pkg/test_b.py": "pkg/b.py"}
+    assert plan.present == ["tests/pkg/test_a.py"]
+
+
+def test_planning_writes_nothing(temp_dir: str) -> None:
+    """Test that planning only reads the disk."""
+    create_file(os.path.join(temp_dir, "pkg", "a.py"))
+
+    plan_scaffold(temp_dir, [os.path.join("pkg", "a.py")])
+
+    assert sorted(os.listdir(temp_dir)) == ["pkg"]
+
+
+def test_complete_plan(temp_dir: str) -> None:
+    """Test that a plan with nothing to create is complete."""
+    create_file(os.path.join(temp_dir, "tests", "test_main.py"))
+
+    plan = plan_scaffold(temp_dir, ["main.py"])
+
+    assert plan.complete
+    assert plan.to_dict() == {
+        "complete": True,
+        "directories": [],
+        "create": [],
+        "present": ["tests/test_main.py"],
+    }
+
+
+def test_apply_plan(temp_dir: str) -> None:
+    """Test that applying a plan creates its directories and test files."""
+    create_file(os.path.join(temp_dir, "tests", "pkg", "test_a.py"), "keep")
+    plan = plan_scaffold(
+        temp_dir,
+        [os.path.join("pkg", "a.py"), os.path.join("pkg", "new", "b.py")],
+    )
+
+    result = apply_plan(plan, max_workers=2)
+
+    assert (result.created, result.skipped) == (1, 1)
+    with open(os.path.join(temp_dir, "tests", "pkg", "test_a.py")) as file:
+        assert file.read() == "keep"
+    assert os.path.isfile(os.path.join(temp_dir, "tests", "pkg", "new", "test_b.py"))
+    assert plan_scaffold(
+        temp_dir,
+        [os.path.join("pkg", "a.py"), os.path.join("pkg", "new", "b.py")],
+    ).complete
+
+
+def test_apply_plan_keeps_files_created_after_planning(temp_dir: str) -> None:
+    """Test that a test file written between planning and applying is kept."""
+    plan = plan_scaffold(temp_dir, [os.path.join("pkg", "a.py"), "b.py"])
+    create_file(os.path.join(temp_dir, "tests", "pkg", "test_a.py"), "mine")
+
+    result = apply_plan(plan)
+
+    assert (result.created, result.skipped) == (1, 1)
+    with open(os.path.join(temp_dir, "tests", "pkg", "test_a.py")) as file:
+        assert file.read() == "mine"
+    assert os.path.isfile(os.path.join(temp_dir, "tests", "test_b.py"))
+
+
+def test_apply_empty_plan(temp_dir: str) -> None:
+    """Test that applying an empty plan does nothing."""
+    result = apply_plan(ScaffoldPlan(temp_dir))
+
+    assert (result.created, result.skipped) == (0, 0)
+    assert os.listdir(temp_dir) == []
@@ -0,0 +1,99 @@
+import os
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils.git import FileChange
+from app.utils.selection import (
+    map_to_test_files,
+    run_pytest,
+    select_changed_tests,
+    select_impacted_tests,
+)
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def test_map_to_test_files(temp_dir: str) -> None:
+    """Test that sources map to existing test files and tests to themselves."""
+    create_file(os.path.join(temp_dir, "tests", "pkg", "test_mod.py"))
+    create_file(os.path.join(temp_dir, "tests", "test_other.py"))
+    create_file(os.path.join(temp_dir, "tests", "conftest.py"))
+
+    selected = map_to_test_files(
+        temp_dir,
+        [
+            os.path.join("pkg", "mod.py"),
+            os.path.join("pkg", "untested.py"),
+            os.path.join("tests", "test_other.py"),
+            os.path.join("tests", "conftest.py"),
+            "README.md",
+        ],
+    )
+
+    assert selected == [
+        os.path.join("tests", "pkg", "test_mod.py"),
+        os.path.join("tests", "test_other.py"),
+    ]
+
+
+def test_select_changed_tests_skips_deleted(temp_dir: str) -> None:
+    """Test that deleted files select nothing and renames use the new path."""
+    create_file(os.path.join(temp_dir, "tests", "test_gone.py"))
+    create_file(os.path.join(temp_dir, "tests", "test_new.py"))
+
+    selected = select_changed_tests(
+        temp_dir,
+        [FileChange("D", "gone.py"), FileChange("R", "new.py", "old.py")],
+    )
+
+    assert selected == [os.path.join("tests", "test_new.py")]
+
+
+def test_select_impacted_tests_follows_imports(temp_dir: str) -> None:
+    """Test that tests importing a changed module are selected with its own test."""
+    files = {
+        os.path.join("pkg", "__init__.py"): "",
+        os.path.join("pkg", "core.py"): "",
+        os.path.join("pkg", "cli.py"): "from pkg import core\n",
+        os.path.join("tests", "pkg", "test_core.py"): "",
+        os.path.join("tests", "pkg", "test_cli.py"): "from pkg.cli import main\n",
+        os.path.join("tests", "pkg", "test_unrelated.py"): "",
+    }
+    for path, content in files.items():
+        create_file(os.path.join(temp_dir, path), content)
+
+    selected = select_impacted_tests(
+        temp_dir, [FileChange("M", os.path.join("pkg", "core.py"))], list(files)
+    )
+
+    assert selected == [
+        os.path.join("tests", "pkg", "test_cli.py"),
+        os.path.join("tests", "pkg", "test_core.py"),
+    ]
+    assert os.path.exists(os.path.join(temp_dir, ".ptm", "cache", "imports.json"))
+
+
+def test_run_pytest_returns_exit_code(temp_dir: str) -> None:
+    """Test that only the selected test files are run."""
+    create_file(
+        os.path.join(temp_dir, "tests", "test_pass.py"), "def test_a():\n    pass\n"
+    )
+    create_file(
+        os.path.join(temp_dir, "tests", "test_fail.py"), "def test_b():\n    assert 0\n"
+    )
+
+    passing = os.path.join("tests", "test_pass.py")
+    assert run_pytest(temp_dir, [passing], ["-q", "-p", "no:cacheprovider"]) == 0
+    assert run_pytest(temp_dir, [], ["-q", "-p", "no:cacheprovider"]) == 1
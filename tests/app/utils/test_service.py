@@ -0,0 +1,245 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Generator
+import pytest
+from app.utils.service import (
+    INVALID_PARAMS,
+    INVALID_REQUEST,
+    METHOD_NOT_FOUND,
+    SOCKET_NAME,
+    Workspace,
+    call_service,
+    handle,
+    serve,
+)
+from app.utils.worker import socket_path
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def create_project(root_dir: str) -> None:
+    """Helper function to create a project with one tested and one untested module."""
+    create_file(os.path.join(root_dir, ".gitignore"), "build/\n")
+    create_file(os.path.join(root_dir, "pkg", "mod.py"))
+    create_file(os.path.join(root_dir, "pkg", "other.py"))
+    create_file(os.path.join(root_dir, "build", "gen.py"))
+    create_file(os.path.join(root_dir, "tests", "pkg", "test_mod.py"))
+
+
+def wait_for(condition: Callable[[], bool]) -> bool:
+    """Helper function to wait until a condition holds or five seconds passed."""
+    deadline = time.monotonic() + 5
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def answers_ping(root_dir: str) -> bool:
+    """Helper function to check whether the service of a project is up."""
+    try:
+        return call_service(root_dir, "ping") == "pong"
+    except ConnectionError:
+        return False
+
+
+def refresh_until(workspace: Workspace, condition: Callable[[], bool]) -> bool:
+    """Helper function to apply a workspace's changes until a condition holds."""
+
+    def check() -> bool:
+        workspace.refresh(0.05)
+        return condition()
+
+    return wait_for(check)
+
+
+def test_workspace_maps_sources_and_tests(temp_dir: str) -> None:
+    """Test that the workspace answers queries from its in-memory state."""
+    create_project(temp_dir)
+    workspace = Workspace(temp_dir, use_inotify=False)
+    mod = os.path.join("pkg", "mod.py")
+    other = os.path.join("pkg", "other.py")
+    test_mod = os.path.join("tests", "pkg", "test_mod.py")
+
+    try:
+        assert workspace.sources() == [mod, other]
+        assert workspace.tests() == [test_mod]
+        assert workspace.untested() == [other]
+        assert workspace.test_for(os.path.join(temp_dir, mod)) == test_mod
+        assert workspace.test_for(test_mod) is None
+        assert workspace.source_for(test_mod) == mod
+        assert workspace.source_for(os.path.join("tests", "test_x.py")) is None
+        assert workspace.is_ignored(os.path.join("build", "gen.py"))
+        assert not workspace.is_ignored(other)
+        with pytest.raises(ValueError):
+            workspace.test_for(os.path.join("..", "mod.py"))
+    finally:
+        workspace.close()
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_workspace_follows_changes(temp_dir: str, use_inotify: bool) -> None:
+    """Test that created and deleted files update the mapping incrementally."""
+    create_project(temp_dir)
+    workspace = Workspace(temp_dir, use_inotify=use_inotify)
+    mod = os.path.join("pkg", "mod.py")
+    other = os.path.join("pkg", "other.py")
+    test_mod = os.path.join("tests", "pkg", "test_mod.py")
+
+    try:
+        create_file(os.path.join(temp_dir, "tests", "pkg", "test_other.py"))
+        os.remove(os.path.join(temp_dir, mod))
+        assert refresh_until(workspace, lambda: workspace.sources() == [other])
+        assert workspace.untested() == []
+        assert workspace.source_for(test_mod) is None
+
+        os.remove(os.path.join(temp_dir, test_mod))
+        create_file(os.path.join(temp_dir, mod))
+        assert refresh_until(workspace, lambda: workspace.untested() == [mod])
+        assert workspace.source_for(test_mod) == mod
+    finally:
+        workspace.close()
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_workspace_follows_gitignore_edits(temp_dir: str, use_inotify: bool) -> None:
+    """Test that files hidden or re-included by a .gitignore edit are applied."""
+    create_project(temp_dir)
+    workspace = Workspace(temp_dir, use_inotify=use_inotify)
+    other = os.path.join("pkg", "other.py")
+    gen = os.path.join("build", "gen.py")
+
+    try:
+        create_file(os.path.join(temp_dir, "pkg", ".gitignore"), "other.py\n")
+        assert refresh_until(workspace, lambda: other not in workspace.sources())
+        assert workspace.is_ignored(other)
+
+        create_file(os.path.join(temp_dir, ".gitignore"), "")
+        assert refresh_until(workspace, lambda: gen in workspace.sources())
+    finally:
+        workspace.close()
+
+
+def test_handle_reports_json_rpc_errors(temp_dir: str) -> None:
+    """Test that malformed requests get JSON-RPC errors and notifications don't."""
+    create_project(temp_dir)
+    workspace = Workspace(temp_dir, use_inotify=False)
+
+    def code(message: Any) -> int:
+        response = handle(workspace, message)
+        assert response is not None
+        return response["error"]["code"]
+
+    try:
+        assert code([]) == INVALID_REQUEST
+        assert code({"jsonrpc": "1.0", "id": 1, "method": "ping"}) == INVALID_REQUEST
+        assert code({"jsonrpc": "2.0", "id": 1, "method": "nope"}) == METHOD_NOT_FOUND
+        assert code({"jsonrpc": "2.0", "id": 1, "method": "test_for"}) == INVALID_PARAMS
+        assert (
+            code({"jsonrpc": "2.0", "id": 1, "method": "test_for", "params": ["/"]})
+            == INVALID_PARAMS
+        )
+        assert handle(workspace, {"jsonrpc": "2.0", "method": "ping"}) is None
+        assert handle(
+            workspace,
+            {
+                "jsonrpc": "2.0",
+                "id": 7,
+                "method": "test_for",
+                "params": {"path": os.path.join("pkg", "other.py")},
+            },
+        ) == {
+            "jsonrpc": "2.0",
+            "id": 7,
+            "result": {
+                "test": os.path.join("tests", "pkg", "test_other.py"),
+                "exists": False,
+            },
+        }
+    finally:
+        workspace.close()
+
+
+def test_serve_answers_over_socket(temp_dir: str) -> None:
+    """Test that the service answers clients and stops on shutdown."""
+    create_project(temp_dir)
+    workspace = Workspace(temp_dir)
+    thread = threading.Thread(
+        target=serve, args=(workspace,), kwargs={"poll_interval": 0.01}
+    )
+    thread.start()
+    path = socket_path(temp_dir, SOCKET_NAME)
+
+    try:
+        assert wait_for(lambda: answers_ping(temp_dir))
+        assert call_service(temp_dir, "untested") == [os.path.join("pkg", "other.py")]
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(path)
+            connection.sendall(
+                b'[{"jsonrpc": "2.0", "id": 1, "method": "sources"},'
+                b' {"jsonrpc": "2.0", "method": "ping"}]\nnot json\n'
+            )
+            data = b""
+            while data.count(b"\n") < 2:
+                data += connection.recv(1 << 16)
+        batch, parse_error = data.splitlines()
+        assert b'"id":1' in batch and b"mod.py" in batch
+        assert b"-32700" in parse_error
+
+        create_file(os.path.join(temp_dir, "tests", "pkg", "test_other.py"))
+        assert wait_for(lambda: call_service(temp_dir, "untested") == [])
+
+        assert call_service(temp_dir, "shutdown") is True
+        thread.join(5)
+        assert not thread.is_alive()
+        assert not os.path.exists(path)
+        with pytest.raises(ConnectionError):
+            call_service(temp_dir, "ping")
+    finally:
+        if thread.is_alive():
+            call_service(temp_dir, "shutdown")
+            thread.join(5)
+        workspace.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="needs POSIX users")
+def test_service_socket_is_private(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that deep projects serve from a private directory, and that a
+    socket path taken by something else is neither used nor connected to."""
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", temp_dir)
+    deep = os.path.join(temp_dir, *["directory"] * 12)
+    create_project(deep)
+
+    path = socket_path(deep, SOCKET_NAME)
+    assert os.path.dirname(path) == os.path.join(temp_dir, f"ptm-{os.getuid()}")
+    assert os.lstat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+
+    create_file(path)
+    with pytest.raises(RuntimeError):
+        call_service(deep, "ping")
+    workspace = Workspace(deep, use_inotify=False)
+    try:
+        with pytest.raises(RuntimeError):
+            serve(workspace)
+    finally:
+        workspace.close()
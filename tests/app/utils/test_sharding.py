@@ -0,0 +1,88 @@
+import os
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils.sharding import (
+    TimingStore,
+    parse_junit_durations,
+    run_shards,
+    split_shards,
+)
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def test_split_shards_balances_durations() -> None:
+    """Test that shards are balanced on duration rather than file count."""
+    durations = {"slow.py": 10.0, "a.py": 3.0, "b.py": 3.0, "c.py": 3.0}
+
+    shards = split_shards(["a.py", "b.py", "c.py", "slow.py"], durations, 2)
+
+    assert shards == [["slow.py"], ["a.py", "b.py", "c.py"]]
+
+
+def test_split_shards_defaults_unknown_files() -> None:
+    """Test that unknown files count as an average known file."""
+    shards = split_shards(["known.py", "new1.py", "new2.py"], {"known.py": 4.0}, 3)
+
+    assert sorted(len(shard) for shard in shards) == [1, 1, 1]
+    with pytest.raises(ValueError):
+        split_shards([], {}, 0)
+
+
+def test_timing_store_smooths_durations(temp_dir: str) -> None:
+    """Test that recorded durations persist and are averaged."""
+    with TimingStore(temp_dir) as store:
+        store.record({"tests/test_a.py": 2.0})
+    with TimingStore(temp_dir) as store:
+        store.record({"tests/test_a.py": 4.0})
+        assert store.durations() == {"tests/test_a.py": 3.0}
+
+
+def test_run_shards_measures_files(temp_dir: str) -> None:
+    """Test that sharded runs report exit codes and per-file durations."""
+    create_file(
+        os.path.join(temp_dir, "tests", "test_a.py"), "def test_a():\n    pass\n"
+    )
+    create_file(
+        os.path.join(temp_dir, "tests", "test_b.py"), "def test_b():\n    assert 0\n"
+    )
+
+    exit_code, durations = run_shards(
+        temp_dir,
+        [["tests/test_a.py"], ["tests/test_b.py"], []],
+        ["-q", "-p", "no:cacheprovider"],
+    )
+
+    assert exit_code == 1
+    assert sorted(durations) == ["tests/test_a.py", "tests/test_b.py"]
+
+
+def test_parse_junit_durations(temp_dir: str) -> None:
+    """Test that test case times are summed per file."""
+    report = os.path.join(temp_dir, "report.xml")
+    create_file(
+        report,
+        '<testsuites><testsuite name="pytest">'
+        '<testcase file="tests/test_a.py" name="x" time="0.5"/>'
+        '<testcase file="tests/test_a.py" name="y" time="0.25"/>'
+        '<testcase file="tests/test_b.py" name="z" time="1"/>'
+        "</testsuite></testsuites>",
+    )
+
+    assert parse_junit_durations(report) == {
+        "tests/test_a.py": 0.75,
+        "tests/test_b.py": 1.0,
+    }
@@ -0,0 +1,222 @@
+import os
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils import skeletons
+from app.utils.skeletons import (
+    collect_symbols,
+    extract_symbols,
+    generate_skeletons,
+    module_name,
+    render_skeletons,
+)
+
+SOURCE = """\
+import os
+
+
+def public(x):
+    def nested():
+        pass
+    return nested
+
+
+async def fetch():
+    pass
+
+
+def _private():
+    pass
+
+
+class Widget:
+    def __init__(self):
+        pass
+
+    def render(self):
+        pass
+
+    def _helper(self):
+        pass
+
+
+class _Hidden:
+    pass
+"""
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def read_file(path: str) -> str:
+    """Helper function to read a file."""
+    with open(path, "r") as file:
+        return file.read()
+
+
+def test_extract_symbols() -> None:
+    """Test that only public top-level functions, classes and methods are found."""
+    assert extract_symbols(SOURCE.encode()) == [
+        "public",
+        "fetch",
+        "Widget",
+        "Widget.render",
+    ]
+    assert extract_symbols(b"def broken(:\n") == []
+
+
+def test_module_name() -> None:
+    """Test that paths map to dotted module names."""
+    assert module_name("pkg/sub/mod.py") == "pkg.sub.mod"
+    assert module_name("pkg/__init__.py") == "pkg"
+    assert module_name("main.py") == "main"
+
+
+def test_render_skeletons_appends_missing() -> None:
+    """Test that existing test code is kept and only missing tests are added."""
+    existing = (
+        "import pytest\n"
+        "from pkg.mod import public\n"
+        "\n"
+        "\n"
+        "def test_public():\n"
+        "    assert public(1)\n"
+    )
+
+    content, added = render_skeletons(
+        existing, "pkg.mod", ["public", "Widget", "Widget.render"]
+    )
+
+    assert added == 2
+    assert content.startswith(
+        "import pytest\nfrom pkg.mod import public\nfrom pkg.mod import Widget\n"
+    )
+    assert "def test_public():\n    assert public(1)\n" in content
+    assert content.endswith(
+        "\n\n\ndef test_Widget():\n"
+        '    pytest.skip("not implemented")\n'
+        "\n\ndef test_Widget_render():\n"
+        '    pytest.skip("not implemented")\n'
+    )
+    assert render_skeletons(content, "pkg.mod", ["public", "Widget"]) == (content, 0)
+
+
+def test_render_skeletons_imports_below_docstring() -> None:
+    """Test that imports go below the module docstring and a `from __future__`
+    import, and that test-like names are imported under an alias."""
+    existing = '"""Tests for pkg.mod."""\n'
+
+    content, added = render_skeletons(existing, "pkg.mod", ["test_connection", "run"])
+
+    assert added == 2
+    assert content == (
+        '"""Tests for pkg.mod."""\n'
+        "import pytest\n"
+        "from pkg.mod import test_connection as _test_connection, run\n"
+        "\n"
+        "\n"
+        "def test_test_connection():\n"
+        '    pytest.skip("not implemented")\n'
+        "\n"
+        "\n"
+        "def test_run():\n"
+        '    pytest.skip("not implemented")\n'
+    )
+    assert render_skeletons(content, "pkg.mod", ["test_connection"]) == (content, 0)
+
+    content, _ = render_skeletons(
+        "from __future__ import annotations\n", "pkg.mod", ["run"]
+    )
+    assert content.startswith(
+        "from __future__ import annotations\nimport pytest\nfrom pkg.mod import run\n"
+    )
+
+
+def test_generate_skeletons(temp_dir: str) -> None:
+    """Test that test files are created or extended, and reruns are no-ops."""
+    create_file(os.path.join(temp_dir, "pkg", "mod.py"), SOURCE)
+    create_file(os.path.join(temp_dir, "pkg", "other.py"), "def run():\n    pass\n")
+    create_file(
+        os.path.join(temp_dir, "tests", "pkg", "test_other.py"),
+        "def test_run():\n    pass\n",
+    )
+
+    result = generate_skeletons(temp_dir, ["pkg/mod.py", "pkg/other.py"])
+
+    assert (result.created, result.updated, result.skeletons) == (1, 0, 4)
+    content = read_file(os.path.join(temp_dir, "tests", "pkg", "test_mod.py"))
+    assert content.startswith(
+        "import pytest\nfrom pkg.mod import public, fetch, Widget\n"
+    )
+    assert "def test_Widget_render():" in content
+    assert read_file(os.path.join(temp_dir, "tests", "pkg", "test_other.py")) == (
+        "def test_run():\n    pass\n"
+    )
+
+    result = generate_skeletons(temp_dir, ["pkg/mod.py", "pkg/other.py"])
+    assert result.skeletons == 0
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX file modes")
+def test_generate_skeletons_keeps_file_modes(temp_dir: str) -> None:
+    """Test that new test files get the umask mode and updated ones keep theirs."""
+    create_file(os.path.join(temp_dir, "pkg", "mod.py"), "def a():\n    pass\n")
+    create_file(os.path.join(temp_dir, "pkg", "other.py"), "def b():\n    pass\n")
+    existing = os.path.join(temp_dir, "tests", "pkg", "test_other.py")
+    create_file(existing)
+    os.chmod(existing, 0o640)
+    umask = os.umask(0o022)
+    try:
+        generate_skeletons(temp_dir, ["pkg/mod.py", "pkg/other.py"])
+    finally:
+        os.umask(umask)
+
+    created = os.path.join(temp_dir, "tests", "pkg", "test_mod.py")
+    assert os.stat(created).st_mode & 0o777 == 0o644
+    assert os.stat(existing).st_mode & 0o777 == 0o640
+
+
+def test_collect_symbols_reparses_changed_files_only(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the symbol cache skips parsing unchanged modules."""
+    create_file(os.path.join(temp_dir, "a.py"), "def a():\n    pass\n")
+    create_file(os.path.join(temp_dir, "b.py"), "def b():\n    pass\n")
+    collect_symbols(temp_dir, ["a.py", "b.py"])
+
+    parsed = []
+    original = skeletons._parse_file
+    monkeypatch.setattr(
+        skeletons, "_parse_file", lambda path: parsed.append(path) or original(path)
+    )
+    create_file(
+        os.path.join(temp_dir, "b.py"), "def b():\n    pass\n\n\ndef c():\n    pass\n"
+    )
+
+    assert collect_symbols(temp_dir, ["a.py", "b.py"]) == {
+        "a.py": ["a"],
+        "b.py": ["b", "c"],
+    }
+    assert parsed == [os.path.join(temp_dir, "b.py")]
+
+
+def test_collect_symbols_process_pool(temp_dir: str) -> None:
+    """Test that many modules are parsed in worker processes with the same result."""
+    python_files = [f"mod_{index}.py" for index in range(40)]
+    for index, python_file in enumerate(python_files):
+        create_file(os.path.join(temp_dir, python_file), f"def f{index}():\n    pass\n")
+
+    symbols = collect_symbols(temp_dir, python_files, use_cache=False, max_workers=2)
+
+    assert symbols == {f"mod_{index}.py": [f"f{index}"] for index in range(40)}
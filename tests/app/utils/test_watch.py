@@ -0,0 +1,204 @@
+import ctypes
+import errno
+import os
+import tempfile
+import time
+from typing import Any, Generator, List, Set
+import pytest
+from app.utils import watch
+from app.utils.ignore import IgnoreRules
+from app.utils.workspace import get_ignore_spec
+from app.utils.watch import (
+    EVENT_HEADER,
+    IN_Q_OVERFLOW,
+    InotifyWatcher,
+    PollingWatcher,
+    open_watcher,
+    watch_changes,
+)
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def make_watchers(root_dir: str) -> List[Any]:
+    """Helper function to create every watcher available on this platform."""
+    rules = IgnoreRules(root_dir, get_ignore_spec(root_dir))
+    watchers: List[Any] = [PollingWatcher(root_dir, rules)]
+    libc = InotifyWatcher.available()
+    if libc is not None:
+        watchers.append(InotifyWatcher(root_dir, rules, libc))
+    return watchers
+
+
+def read_until(watcher: Any, expected: Set[str]) -> Set[str]:
+    """Helper function to collect changes until the expected ones arrived."""
+    changed: Set[str] = set()
+    deadline = time.monotonic() + 5
+    while not expected <= changed and time.monotonic() < deadline:
+        changed |= watcher.read(0.1)
+    return changed
+
+
+def test_watchers_report_python_changes(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that writes, creations and deletions are reported, ignored paths aren't."""
+    monkeypatch.setattr(watch, "POLL_INTERVAL", 0.01)
+    create_file(os.path.join(temp_dir, ".gitignore"), "build/\n")
+    create_file(os.path.join(temp_dir, "pkg", "mod.py"), "x = 1\n")
+    create_file(os.path.join(temp_dir, "pkg", "old.py"))
+    create_file(os.path.join(temp_dir, "build", "gen.py"))
+
+    for watcher in make_watchers(temp_dir):
+        try:
+            assert sorted(watcher.files()) == [
+                os.path.join("pkg", "mod.py"),
+                os.path.join("pkg", "old.py"),
+            ]
+            create_file(os.path.join(temp_dir, "pkg", "mod.py"), "x = 22\n")
+            create_file(os.path.join(temp_dir, "pkg", "sub", "new.py"))
+            create_file(os.path.join(temp_dir, "build", "gen.py"), "y = 2\n")
+            create_file(os.path.join(temp_dir, "pkg", "notes.txt"))
+            os.remove(os.path.join(temp_dir, "pkg", "old.py"))
+
+            expected = {
+                os.path.join("pkg", "mod.py"),
+                os.path.join("pkg", "sub", "new.py"),
+                os.path.join("pkg", "old.py"),
+            }
+            assert read_until(watcher, expected) == expected
+            assert os.path.join("pkg", "old.py") not in watcher.files()
+        finally:
+            watcher.close()
+        os.rename(
+            os.path.join(temp_dir, "pkg", "sub", "new.py"),
+            os.path.join(temp_dir, "pkg", "old.py"),
+        )
+        os.rmdir(os.path.join(temp_dir, "pkg", "sub"))
+
+
+def test_watchers_follow_gitignore_changes(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that editing a .gitignore reports the files it hides or re-includes."""
+    monkeypatch.setattr(watch, "POLL_INTERVAL", 0.01)
+    create_file(os.path.join(temp_dir, ".gitignore"), "build/\n")
+    create_file(os.path.join(temp_dir, "pkg", "mod.py"))
+    create_file(os.path.join(temp_dir, "pkg", "sub", "gen.py"))
+    create_file(os.path.join(temp_dir, "build", "out.py"))
+    gen = os.path.join("pkg", "sub", "gen.py")
+    out = os.path.join("build", "out.py")
+
+    for watcher in make_watchers(temp_dir):
+        try:
+            assert gen in watcher.files()
+            create_file(os.path.join(temp_dir, "pkg", ".gitignore"), "gen.py\n")
+            assert read_until(watcher, {gen}) == {gen}
+            assert gen not in watcher.files()
+
+            create_file(os.path.join(temp_dir, ".gitignore"), "# build/\n")
+            assert read_until(watcher, {out}) == {out}
+            assert out in watcher.files()
+        finally:
+            watcher.close()
+        os.remove(os.path.join(temp_dir, "pkg", ".gitignore"))
+        create_file(os.path.join(temp_dir, ".gitignore"), "build/\n")
+        watcher.rules.invalidate("", get_ignore_spec(temp_dir))
+
+
+class LimitedLibc:
+    """Helper class that fails inotify_add_watch once a limit is reached."""
+
+    def __init__(self, libc: Any, limit: int) -> None:
+        self.libc = libc
+        self.limit = limit
+        self.inotify_init1 = libc.inotify_init1
+        self.inotify_rm_watch = libc.inotify_rm_watch
+
+    def inotify_add_watch(self, fd: int, path: bytes, mask: int) -> int:
+        if self.limit <= 0:
+            ctypes.set_errno(errno.ENOSPC)
+            return -1
+        self.limit -= 1
+        return self.libc.inotify_add_watch(fd, path, mask)
+
+
+@pytest.mark.skipif(InotifyWatcher.available() is None, reason="needs inotify")
+def test_inotify_rescans_after_queue_overflow(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a queue overflow reports every file and watches new directories."""
+    create_file(os.path.join(temp_dir, "pkg", "mod.py"))
+    rules = IgnoreRules(temp_dir, get_ignore_spec(temp_dir))
+    watcher = InotifyWatcher(temp_dir, rules, InotifyWatcher.available())
+    try:
+        new = os.path.join("pkg", "sub", "new.py")
+        create_file(os.path.join(temp_dir, new))
+        read = os.read
+
+        def overflow(fd: int, size: int) -> bytes:
+            read(fd, size)
+            return EVENT_HEADER.pack(-1, IN_Q_OVERFLOW, 0, 0)
+
+        monkeypatch.setattr(watch.os, "read", overflow)
+        assert watcher.read(5) == {os.path.join("pkg", "mod.py"), new}
+        monkeypatch.undo()
+
+        create_file(os.path.join(temp_dir, new), "x = 1\n")
+        assert read_until(watcher, {new}) == {new}
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(InotifyWatcher.available() is None, reason="needs inotify")
+def test_inotify_watch_limit(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    """Test that the watch limit falls back to polling at startup, and warns later."""
+    create_file(os.path.join(temp_dir, "pkg", "mod.py"))
+    libc = InotifyWatcher.available()
+    monkeypatch.setattr(InotifyWatcher, "available", lambda: LimitedLibc(libc, 1))
+
+    watcher = open_watcher(temp_dir)
+    watcher.close()
+    assert isinstance(watcher, PollingWatcher)
+    assert "polling for changes instead" in capsys.readouterr().err
+
+    rules = IgnoreRules(temp_dir, get_ignore_spec(temp_dir))
+    watcher = InotifyWatcher(temp_dir, rules, LimitedLibc(libc, 2))
+    try:
+        new = os.path.join("pkg", "sub", "new.py")
+        create_file(os.path.join(temp_dir, new))
+        assert read_until(watcher, {new}) == {new}
+        below = os.path.join("pkg", "sub")
+        assert f"changes below {below} are not seen" in capsys.readouterr().err
+    finally:
+        watcher.close()
+
+
+def test_watch_changes_debounces_bursts() -> None:
+    """Test that events arriving close together are reported as one batch."""
+
+    class FakeWatcher:
+        def __init__(self) -> None:
+            self.events: List[Set[str]] = [set(), {"a.py"}, {"b.py"}, set(), {"c.py"}]
+
+        def read(self, timeout: float) -> Set[str]:
+            return self.events.pop(0) if self.events else set()
+
+    batches = watch_changes(FakeWatcher(), debounce=0.01)  # type: ignore[arg-type]
+
+    assert next(batches) == {"a.py", "b.py"}
+    assert next(batches) == {"c.py"}
@@ -0,0 +1,168 @@
+import os
+import socket
+import tempfile
+from typing import Any, Generator
+import pytest
+from app.utils.worker import (
+    check_socket_owner,
+    declared_dependencies,
+    lockfile_fingerprint,
+    preload_modules,
+    run_in_worker,
+    socket_path,
+    stop_worker,
+)
+
+
+@pytest.fixture
+def temp_dir() -> Generator[str, Any, None]:
+    """Creates a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as temp:
+        yield temp
+
+
+def create_file(path: str, content: str = "") -> None:
+    """Helper function to create a file and write to it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def test_declared_dependencies(temp_dir: str) -> None:
+    """Test that dependency names are read from pyproject and requirements."""
+    create_file(
+        os.path.join(temp_dir, "pyproject.toml"),
+        "[project]\n"
+        'dependencies = ["click>=8", "PathSpec[extra] ; python_version>\'3\'"]\n'
+        "[project.optional-dependencies]\n"
+        'dev = ["pytest"]\n'
+        "[tool.poetry.dependencies]\n"
+        'python = "^3.11"\n'
+        'requests = "*"\n',
+    )
+    create_file(
+        os.path.join(temp_dir, "requirements.txt"),
+        "# pinned\n-e .\nnumpy==2.0\nclick\n",
+    )
+
+    assert declared_dependencies(temp_dir) == [
+        "click",
+        "PathSpec",
+        "pytest",
+        "requests",
+        "numpy",
+    ]
+
+
+def test_lockfile_fingerprint_tracks_lockfiles(temp_dir: str) -> None:
+    """Test that only lockfile changes move the fingerprint."""
+    before = lockfile_fingerprint(temp_dir)
+    create_file(os.path.join(temp_dir, "pkg", "mod.py"), "x = 1\n")
+    assert lockfile_fingerprint(temp_dir) == before
+
+    create_file(os.path.join(temp_dir, "uv.lock"), "version = 1\n")
+    assert lockfile_fingerprint(temp_dir) != before
+
+
+def test_socket_path_stays_short(temp_dir: str) -> None:
+    """Test that deep projects get a socket path below the OS limit."""
+    assert socket_path(temp_dir).startswith(temp_dir)
+
+    deep = os.path.join(temp_dir, *["directory"] * 12)
+    assert len(socket_path(deep)) <= 100
+    assert socket_path(deep) == socket_path(deep)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="needs POSIX users")
+def test_socket_fallback_is_private(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that deep projects put their sockets in a directory only the
+    current user can access, and refuse a directory someone else prepared."""
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", temp_dir)
+    deep = os.path.join(temp_dir, *["directory"] * 12)
+
+    directory = os.path.dirname(socket_path(deep))
+    info = os.lstat(directory)
+    assert directory == os.path.join(temp_dir, f"ptm-{os.getuid()}")
+    assert info.st_uid == os.getuid()
+    assert info.st_mode & 0o777 == 0o700
+
+    os.chmod(directory, 0o777)
+    with pytest.raises(RuntimeError):
+        socket_path(deep)
+
+    private = os.path.join(temp_dir, "runtime")
+    os.mkdir(private, 0o700)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", private)
+    assert os.path.dirname(socket_path(deep)) == private
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="needs POSIX users")
+def test_check_socket_owner(temp_dir: str) -> None:
+    """Test that only missing paths and the user's own sockets pass."""
+    check_socket_owner(os.path.join(temp_dir, "missing.sock"))
+    create_file(os.path.join(temp_dir, "file.sock"))
+    with pytest.raises(RuntimeError):
+        check_socket_owner(os.path.join(temp_dir, "file.sock"))
+
+    path = os.path.join(temp_dir, "real.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with server:
+        server.bind(path)
+        check_socket_owner(path)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_run_in_worker(temp_dir: str, capfd: pytest.CaptureFixture) -> None:
+    """Test that runs are forked from a reused worker and restart on lockfile changes."""
+    create_file(os.path.join(temp_dir, "pyproject.toml"), "[project]\nname = 'x'\n")
+    create_file(
+        os.path.join(temp_dir, "tests", "test_a.py"),
+        "import os\n\ndef test_a():\n    print('worker', os.getppid())\n",
+    )
+    create_file(
+        os.path.join(temp_dir, "tests", "test_b.py"), "def test_b():\n    assert 0\n"
+    )
+    args = ["-q", "-s", "-p", "no:cacheprovider"]
+
+    try:
+        assert run_in_worker(temp_dir, ["tests/test_a.py"], args) == 0
+        first = capfd.readouterr().out
+        assert run_in_worker(temp_dir, ["tests/test_b.py"], args) == 1
+        assert run_in_worker(temp_dir, ["tests/test_a.py"], args) == 0
+        second = capfd.readouterr().out
+        parent = first.split("worker ")[1].split()[0]
+        assert second.count(f"worker {parent}") == 1
+        assert str(os.getpid()) != parent
+
+        create_file(os.path.join(temp_dir, "pyproject.toml"), "[project]\nname = 'y'\n")
+        assert run_in_worker(temp_dir, ["tests/test_a.py"], args) == 0
+        assert f"worker {parent}" not in capfd.readouterr().out
+    finally:
+        stop_worker(temp_dir)
+
+    assert not stop_worker(temp_dir)
+
+
+def test_preload_modules_logs_broken_dependencies(
+    temp_dir: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    """Test that missing dependencies are skipped quietly and broken ones are
+    skipped with their traceback in the log."""
+    site = os.path.join(temp_dir, "site")
+    create_file(os.path.join(site, "ptm_broken_dep.py"), "raise RuntimeError('boom')\n")
+    create_file(
+        os.path.join(temp_dir, "project", "requirements.txt"),
+        "ptm-missing-dep\nptm-broken-dep\n",
+    )
+    monkeypatch.syspath_prepend(site)
+
+    imported = preload_modules(os.path.join(temp_dir, "project"))
+
+    assert imported == ["pytest"]
+    output = capsys.readouterr().out
+    assert "Failed to preload ptm_broken_dep:" in output
+    assert "RuntimeError: boom" in output
+    assert "ptm_missing_dep" not in output
@@ -2,16 +2,20 @@ import os
 import shutil
 import subprocess
 import tempfile
-from typing import Any, Generator, List, NoReturn
+from typing import Any, Generator, List
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
 from pathspec import PathSpec
 from app.utils.workspace import (
     in_python_project,
+    find_project_root,
     get_ignore_spec,
     get_python_files,
+    iter_python_files,
+    in_tests_directory,
     create_tests_directory,
     create_test_files,
+    MaterializeResult,
 )
 
 
@@ -63,6 +67,46 @@ def test_no_python_project(temp_dir: str) -> None:
     assert not in_python_project(temp_dir)
 
 
+def test_python_file_beyond_depth_limit(temp_dir: str) -> None:
+    """Test that the search for .py files is bounded by depth."""
+    create_file(os.path.join(temp_dir, "a", "b", "c", "mod.py"))
+
+    assert in_python_project(temp_dir, max_depth=3)
+    assert not in_python_project(temp_dir, max_depth=2)
+
+
+def test_python_files_in_skipped_dirs(temp_dir: str) -> None:
+    """Test that hidden, vendored and ignored directories are not searched."""
+    create_file(os.path.join(temp_dir, ".cache", "mod.py"))
+    create_file(os.path.join(temp_dir, "node_modules", "pkg", "mod.py"))
+    create_file(os.path.join(temp_dir, "build", "mod.py"))
+    create_file(os.path.join(temp_dir, ".gitignore"), "build/\n")
+
+    assert not in_python_project(temp_dir)
+
+
+def test_find_project_root_from_subdirectory(temp_dir: str) -> None:
+    """Test that the project root is found above the start directory."""
+    create_file(os.path.join(temp_dir, "pyproject.toml"))
+    nested = os.path.join(temp_dir, "pkg", "sub")
+    os.makedirs(nested)
+
+    assert find_project_root(nested) == os.path.abspath(temp_dir)
+
+
+def test_find_project_root_stops_at_git_root(temp_dir: str) -> None:
+    """Test that the search doesn't leave the enclosing git repository."""
+    create_file(os.path.join(temp_dir, "pyproject.toml"))
+    repo = os.path.join(temp_dir, "repo")
+    os.makedirs(os.path.join(repo, ".git"))
+    os.makedirs(os.path.join(repo, "docs"))
+
+    assert find_project_root(os.path.join(repo, "docs")) is None
+
+    create_file(os.path.join(repo, "tool.py"))
+    assert find_project_root(os.path.join(repo, "docs")) == os.path.abspath(repo)
+
+
 # Tests for get_python_files function
 
 
@@ -83,6 +127,82 @@ def test_get_python_files_no_git(temp_dir: str) -> None:
     assert sorted(files) == ["helper.py", "main.py"]
 
 
+def test_get_python_files_prunes_ignored_dirs(
+    temp_dir: str, monkeypatch: MonkeyPatch
+) -> None:
+    """Test that ignored directories are never listed."""
+    create_file(os.path.join(temp_dir, ".gitignore"), ".venv/\nbuild/\n")
+    create_file(os.path.join(temp_dir, "pkg", "main.py"))
+    create_file(os.path.join(temp_dir, ".venv", "lib", "site.py"))
+    create_file(os.path.join(temp_dir, "build", "lib", "pkg.py"))
+
+    visited: List[str] = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path: str):
+        visited.append(os.path.relpath(path, temp_dir))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+
+    files: List[str] = get_python_files(temp_dir, use_git=False)
+    assert files == [os.path.join("pkg", "main.py")]
+    assert sorted(visited) == [".", "pkg"]
+
+
+def test_get_python_files_negation_under_ignored_dir(temp_dir: str) -> None:
+    """Test that files below an ignored directory can't be re-included."""
+    create_file(os.path.join(temp_dir, ".gitignore"), "build/\n!build/keep.py\n")
+    create_file(os.path.join(temp_dir, "main.py"))
+    create_file(os.path.join(temp_dir, "build", "keep.py"))
+    create_file(os.path.join(temp_dir, "build", "drop.py"))
+
+    files: List[str] = get_python_files(temp_dir, use_git=False)
+    assert files == ["main.py"]
+
+
+def test_get_python_files_nested_gitignore(temp_dir: str) -> None:
+    """Test that nested .gitignore files and info/exclude are honored."""
+    create_file(os.path.join(temp_dir, ".gitignore"), "gen_*.py\n")
+    create_file(os.path.join(temp_dir, ".git", "info", "exclude"), "scratch.py\n")
+    create_file(os.path.join(temp_dir, "scratch.py"))
+    create_file(
+        os.path.join(temp_dir, "pkg", ".gitignore"), "generated/\n!gen_keep.py\n"
+    )
+    create_file(os.path.join(temp_dir, "pkg", "mod.py"))
+    create_file(os.path.join(temp_dir, "pkg", "gen_keep.py"))
+    create_file(os.path.join(temp_dir, "pkg", "gen_drop.py"))
+    create_file(os.path.join(temp_dir, "pkg", "generated", "api.py"))
+    create_file(os.path.join(temp_dir, "other", "generated", "api.py"))
+
+    files: List[str] = get_python_files(temp_dir, use_git=False)
+    assert sorted(files) == [
+        os.path.join("other", "generated", "api.py"),
+        os.path.join("pkg", "gen_keep.py"),
+        os.path.join("pkg", "mod.py"),
+    ]
+
+
+def test_iter_python_files_streams(temp_dir: str) -> None:
+    """Test that files are yielded lazily and errors are raised eagerly."""
+    create_file(os.path.join(temp_dir, "a.py"))
+    create_file(os.path.join(temp_dir, "pkg", "b.py"))
+
+    files = iter_python_files(temp_dir, use_git=False)
+    assert next(files) == "a.py"
+    assert list(files) == [os.path.join("pkg", "b.py")]
+
+    with pytest.raises(FileNotFoundError):
+        iter_python_files("not/a/real/path", use_git=False)
+
+
+def test_in_tests_directory() -> None:
+    """Test detection of files inside the tests directory."""
+    assert in_tests_directory(os.path.join("tests", "test_main.py"))
+    assert not in_tests_directory(os.path.join("app", "tests.py"))
+    assert not in_tests_directory("tests.py")
+
+
 @pytest.mark.skipif(not shutil.which("git"), reason="Git is not installed")
 def test_get_python_files_with_git(temp_dir: str):
     """Test with git awareness."""
@@ -129,28 +249,66 @@ def test_get_python_files_missing_git_dir(temp_dir: str):
 
 
 @pytest.mark.skipif(not shutil.which("git"), reason="Git is not installed")
-def test_get_python_files_missing_gitignore(temp_dir: str):
-    """Test if git aware but gitignore doesn't exist."""
+def test_get_python_files_git_without_gitignore(temp_dir: str):
+    """Test that git awareness works without a gitignore."""
     subprocess.run(["git", "init"], cwd=temp_dir, check=True)
-    with pytest.raises(FileNotFoundError, match="does not have a gitignore"):
-        get_python_files(temp_dir, use_git=True)
+    create_file(os.path.join(temp_dir, "main.py"))
+
+    assert get_python_files(temp_dir, use_git=True) == ["main.py"]
 
 
 @pytest.mark.skipif(not shutil.which("git"), reason="Git is not installed")
-def test_get_python_files_subprocess_error(monkeypatch: MonkeyPatch, temp_dir: str):
+def test_get_python_files_subprocess_error(temp_dir: str):
     """Test for subprocess error in git aware case."""
     subprocess.run(["git", "init"], cwd=temp_dir, check=True)
-    create_file(os.path.join(temp_dir, ".gitignore"), "*.md\n")
+    create_file(os.path.join(temp_dir, ".git", "HEAD"), "garbage\n")
 
-    def mock_check_output(*_args: Any, **_kwargs: Any) -> NoReturn:
-        _ = _kwargs
-        _ = _args
-        raise subprocess.CalledProcessError(1, "git")
+    with pytest.raises(RuntimeError, match="Could not filter files using git: fatal"):
+        get_python_files(temp_dir, use_git=True)
 
-    monkeypatch.setattr(subprocess, "check_output", mock_check_output)
 
-    with pytest.raises(RuntimeError, match="Could not filter files using git"):
-        get_python_files(temp_dir, use_git=True)
+@pytest.mark.skipif(not shutil.which("git"), reason="Git is not installed")
+def test_get_python_files_git_untracked_and_quoted(temp_dir: str):
+    """Test that untracked files and unusual names are listed verbatim."""
+    subprocess.run(["git", "init"], cwd=temp_dir, check=True)
+    create_file(os.path.join(temp_dir, ".gitignore"), "ignored.py\n")
+    create_file(os.path.join(temp_dir, "ignored.py"))
+    create_file(os.path.join(temp_dir, "with space.py"))
+    create_file(os.path.join(temp_dir, "pkg", "caf\u00e9.py"))
+
+    files = get_python_files(temp_dir, use_git=True)
+    assert sorted(files) == ["pkg/caf\u00e9.py", "with space.py"]
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="Git is not installed")
+def test_get_python_files_git_submodules(temp_dir: str):
+    """Test that checked-out submodules are listed with their prefix."""
+
+    def git(cwd: str, *args: str) -> None:
+        subprocess.run(
+            ["git", "-c", "protocol.file.allow=always", *args],
+            cwd=cwd,
+            check=True,
+            capture_output=True,
+        )
+
+    library = os.path.join(temp_dir, "library")
+    project = os.path.join(temp_dir, "project")
+    for repo in (library, project):
+        os.makedirs(repo)
+        git(repo, "init")
+        git(repo, "config", "user.email", "test@example.com")
+        git(repo, "config", "user.name", "Test User")
+
+    create_file(os.path.join(library, "lib.py"))
+    git(library, "add", ".")
+    git(library, "commit", "-m", "init")
+
+    create_file(os.path.join(project, "main.py"))
+    git(project, "submodule", "add", library, "vendor/library")
+
+    files = get_python_files(project, use_git=True)
+    assert sorted(files) == ["main.py", os.path.join("vendor/library", "lib.py")]
 
 
 def test_get_ignore_spec_uses_gitignore(temp_dir: str):
@@ -251,3 +409,41 @@ def test_create_test_files(temp_dir: str) -> None:
         ]
     )
     assert sorted(created_test_files) == expected_files
+
+
+def test_create_test_files_reports_created_and_skipped(temp_dir: str) -> None:
+    """Test that existing test files are counted and left untouched."""
+    tests_dir = os.path.join(temp_dir, "tests")
+    create_file(os.path.join(tests_dir, "pkg", "test_kept.py"), "# mine\n")
+
+    result = create_test_files(
+        tests_dir,
+        [
+            "__init__.py",
+            os.path.join("pkg", "kept.py"),
+            os.path.join("pkg", "new.py"),
+            os.path.join("pkg", "new.py"),
+            os.path.join("other", "deep", "mod.py"),
+        ],
+    )
+
+    assert result == MaterializeResult(created=2, skipped=1)
+    with open(os.path.join(tests_dir, "pkg", "test_kept.py")) as file:
+        assert file.read() == "# mine\n"
+    with open(os.path.join(tests_dir, "other", "deep", "test_mod.py")) as file:
+        assert file.read() == "import pytest\n\n"
+
+
+def test_create_test_files_leaves_no_temporary_files(temp_dir: str) -> None:
+    """Test that concurrent writes create exactly the test files and nothing else."""
+    tests_dir = os.path.join(temp_dir, "tests")
+    os.makedirs(tests_dir)
+    python_files = [os.path.join(f"pkg{i % 5}", f"mod{i}.py") for i in range(50)]
+
+    result = create_test_files(tests_dir, python_files, max_workers=4)
+
+    written: List[str] = []
+    for _, _, files in os.walk(tests_dir):
+        written.extend(files)
+    assert result.created == 50
+    assert sorted(written) == sorted(f"test_mod{i}.py" for i in range(50))